@@ -0,0 +1,212 @@
+"""
+Arc fitting: the chains of short lines, which lie on a common circle, are replaced by circle arcs.
+
+The exported drawings (DXF, svg) often approximate the round features by hundreds of short lines, every one of them
+is a separate segment for FEMM, which refines the mesh around it. A chain is a sequence of lines, which are connected
+through nodes used by exactly two lines of the same label; it is cut into arcs greedily: an arc is extended line by
+line while the circle through its first, middle and last points keeps every point and every chord within the
+tolerance, the chain turns in the same direction and the arc spans at most 180 degrees (the limit of the FEMM arcs).
+The nodes of the geometry should be merged (Geometry.merge_points) before the fitting.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Node
+
+ArcFitReport = namedtuple("ArcFitReport", ["entities_before", "entities_after", "lines_removed", "arcs_added"])
+
+
+def circumcircle(a, b, c):
+    """The center and the radius of the circle through three points, None for collinear points."""
+    d = 2.0 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+    if d == 0.0:
+        return None
+
+    a2 = a[0] ** 2 + a[1] ** 2
+    b2 = b[0] ** 2 + b[1] ** 2
+    c2 = c[0] ** 2 + c[1] ** 2
+    x = (a2 * (b[1] - c[1]) + b2 * (c[1] - a[1]) + c2 * (a[1] - b[1])) / d
+    y = (a2 * (c[0] - b[0]) + b2 * (a[0] - c[0]) + c2 * (b[0] - a[0])) / d
+    return (x, y), math.hypot(a[0] - x, a[1] - y)
+
+
+def fit_arc(points, tolerance, max_angle=180.0):
+    """
+    Fits a circle arc to the polyline of the points.
+
+    :param points: (n, 2) array of the points of the polyline, n >= 3
+    :return: the center of the arc, None if the points do not lie on an arc within the tolerance
+    """
+    circle = circumcircle(points[0], points[len(points) // 2], points[-1])
+    if circle is None:
+        return None
+
+    (cx, cy), radius = circle
+    dx = points[:, 0] - cx
+    dy = points[:, 1] - cy
+    if np.abs(np.hypot(dx, dy) - radius).max() > tolerance:
+        return None
+
+    # the polyline turns in the same direction
+    angles = np.arctan2(dy, dx)
+    steps = (np.diff(angles) + math.pi) % (2.0 * math.pi) - math.pi
+    if not ((steps > 0.0).all() or (steps < 0.0).all()):
+        return None
+
+    sweep = abs(steps.sum())
+    if math.degrees(sweep) > max_angle + 1.0e-9:
+        return None
+
+    # the chords are close to the arc, and the arc is not a straight line
+    chords = np.hypot(np.diff(points[:, 0]), np.diff(points[:, 1]))
+    if (radius - np.sqrt(np.maximum(radius**2 - chords**2 / 4.0, 0.0))).max() > tolerance:
+        return None
+
+    if radius * (1.0 - math.cos(sweep / 2.0)) <= tolerance:
+        return None
+
+    return float(cx), float(cy)
+
+
+def segment_angle(radius, tolerance, min_angle=1.0, max_angle=10.0):
+    """
+    The maxseg of an arc in degrees: the FEMM segments of the arc deviate from it by at most the tolerance.
+
+    :param min_angle: lower limit, it keeps the small tolerances from refining the mesh too much
+    :param max_angle: upper limit
+    """
+    if radius <= tolerance:
+        return max_angle
+
+    angle = math.degrees(2.0 * math.acos(1.0 - tolerance / radius))
+    return min(max(angle, min_angle), max_angle)
+
+
+def tolerance_maxseg(tolerance, min_angle=1.0, max_angle=10.0):
+    """The maxseg function of FemmWriter.write_geometry, which gives the segment_angle of every arc."""
+
+    def maxseg(start, center, end):
+        return segment_angle(math.hypot(start[0] - center[0], start[1] - center[1]), tolerance, min_angle, max_angle)
+
+    return maxseg
+
+
+def line_chains(geometry):
+    """
+    The chains of the lines, which are connected through nodes used by exactly two lines of the same label.
+
+    :return: list of the chains, a chain is the list of its nodes and the list of its lines in the order of the chain,
+             in a closed chain the first and the last nodes are the same, the objects of an ArrayGeometry are the
+             objects of its editable copy
+    """
+    # the nodes and the lines are hashed by their identity, which needs plain objects (see Geometry.editable)
+    geometry = geometry.editable()
+    node_lines = {}
+    for line in geometry.lines:
+        node_lines.setdefault(line.start_pt, []).append(line)
+        node_lines.setdefault(line.end_pt, []).append(line)
+
+    junctions = set()
+    for arc in geometry.circle_arcs:
+        junctions.update((arc.start_pt, arc.end_pt))
+    for cb in geometry.cubic_beziers:
+        junctions.update((cb.start_pt, cb.end_pt))
+    for node, lines in node_lines.items():
+        if len(lines) != 2 or lines[0].label != lines[1].label:
+            junctions.add(node)
+
+    visited = set()
+
+    def walk(node, line):
+        nodes = [node]
+        lines = []
+        while line not in visited:
+            visited.add(line)
+            lines.append(line)
+            node = line.end_pt if line.start_pt is node else line.start_pt
+            nodes.append(node)
+            if node in junctions:
+                break
+            first, second = node_lines[node]
+            line = second if first is line else first
+        return nodes, lines
+
+    chains = []
+    for line in geometry.lines:
+        if line not in visited:
+            if line.start_pt in junctions:
+                chains.append(walk(line.start_pt, line))
+            if line not in visited and line.end_pt in junctions:
+                chains.append(walk(line.end_pt, line))
+
+    # the rest are closed loops without junctions
+    for line in geometry.lines:
+        if line not in visited:
+            chains.append(walk(line.start_pt, line))
+
+    return chains
+
+
+def fit_arcs(geometry, tolerance=1.0e-3, max_angle=180.0, min_lines=3):
+    """
+    Replaces the chains of lines on a common circle by circle arcs.
+
+    The arcs are counter-clockwise (as FEMM's arcs), the inner nodes of the replaced chains are removed and the
+    centers of the arcs are added to the nodes. An ArrayGeometry is edited through Geometry.editable.
+
+    :param tolerance: the maximal distance of the replaced lines and their nodes from the arcs
+    :param max_angle: the maximal angle of an arc in degrees, FEMM accepts at most 180 degrees
+    :param min_lines: a shorter part of a chain is kept as it is
+    :return: ArcFitReport, the number of the entities (lines, arcs, beziers) before and after the fitting
+    """
+    edited = geometry.editable()
+    entities_before = len(edited.lines) + len(edited.circle_arcs) + len(edited.cubic_beziers)
+
+    removed_lines = set()
+    removed_nodes = set()
+    arcs = []
+    for nodes, lines in line_chains(edited):
+        if len(lines) < min_lines:
+            continue
+
+        points = np.array([(node.x, node.y) for node in nodes])
+        i = 0
+        while i + min_lines <= len(lines):
+            j = i + min_lines
+            center = fit_arc(points[i : j + 1], tolerance, max_angle)
+            if center is None:
+                i += 1
+                continue
+
+            while j < len(lines):
+                extended = fit_arc(points[i : j + 2], tolerance, max_angle)
+                if extended is None:
+                    break
+                center = extended
+                j += 1
+
+            start, end = nodes[i], nodes[j]
+            a = points[i] - center
+            b = points[i + 1] - center
+            if a[0] * b[1] - a[1] * b[0] < 0.0:
+                start, end = end, start
+
+            labels = {line.label for line in lines[i:j]}
+            label = labels.pop() if len(labels) == 1 else None
+            arcs.append(CircleArc(start, Node(*center), end, label=label))
+            removed_lines.update(id(line) for line in lines[i:j])
+            removed_nodes.update(id(node) for node in nodes[i + 1 : j])
+            i = j
+
+    if arcs:
+        edited.lines = [line for line in edited.lines if id(line) not in removed_lines]
+        edited.nodes = [node for node in edited.nodes if id(node) not in removed_nodes]
+        for arc in arcs:
+            edited.circle_arcs.append(arc)
+            edited.nodes.append(arc.center_pt)
+        geometry.apply(edited)
+
+    entities_after = len(edited.lines) + len(edited.circle_arcs) + len(edited.cubic_beziers)
+    return ArcFitReport(entities_before, entities_after, len(removed_lines), len(arcs))
@@ -0,0 +1,549 @@
+"""
+NumPy backed (struct-of-arrays) storage of a geometry.
+
+The coordinates and the id numbers of the nodes are stored in contiguous arrays, the lines, circle arcs and cubic
+beziers are stored as rows of node indices. The usual object API (Node, Line, CircleArc, CubicBezier) is available
+through light-weight views, which read and write the underlying arrays, hence the large, generated models do not need
+a separate Python object for every node and entity.
+"""
+import numpy as np
+from adze_modeler.geometry import Geometry
+from adze_modeler.instrumentation import count
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import CubicBezier
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.point_index import PointIndex
+
+NO_ID = -1  # stored in the id array instead of None
+
+
+def _to_id(value):
+    return None if value == NO_ID else int(value)
+
+
+def _from_id(id):
+    return NO_ID if id is None else id
+
+
+class NodeStore:
+    """Contiguous x, y and id arrays of the nodes with amortized growth."""
+
+    def __init__(self, capacity=1024, precision=6):
+        capacity = max(1, capacity)
+        self._x = np.empty(capacity)
+        self._y = np.empty(capacity)
+        self._ids = np.full(capacity, NO_ID, dtype=np.int64)
+        self.labels = {}  # the labels are rare, they are stored by the index of the node
+        self.precision = precision
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def x(self):
+        return self._x[: self.size]
+
+    @property
+    def y(self):
+        return self._y[: self.size]
+
+    @property
+    def ids(self):
+        return self._ids[: self.size]
+
+    def reserve(self, capacity):
+        """Grows the arrays to hold at least capacity nodes."""
+        if capacity <= len(self._x):
+            return
+
+        capacity = max(capacity, 2 * len(self._x))
+        for name in ("_x", "_y", "_ids"):
+            old = getattr(self, name)
+            new = np.full(capacity, NO_ID, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def add(self, x, y, id=None, label=None):
+        """Appends a new node and returns its index."""
+        if self.size == len(self._x):
+            self.reserve(self.size + 1)
+
+        index = self.size
+        self._x[index] = x
+        self._y[index] = y
+        self._ids[index] = _from_id(id)
+        if label is not None:
+            self.labels[index] = label
+
+        self.size += 1
+        return index
+
+    def extend(self, xs, ys, ids=None):
+        """Appends the nodes given by coordinate arrays and returns their indices."""
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        start = self.size
+        self.reserve(start + len(xs))
+        self._x[start : start + len(xs)] = xs
+        self._y[start : start + len(xs)] = ys
+        if ids is not None:
+            self._ids[start : start + len(xs)] = ids
+
+        self.size += len(xs)
+        return np.arange(start, self.size)
+
+    def index_of(self, node):
+        """Index of the given node in the store, a node which is not a view of this store is appended."""
+        if isinstance(node, NodeView) and node.store is self:
+            return node.index
+
+        return self.add(node.x, node.y, node.id, node.label)
+
+    def view(self, index):
+        return NodeView(self, index)
+
+    def compact(self, keep):
+        """Keeps only the nodes selected by the boolean mask and returns the old -> new index mapping."""
+        keep = np.asarray(keep, dtype=bool)
+        mapping = np.full(self.size, NO_ID, dtype=np.int64)
+        mapping[keep] = np.arange(np.count_nonzero(keep))
+
+        count = np.count_nonzero(keep)
+        self._x[:count] = self.x[keep]
+        self._y[:count] = self.y[keep]
+        self._ids[:count] = self.ids[keep]
+        self.labels = {int(mapping[index]): label for index, label in self.labels.items() if keep[index]}
+        self.size = count
+        return mapping
+
+
+class NodeView(Node):
+    """A Node, which reads and writes its coordinates from a NodeStore."""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.store._x[self.index])
+
+    @x.setter
+    def x(self, value):
+        self.store._x[self.index] = value
+
+    @property
+    def y(self):
+        return float(self.store._y[self.index])
+
+    @y.setter
+    def y(self, value):
+        self.store._y[self.index] = value
+
+    @property
+    def id(self):
+        return _to_id(self.store._ids[self.index])
+
+    @id.setter
+    def id(self, value):
+        self.store._ids[self.index] = _from_id(value)
+
+    @property
+    def label(self):
+        return self.store.labels.get(self.index)
+
+    @label.setter
+    def label(self, value):
+        if value is None:
+            self.store.labels.pop(self.index, None)
+        else:
+            self.store.labels[self.index] = value
+
+    @property
+    def precision(self):
+        return self.store.precision
+
+    @precision.setter
+    def precision(self, value):
+        self.store.precision = value
+
+
+class EntityTable:
+    """Rows of node indices, one row per entity (2 columns for lines, 3 for arcs, 4 for cubic beziers)."""
+
+    def __init__(self, store, width, capacity=1024):
+        self.store = store
+        self._rows = np.empty((max(1, capacity), width), dtype=np.int64)
+        self._ids = np.full(max(1, capacity), NO_ID, dtype=np.int64)
+        self.labels = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def rows(self):
+        return self._rows[: self.size]
+
+    @property
+    def ids(self):
+        return self._ids[: self.size]
+
+    def reserve(self, capacity):
+        if capacity <= len(self._rows):
+            return
+
+        capacity = max(capacity, 2 * len(self._rows))
+        rows = np.empty((capacity, self._rows.shape[1]), dtype=np.int64)
+        rows[: self.size] = self.rows
+        ids = np.full(capacity, NO_ID, dtype=np.int64)
+        ids[: self.size] = self.ids
+        self._rows, self._ids = rows, ids
+
+    def add(self, indices, id=None, label=None):
+        """Appends an entity given by the indices of its nodes and returns the index of the new row."""
+        if self.size == len(self._rows):
+            self.reserve(self.size + 1)
+
+        row = self.size
+        self._rows[row] = indices
+        self._ids[row] = _from_id(id)
+        if label is not None:
+            self.labels[row] = label
+
+        self.size += 1
+        return row
+
+    def extend(self, rows, ids=None):
+        """Appends several entities, rows is an (n, width) array of node indices."""
+        rows = np.asarray(rows, dtype=np.int64)
+        start = self.size
+        self.reserve(start + len(rows))
+        self._rows[start : start + len(rows)] = rows
+        if ids is not None:
+            self._ids[start : start + len(rows)] = ids
+
+        self.size += len(rows)
+        return np.arange(start, self.size)
+
+
+def _node_property(column):
+    def getter(self):
+        return self.table.store.view(int(self.table._rows[self.row, column]))
+
+    def setter(self, node):
+        self.table._rows[self.row, column] = self.table.store.index_of(node)
+
+    return property(getter, setter)
+
+
+class _EntityView:
+    """Common id and label handling of the entity views."""
+
+    __slots__ = ()
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def id(self):
+        return _to_id(self.table._ids[self.row])
+
+    @id.setter
+    def id(self, value):
+        self.table._ids[self.row] = _from_id(value)
+
+    @property
+    def label(self):
+        return self.table.labels.get(self.row)
+
+    @label.setter
+    def label(self, value):
+        if value is None:
+            self.table.labels.pop(self.row, None)
+        else:
+            self.table.labels[self.row] = value
+
+
+class LineView(_EntityView, Line):
+    __slots__ = ("table", "row")
+
+    start_pt = _node_property(0)
+    end_pt = _node_property(1)
+
+
+class CircleArcView(_EntityView, CircleArc):
+    __slots__ = ("table", "row")
+
+    start_pt = _node_property(0)
+    center_pt = _node_property(1)
+    end_pt = _node_property(2)
+
+
+class CubicBezierView(_EntityView, CubicBezier):
+    __slots__ = ("table", "row")
+
+    start_pt = _node_property(0)
+    control1 = _node_property(1)
+    control2 = _node_property(2)
+    end_pt = _node_property(3)
+
+
+class ArrayGeometry(Geometry):
+    """
+    Geometry, which stores its nodes in a NodeStore and its entities as index arrays.
+
+    The nodes, lines, circle_arcs and cubic_beziers attributes give back views, which can be used as the usual
+    objects. The add_lines, add_arcs and add_cubic_beziers methods append many entities at once from index arrays.
+    """
+
+    def __init__(self, capacity=1024):
+        self.store = NodeStore(capacity)
+        self.line_table = EntityTable(self.store, 2, capacity)
+        self.arc_table = EntityTable(self.store, 3, capacity)
+        self.bezier_table = EntityTable(self.store, 4, capacity)
+        self.epsilon = 1.0e-5
+
+    @property
+    def nodes(self):
+        return [NodeView(self.store, i) for i in range(len(self.store))]
+
+    @property
+    def lines(self):
+        return [LineView(self.line_table, i) for i in range(len(self.line_table))]
+
+    @property
+    def circle_arcs(self):
+        return [CircleArcView(self.arc_table, i) for i in range(len(self.arc_table))]
+
+    @property
+    def cubic_beziers(self):
+        return [CubicBezierView(self.bezier_table, i) for i in range(len(self.bezier_table))]
+
+    def new_node(self, x, y, id=None):
+        """Creates the node directly in the store."""
+        return NodeView(self.store, self.store.add(x, y, id))
+
+    def add_node(self, node):
+        return self.store.index_of(node)
+
+    def add_object(self, obj):
+        """Stores a node or an entity, the nodes created by new_node are already in the store."""
+        if isinstance(obj, Node):
+            self.store.index_of(obj)
+        elif isinstance(obj, Line):
+            self.add_line(obj)
+        elif isinstance(obj, CircleArc):
+            self.add_arc(obj)
+        elif isinstance(obj, CubicBezier):
+            self.add_cubic_bezier(obj)
+        else:
+            raise TypeError(f"The {type(obj).__name__} object cannot be stored in the geometry!")
+
+    def add_nodes(self, xs, ys, ids=None):
+        """Appends the nodes given by their coordinates, returns their indices."""
+        return self.store.extend(xs, ys, ids)
+
+    def add_line(self, line):
+        indices = [self.store.index_of(line.start_pt), self.store.index_of(line.end_pt)]
+        return self.line_table.add(indices, line.id, line.label)
+
+    def add_lines(self, rows, ids=None):
+        """Appends lines given by an (n, 2) array of (start, end) node indices."""
+        return self.line_table.extend(rows, ids)
+
+    def add_arc(self, arc):
+        indices = [self.store.index_of(pt) for pt in (arc.start_pt, arc.center_pt, arc.end_pt)]
+        return self.arc_table.add(indices, arc.id, arc.label)
+
+    def add_arcs(self, rows, ids=None):
+        """Appends circle arcs given by an (n, 3) array of (start, center, end) node indices."""
+        return self.arc_table.extend(rows, ids)
+
+    def add_cubic_bezier(self, cb):
+        indices = [self.store.index_of(pt) for pt in (cb.start_pt, cb.control1, cb.control2, cb.end_pt)]
+        return self.bezier_table.add(indices, cb.id, cb.label)
+
+    def add_cubic_beziers(self, rows, ids=None):
+        """Appends cubic beziers given by an (n, 4) array of (start, control1, control2, end) node indices."""
+        return self.bezier_table.extend(rows, ids)
+
+    def _merge_points(self):
+        """Merges the nodes closer than epsilon, keeps the first node of every group and renumbers the entities."""
+        index = PointIndex(self.epsilon)
+        survivor = np.empty(len(self.store), dtype=np.int64)
+        for i, (x, y) in enumerate(zip(self.store.x.tolist(), self.store.y.tolist())):
+            survivor[i] = index.get_or_insert(x, y, i)
+
+        keep = survivor == np.arange(len(self.store))
+        count("merge_points.nodes_merged", len(keep) - int(keep.sum()))
+        if keep.all():
+            return
+
+        mapping = self.store.compact(keep)
+        for table in (self.line_table, self.arc_table, self.bezier_table):
+            table.rows[...] = mapping[survivor[table.rows]]
+
+    def editable(self):
+        """
+        A Geometry of plain objects with the same nodes and entities, the views of an ArrayGeometry are created on
+        every access, so they cannot be identified by their identity.
+        """
+        store = self.store
+        edited = Geometry()
+        edited.epsilon = self.epsilon
+        edited.nodes = [
+            Node(x, y, _to_id(id), store.labels.get(i), store.precision)
+            for i, (x, y, id) in enumerate(zip(store.x.tolist(), store.y.tolist(), store.ids.tolist()))
+        ]
+
+        def entities(table, cls):
+            return [
+                cls(*(edited.nodes[i] for i in row), id=_to_id(id), label=table.labels.get(k))
+                for k, (row, id) in enumerate(zip(table.rows.tolist(), table.ids.tolist()))
+            ]
+
+        edited.lines = entities(self.line_table, Line)
+        edited.circle_arcs = entities(self.arc_table, CircleArc)
+        edited.cubic_beziers = entities(self.bezier_table, CubicBezier)
+        return edited
+
+    def apply(self, edited):
+        """Rebuilds the node store and the entity tables from the edited geometry (see editable)."""
+        if edited is self:
+            return
+
+        nodes = edited.all_nodes()
+        index = {id(node): i for i, node in enumerate(nodes)}
+        store = NodeStore(len(nodes), self.store.precision)
+        store.extend([node.x for node in nodes], [node.y for node in nodes], [_from_id(node.id) for node in nodes])
+        store.labels = {i: node.label for i, node in enumerate(nodes) if node.label is not None}
+
+        def table(entities, fields):
+            result = EntityTable(store, len(fields), len(entities))
+            rows = [[index[id(getattr(entity, field))] for field in fields] for entity in entities]
+            result.extend(np.array(rows, dtype=np.int64).reshape(-1, len(fields)), [_from_id(e.id) for e in entities])
+            result.labels = {k: entity.label for k, entity in enumerate(entities) if entity.label is not None}
+            return result
+
+        self.store = store
+        self.line_table = table(edited.lines, ("start_pt", "end_pt"))
+        self.arc_table = table(edited.circle_arcs, ("start_pt", "center_pt", "end_pt"))
+        self.bezier_table = table(edited.cubic_beziers, ("start_pt", "control1", "control2", "end_pt"))
+
+    def object_key(self, obj):
+        """The objects without id are identified by their index in the node store or by their row in the table."""
+        if obj.id is not None:
+            return obj.id
+
+        return ("node", obj.index) if isinstance(obj, NodeView) else (type(obj).__name__, obj.row)
+
+    def all_nodes(self):
+        return self.nodes
+
+    def selection_mask(self, label=None, id_range=None, bbox=None):
+        """Boolean mask of the nodes in the store, which fulfil every given condition (see Geometry.select_nodes)."""
+        store = self.store
+        mask = np.ones(len(store), dtype=bool)
+
+        if label is not None:
+            labelled = np.zeros(len(store), dtype=bool)
+            labelled[[index for index, node_label in store.labels.items() if node_label == label]] = True
+            for table in (self.line_table, self.arc_table, self.bezier_table):
+                rows = [row for row, entity_label in table.labels.items() if entity_label == label]
+                labelled[table.rows[rows].ravel()] = True
+            mask &= labelled
+
+        if id_range is not None:
+            first, last = id_range
+            mask &= (store.ids != NO_ID) & (store.ids >= first) & (store.ids <= last)
+
+        if bbox is not None:
+            x_min, y_min, x_max, y_max = bbox
+            mask &= (store.x >= x_min) & (store.x <= x_max) & (store.y >= y_min) & (store.y <= y_max)
+
+        return mask
+
+    def select_nodes(self, label=None, id_range=None, bbox=None):
+        return [NodeView(self.store, int(i)) for i in np.flatnonzero(self.selection_mask(label, id_range, bbox))]
+
+    def transform(self, matrix, label=None, id_range=None, bbox=None):
+        """Applies the affine transformation to the selected nodes directly in the coordinate arrays."""
+        mask = self.selection_mask(label, id_range, bbox)
+        matrix = np.asarray(matrix, dtype=float)
+        x = self.store.x[mask]
+        y = self.store.y[mask]
+        self.store.x[mask] = np.round(matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2], self.store.precision) + 0.0
+        self.store.y[mask] = np.round(matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2], self.store.precision) + 0.0
+        return int(np.count_nonzero(mask))
+
+
+def to_arrays(geometry):
+    """
+    Compact representation of a geometry as a dict of NumPy arrays, which can be pickled or saved cheaply.
+
+    The nodes are given by the x, y and node_ids arrays, the entities by rows of node indices (lines, arcs,
+    beziers) and by their id arrays. The labels are not included.
+    """
+    if isinstance(geometry, ArrayGeometry):
+        arrays = {"x": geometry.store.x.copy(), "y": geometry.store.y.copy(), "node_ids": geometry.store.ids.copy()}
+        for name, table in (("lines", geometry.line_table), ("arcs", geometry.arc_table)):
+            arrays[name] = table.rows.copy()
+            arrays[name[:-1] + "_ids"] = table.ids.copy()
+        arrays["beziers"] = geometry.bezier_table.rows.copy()
+        arrays["bezier_ids"] = geometry.bezier_table.ids.copy()
+        return arrays
+
+    nodes = geometry.all_nodes()
+    index = {id(node): i for i, node in enumerate(nodes)}
+
+    def table(entities, fields):
+        rows = np.array([[index[id(getattr(e, f))] for f in fields] for e in entities], dtype=np.int64)
+        ids = np.array([_from_id(e.id) for e in entities], dtype=np.int64)
+        return rows.reshape(len(entities), len(fields)), ids
+
+    arrays = {
+        "x": np.array([node.x for node in nodes], dtype=float),
+        "y": np.array([node.y for node in nodes], dtype=float),
+        "node_ids": np.array([_from_id(node.id) for node in nodes], dtype=np.int64),
+    }
+    arrays["lines"], arrays["line_ids"] = table(geometry.lines, ("start_pt", "end_pt"))
+    arrays["arcs"], arrays["arc_ids"] = table(geometry.circle_arcs, ("start_pt", "center_pt", "end_pt"))
+    arrays["beziers"], arrays["bezier_ids"] = table(
+        geometry.cubic_beziers, ("start_pt", "control1", "control2", "end_pt")
+    )
+    return arrays
+
+
+def from_arrays(arrays, copy=True):
+    """
+    Creates an ArrayGeometry from the arrays given by to_arrays.
+
+    :param copy: if False, the geometry uses the given arrays as its storage (e.g. memory-mapped arrays opened in
+                 copy-on-write mode), the arrays are replaced only when the geometry grows
+    """
+    if copy:
+        geometry = ArrayGeometry(capacity=len(arrays["x"]))
+        geometry.add_nodes(arrays["x"], arrays["y"], arrays["node_ids"])
+        geometry.add_lines(arrays["lines"], arrays["line_ids"])
+        geometry.add_arcs(arrays["arcs"], arrays["arc_ids"])
+        geometry.add_cubic_beziers(arrays["beziers"], arrays["bezier_ids"])
+        return geometry
+
+    geometry = ArrayGeometry(capacity=1)
+    store = geometry.store
+    store._x, store._y, store._ids = arrays["x"], arrays["y"], arrays["node_ids"]
+    store.size = len(arrays["x"])
+    for table, rows, ids in (
+        (geometry.line_table, "lines", "line_ids"),
+        (geometry.arc_table, "arcs", "arc_ids"),
+        (geometry.bezier_table, "beziers", "bezier_ids"),
+    ):
+        table._rows, table._ids = arrays[rows], arrays[ids]
+        table.size = len(arrays[rows])
+    return geometry
@@ -0,0 +1,64 @@
+"""
+Parallel import of many svg and DXF files.
+
+The files are distributed among the processes of a process pool, the results are given back in the order of the
+input files. An error during the import of a file does not stop the batch, it is reported in the result of that file.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from adze_modeler.array_geometry import from_arrays
+from adze_modeler.array_geometry import to_arrays
+from adze_modeler.dxf_handlers import import_dxf
+from adze_modeler.svg_handlers import import_svg
+
+ImportResult = namedtuple("ImportResult", ["file_name", "geometry", "error"])
+
+
+def import_file(file_name):
+    """Imports an svg or a DXF file, the importer is selected by the extension of the file."""
+    extension = os.path.splitext(file_name)[1].lower()
+
+    if extension == ".svg":
+        return import_svg(file_name)
+
+    if extension == ".dxf":
+        return import_dxf(file_name)
+
+    raise ValueError(f"Unknown file type: {file_name}")
+
+
+def _import_job(file_name, compact):
+    try:
+        geometry = import_file(file_name)
+        return ImportResult(file_name, to_arrays(geometry) if compact else geometry, None)
+    except Exception as err:
+        return ImportResult(file_name, None, f"{type(err).__name__}: {err}")
+
+
+def import_files(file_names, processes=None, compact=True):
+    """
+    Imports the files in a process pool.
+
+    :param file_names: list of svg and DXF files
+    :param processes: the number of the worker processes, the number of the cpu cores by default
+    :param compact: the geometries are sent back from the workers as NumPy arrays and they are given back as
+                    ArrayGeometry objects, otherwise the Geometry objects are pickled as they are
+    :return: list of ImportResult(file_name, geometry, error) tuples in the order of the file names, the geometry is
+             None and the error contains the message, if the import failed
+    """
+    file_names = [os.fspath(file_name) for file_name in file_names]
+    if not file_names:
+        return []
+
+    processes = min(processes or os.cpu_count() or 1, len(file_names))
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(_import_job, file_names, [compact] * len(file_names)))
+
+    if compact:
+        for i, result in enumerate(results):
+            if result.error is None:
+                results[i] = result._replace(geometry=from_arrays(result.geometry))
+
+    return results
@@ -0,0 +1,113 @@
+"""
+Flattening of the cubic beziers into lines.
+
+FEMM has no bezier primitive, so the cubic beziers of an imported svg image are replaced by polylines, which deviate
+from the curves by less than the given chordal tolerance. The deviation of a uniformly sampled cubic from its chords
+is bounded by M / (8 n^2), where n is the number of the segments and M = 6 max(|P0 - 2 P1 + P2|, |P1 - 2 P2 + P3|)
+bounds the second derivative of the curve. Hence every curve gets its own segment count n = ceil(sqrt(M / (8 tol))):
+the flat parts of an outline get a few segments and only the tight turns get many. The points of all the curves are
+evaluated at once with NumPy.
+"""
+import numpy as np
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+def control_points(beziers):
+    """The (n, 4, 2) array of the start, control1, control2 and end points of the cubic beziers."""
+    points = np.empty((len(beziers), 4, 2))
+    for i, cb in enumerate(beziers):
+        points[i] = [
+            (cb.start_pt.x, cb.start_pt.y),
+            (cb.control1.x, cb.control1.y),
+            (cb.control2.x, cb.control2.y),
+            (cb.end_pt.x, cb.end_pt.y),
+        ]
+    return points
+
+
+def segment_counts(points, tolerance, max_segments=1000):
+    """
+    The number of the segments of the curves, which keeps their deviation from the chords below the tolerance.
+
+    :param points: (n, 4, 2) array of the control points
+    :param max_segments: upper limit of the segments of a curve
+    """
+    if tolerance <= 0.0:
+        raise ValueError("The tolerance of the flattening should be positive!")
+
+    d1 = np.hypot(*(points[:, 0] - 2.0 * points[:, 1] + points[:, 2]).T)
+    d2 = np.hypot(*(points[:, 1] - 2.0 * points[:, 2] + points[:, 3]).T)
+    bound = 6.0 * np.maximum(d1, d2)
+    counts = np.ceil(np.sqrt(bound / (8.0 * tolerance))).astype(np.int64)
+    return np.clip(counts, 1, max_segments)
+
+
+def flatten(points, tolerance, max_segments=1000):
+    """
+    Evaluates the inner points of the polylines of the curves.
+
+    :param points: (n, 4, 2) array of the control points
+    :return: the (m, 2) array of the inner points of all polylines (curve by curve) and the segment counts of the
+             curves, a curve with k segments has k - 1 inner points
+    """
+    counts = segment_counts(points, tolerance, max_segments)
+    inner = counts - 1
+    curve = np.repeat(np.arange(len(points)), inner)
+    first = np.cumsum(inner) - inner
+    t = (np.arange(len(curve)) - np.repeat(first, inner) + 1) / np.repeat(counts, inner)
+
+    t = t[:, np.newaxis]
+    s = 1.0 - t
+    p = points[curve]
+    xy = s**3 * p[:, 0] + 3.0 * s * s * t * p[:, 1] + 3.0 * s * t * t * p[:, 2] + t**3 * p[:, 3]
+    return xy, counts
+
+
+def flatten_beziers(geometry, tolerance=1.0e-3, max_segments=1000):
+    """
+    Replaces the cubic beziers of the geometry by lines.
+
+    The polyline of a curve starts and ends at the start and end nodes of the curve, so the connections to the other
+    entities are kept. The control points, which are not used by the other entities, are removed from the nodes.
+    An ArrayGeometry is edited through Geometry.editable.
+
+    :param tolerance: the maximal distance of the lines from the curves
+    :param max_segments: upper limit of the segments of a curve
+    :return: the number of the new lines
+    """
+    edited = geometry.editable()
+    beziers = edited.cubic_beziers
+    if not beziers:
+        return 0
+
+    xy, counts = flatten(control_points(beziers), tolerance, max_segments)
+    xy = xy.tolist()
+
+    lines = []
+    inner_nodes = []
+    position = 0
+    for cb, n in zip(beziers, counts.tolist()):
+        start = cb.start_pt
+        for x, y in xy[position : position + n - 1]:
+            end = Node(x, y)
+            inner_nodes.append(end)
+            lines.append(Line(start, end, label=cb.label))
+            start = end
+        lines.append(Line(start, cb.end_pt, label=cb.label))
+        position += n - 1
+
+    used = set()
+    for line in edited.lines:
+        used.update((id(line.start_pt), id(line.end_pt)))
+    for arc in edited.circle_arcs:
+        used.update((id(arc.start_pt), id(arc.center_pt), id(arc.end_pt)))
+    for cb in beziers:
+        used.update((id(cb.start_pt), id(cb.end_pt)))
+    controls = {id(point) for cb in beziers for point in (cb.control1, cb.control2)} - used
+
+    edited.nodes = [node for node in edited.nodes if id(node) not in controls] + inner_nodes
+    edited.lines.extend(lines)
+    edited.cubic_beziers = []
+    geometry.apply(edited)
+    return len(lines)
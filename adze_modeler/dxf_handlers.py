@@ -1,40 +1,202 @@
-import sys
-
 import adze_modeler.geometry as geo
+import adze_modeler.objects as obj
 import ezdxf
+from adze_modeler.instrumentation import count
+from adze_modeler.instrumentation import span
+from adze_modeler.point_index import PointIndex
+from ezdxf.addons import iterdxf
+from ezdxf.math import bulge_to_arc
 
+# the DXF entities, which are converted into lines and circle arcs
+supported_types = ("LINE", "ARC", "CIRCLE", "LWPOLYLINE", "POLYLINE")
 
-def import_dxf(dxf_file):
-    try:
-        doc = ezdxf.readfile(dxf_file)
-    except OSError:
-        print("Not a DXF file or a generic I/O error.")
-        sys.exit(1)
-    except ezdxf.DXFStructureError:
-        print("Invalid or corrupted DXF file.")
-        sys.exit(2)
-
-    # iterate over all entities in modelspace
-    imported_geo = geo.Geometry()
+
+def _xy(point):
+    return float(point[0]), float(point[1])
+
+
+def _mirrored(e):
+    """The entity is defined in a mirrored object coordinate system, its arcs are clockwise in the WCS."""
+    return e.dxf.hasattr("extrusion") and e.dxf.extrusion[2] < 0.0
+
+
+def _polyline_segments(points, closed, ocs=None):
+    """Segments of the (x, y, bulge) points of a polyline, the points are transformed to WCS with the ocs."""
+    if ocs is not None:
+        points = [(*_xy(ocs.to_wcs((x, y, 0.0))), -bulge) for x, y, bulge in points]
+
+    nr_segments = len(points) if closed else len(points) - 1
+    for i in range(nr_segments):
+        x1, y1, bulge = points[i]
+        x2, y2, _ = points[(i + 1) % len(points)]
+        if (x1, y1) == (x2, y2):
+            continue
+
+        if bulge == 0.0:
+            yield (x1, y1), (x2, y2)
+        else:
+            center = _xy(bulge_to_arc((x1, y1), (x2, y2), bulge)[0])
+            if bulge > 0.0:
+                yield (x1, y1), center, (x2, y2)
+            else:
+                yield (x2, y2), center, (x1, y1)
+
+
+def dxf_segments(e):
+    """
+    Yields the segments of a DXF entity: a line segment is a (start, end) tuple, an arc is a counter-clockwise
+    (start, center, end) tuple of (x, y) points. The unsupported entities give no segments.
+    """
+    dxftype = e.dxftype()
+
+    if dxftype == "LINE":
+        yield _xy(e.dxf.start), _xy(e.dxf.end)
+
+    elif dxftype == "ARC":
+        start, center, end = _xy(e.start_point), _xy(e.ocs().to_wcs(e.dxf.center)), _xy(e.end_point)
+        yield (end, center, start) if _mirrored(e) else (start, center, end)
+
+    elif dxftype == "CIRCLE":
+        # FEMM cannot draw a full circle with one arc, the circle is divided into two halves
+        cx, cy = _xy(e.ocs().to_wcs(e.dxf.center))
+        r = e.dxf.radius
+        yield (cx + r, cy), (cx, cy), (cx - r, cy)
+        yield (cx - r, cy), (cx, cy), (cx + r, cy)
+
+    elif dxftype == "LWPOLYLINE":
+        points = [(float(x), float(y), float(b)) for x, y, b in e.get_points("xyb")]
+        yield from _polyline_segments(points, e.closed, e.ocs() if _mirrored(e) else None)
+
+    elif dxftype == "POLYLINE":
+        if e.is_2d_polyline:
+            points = [(*_xy(v.dxf.location), v.dxf.bulge) for v in e.vertices]
+            yield from _polyline_segments(points, e.is_closed, e.ocs() if _mirrored(e) else None)
+        elif e.is_3d_polyline:
+            points = [(*_xy(v.dxf.location), 0.0) for v in e.vertices]
+            yield from _polyline_segments(points, e.is_closed)
+
+
+def dxf_objects(entities, new_node=obj.Node):
+    """
+    Converts the DXF entities into Line and CircleArc objects with automatic id numbers.
+
+    :param new_node: creates the nodes from (x, y, id)
+    """
 
     # id start from the given number
     id = 0
 
-    msp = doc.modelspace()
-    for e in msp:
-        if e.dxftype() == "LINE":
-            start = geo.Node(e.dxf.start[0], e.dxf.start[1], id)
-            end = geo.Node(e.dxf.end[0], e.dxf.end[1], id + 1)
-            imported_geo.add_line(geo.Line(start, end, id + 2))
-            id += 3
-
-        if e.dxftype() == "ARC":
-            start = geo.Node(e.dxf.start[0], e.dxf.start[1], id)
-            end = geo.Node(e.dxf.end[0], e.dxf.end[1], id + 1)
-            center = geo.Node(e.dxf.center[0], e.dxf.ceter[0], id + 2)
-            imported_geo.add_arc(geo.CircleArc(start, center, end, id + 3))
-            id += 4
-
-        if e.dxftype() == "POLYLINE":
-            print(e.__dict__)
+    for e in entities:
+        for segment in dxf_segments(e):
+            if len(segment) == 2:
+                start = new_node(*segment[0], id)
+                end = new_node(*segment[1], id + 1)
+                yield obj.Line(start, end, id + 2)
+                id += 3
+            else:
+                start = new_node(*segment[0], id)
+                end = new_node(*segment[2], id + 1)
+                center = new_node(*segment[1], id + 2)
+                yield obj.CircleArc(start, center, end, id + 3)
+                id += 4
+
+
+def _exploded(entities):
+    """The block references are replaced by the entities of the referenced blocks."""
+    for e in entities:
+        if e.dxftype() == "INSERT":
+            yield from _exploded(e.virtual_entities())
+        else:
+            yield e
+
+
+def import_dxf(dxf_file):
+    """
+    Imports the lines and arcs of the modelspace into a new geometry, the block references are exploded.
+
+    An OSError is raised if the file cannot be read and a ValueError if it is not a valid DXF file.
+    """
+    with span("import_dxf"):
+        try:
+            doc = ezdxf.readfile(dxf_file)
+        except ezdxf.DXFStructureError as err:
+            raise ValueError(f"Invalid or corrupted DXF file: {dxf_file}") from err
+
+        # iterate over all entities in modelspace
+        imported_geo = geo.Geometry()
+
+        for item in dxf_objects(_exploded(doc.modelspace())):
+            if isinstance(item, obj.Line):
+                imported_geo.add_line(item)
+            else:
+                imported_geo.add_arc(item)
+
+        count("import_dxf.entities", len(imported_geo.lines) + len(imported_geo.circle_arcs))
+
     return imported_geo
+
+
+def iter_dxf(dxf_file, epsilon=1.0e-5, batch_size=1000, new_node=obj.Node):
+    """
+    Streaming import of the modelspace of a DXF file, the entities are read one by one with ezdxf's iterdxf add-on,
+    the whole document is not loaded.
+
+    Yields lists of objects: every new node comes before the first line or arc, which uses it, the endpoints closer
+    than epsilon are merged during the import. The block references (INSERT) need the blocks section of the file,
+    if there are any, the document is loaded at the end of the stream to resolve them, so the memory is bounded only
+    for the drawings without block references.
+
+    :param batch_size: the maximal number of the entities in a batch
+    :param new_node: creates the nodes from (x, y, id), e.g. the new_node method of a geometry
+    """
+    index = PointIndex(epsilon)
+    batch = []
+    nr_entities = 0
+
+    def node(x, y, id):
+        found = index.query(x, y)
+        if found is None:
+            found = new_node(x, y, id)
+            index.insert(x, y, found)
+            batch.append(found)
+        return found
+
+    def entities():
+        inserts = 0
+        for e in iterdxf.modelspace(dxf_file, types=supported_types + ("INSERT",)):
+            if e.dxftype() == "INSERT":
+                inserts += 1
+            else:
+                yield e
+
+        if inserts:
+            doc = ezdxf.readfile(dxf_file)
+            yield from _exploded(doc.modelspace().query("INSERT"))
+
+    for item in dxf_objects(entities(), node):
+        batch.append(item)
+        nr_entities += 1
+        if nr_entities == batch_size:
+            yield batch
+            batch = []
+            nr_entities = 0
+
+    if batch:
+        yield batch
+
+
+def import_dxf_stream(dxf_file, geometry=None, epsilon=1.0e-5, batch_size=1000):
+    """
+    Imports the DXF file with iter_dxf, the batches are added to the geometry as they are read.
+
+    :param geometry: the imported objects are added to this geometry, a new geometry is created by default
+    :return: the geometry
+    """
+    if geometry is None:
+        geometry = geo.Geometry()
+
+    for batch in iter_dxf(dxf_file, epsilon, batch_size, geometry.new_node):
+        for item in batch:
+            geometry.add_object(item)
+
+    return geometry
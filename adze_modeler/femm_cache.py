@@ -0,0 +1,155 @@
+"""
+Cache of the FEMM results.
+
+The key of a result is the hash of its normalized lua script: the empty lines and the comments are dropped, the
+removed files and the names of the opened output and saved model files are stripped, so the same model written into
+different files (e.g. into the temporary directories of the jobs) gives the same key. The outputs are stored in a
+pluggable backend, an in-memory LRU or an SQLite database.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+CACHE_FORMAT = 1  # changing the normalization invalidates the old entries
+
+remove_re = re.compile(r"^remove\(.*\)$")
+openfile_re = re.compile(r'openfile\("[^"]*"')
+saveas_re = re.compile(r'_saveas\("[^"]*"\)')
+
+
+def normalize_script(script):
+    """
+    Returns the lines of the script, which determine the results.
+
+    :param script: the lua script as a string or as a list of commands, e.g. the lua_model of a FemmWriter
+    """
+    if isinstance(script, str):
+        script = script.splitlines()
+
+    lines = []
+    for line in script:
+        line = line.strip()
+        if not line or line.startswith("--") or remove_re.match(line):
+            continue
+
+        line = openfile_re.sub('openfile(""', line)
+        line = saveas_re.sub('_saveas("")', line)
+        lines.append(line)
+
+    return lines
+
+
+def script_key(script):
+    """The hash of the normalized script."""
+    digest = hashlib.sha256(f"{CACHE_FORMAT}\n".encode())
+    for line in normalize_script(script):
+        digest.update(line.encode())
+        digest.update(b"\n")
+
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """Keeps the max_entries most recently used outputs in memory."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            output = self.entries.get(key)
+            if output is not None:
+                self.entries.move_to_end(key)
+            return output
+
+    def set(self, key, output):
+        with self.lock:
+            self.entries[key] = output
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteBackend:
+    """Stores the outputs in an SQLite database, the results are kept between the runs of the program."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # the connection is shared by the threads of a FemmPool, the lock serializes its use
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS femm_results (key TEXT PRIMARY KEY, output TEXT)")
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM femm_results").fetchone()[0]
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT output FROM femm_results WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key, output):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO femm_results VALUES (?, ?)", (key, output))
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM femm_results")
+
+    def close(self):
+        self.connection.close()
+
+
+class FemmResultCache:
+    """
+    Stores the outputs of the FEMM scripts, it can be given to the FEMM executors (FemmExecutor.run_femm, FemmPool,
+    FemmSession, AsyncFemmExecutor), which run a script only if its output is not in the cache.
+
+    :param backend: MemoryBackend by default
+    """
+
+    def __init__(self, backend=None):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+        # the executors share the cache between their threads
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.backend)
+
+    def key(self, script):
+        return script_key(script)
+
+    def load(self, key):
+        """Returns the stored output or None if it is not in the cache."""
+        output = self.backend.get(key)
+        with self.lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return output
+
+    def store(self, key, output):
+        self.backend.set(key, output)
+
+    def clear(self):
+        self.backend.clear()
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,166 @@
+"""
+Reader of the result files, which are written by the FEMM scripts of the FemmWriter.
+
+Every line of a result file is a "key, value" pair (see FemmWriter.write_out_result), the value is a real number or
+a complex number in FEMM's notation, e.g. 0.5+I*0.25. A single result is read into a dict, the results of many runs
+(e.g. of a parameter sweep) are read into one NumPy record array, the columns are converted at once.
+
+A schema defines the expected keys and their types (float, complex or str) in the order of the columns, e.g.
+{"current": float, "volt": complex, "flux": complex}.
+"""
+import numpy as np
+
+# types of the schemas and the types of the corresponding columns
+field_dtypes = {float: "f8", complex: "c16", str: "U64"}
+
+
+def complex_text(text):
+    """Converts FEMM's complex notation (a+I*b) to Python's notation (a+bj)."""
+    text = text.replace(" ", "")
+    if "I*" in text:
+        return text.replace("I*", "") + "j"
+
+    return text
+
+
+def parse_value(text):
+    """Returns the value as float, complex or, if it is not a number, as a stripped string."""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    try:
+        return complex(complex_text(text))
+    except ValueError:
+        return text
+
+
+def split_result(text):
+    """Splits the lines of a result into a dict of the keys and the unconverted values."""
+    result = {}
+    for nr, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+
+        key, separator, value = line.partition(",")
+        if not separator:
+            raise ValueError(f"Invalid result line {nr}: {line!r}")
+
+        result[key.strip()] = value.strip()
+
+    return result
+
+
+def parse_result(text, schema=None):
+    """
+    Parses the text of a result file.
+
+    :param schema: if it is given, the keys of the schema are required and the values are converted to its types
+    :return: dict of the values
+    """
+    if schema is None:
+        return {key: parse_value(value) for key, value in split_result(text).items()}
+
+    values = split_result(text)
+    result = {}
+    for key, kind in schema.items():
+        if key not in values:
+            raise ValueError(f"The {key} value is missing from the result!")
+
+        result[key] = convert(values[key], kind, key)
+
+    return result
+
+
+def read_result(file_name, schema=None):
+    """Reads a result file, see parse_result."""
+    with open(file_name) as f:
+        return parse_result(f.read(), schema)
+
+
+def convert(value, kind, key):
+    if kind not in field_dtypes:
+        raise ValueError(f"Unsupported type of the {key} value: {kind}")
+
+    try:
+        return kind(complex_text(value)) if kind is complex else kind(value)
+    except ValueError:
+        raise ValueError(f"The {key} value is not a {kind.__name__}: {value!r}") from None
+
+
+def results_array(outputs, schema, missing="raise"):
+    """
+    Converts the outputs of many runs into one record array.
+
+    :param outputs: the texts of the result files or objects with an output attribute (e.g. FemmResult),
+                    None is the output of a failed run
+    :param schema: dict of the keys and their types, the fields of the records in this order
+    :param missing: "raise" raises a ValueError for a failed run or a missing value, "nan" fills them with NaN
+                    (and an empty string in the str fields)
+    :return: NumPy record array with a record for every output
+    """
+    if missing not in ("raise", "nan"):
+        raise ValueError(f"Unknown missing value option: {missing}")
+
+    for key, kind in schema.items():
+        if kind not in field_dtypes:
+            raise ValueError(f"Unsupported type of the {key} value: {kind}")
+
+    texts = []
+    for i, output in enumerate(outputs):
+        output = getattr(output, "output", output)
+        if output is None and missing == "raise":
+            raise ValueError(f"The output of the run {i} is missing!")
+        texts.append(output or "")
+
+    # the lines of all outputs are split into keys and values at once, rows gives the number of the run of a line
+    lines = [text.splitlines() for text in texts]
+    rows = np.repeat(np.arange(len(lines)), [len(run_lines) for run_lines in lines])
+    lines = np.array([line for run_lines in lines for line in run_lines], dtype=str)
+    parts = np.char.partition(lines, ",") if len(lines) else np.zeros((0, 3), dtype=str)
+    keys = np.char.strip(parts[:, 0])
+    values = np.char.strip(parts[:, 2])
+
+    invalid = (parts[:, 1] == "") & (np.char.strip(lines) != "")
+    if invalid.any():
+        i = np.flatnonzero(invalid)[0]
+        raise ValueError(f"Invalid result line in the result {rows[i]}: {lines[i]!r}")
+
+    records = np.recarray(len(texts), dtype=[(key, field_dtypes[kind]) for key, kind in schema.items()])
+    for key, kind in schema.items():
+        selected = keys == key
+        # the dtype of the values may be too short for the "nan" fill
+        column = np.full(len(texts), "" if kind is str else "nan", dtype=np.result_type(values.dtype, "<U3"))
+        column[rows[selected]] = values[selected]
+
+        found = np.zeros(len(texts), dtype=bool)
+        found[rows[selected]] = True
+        if missing == "raise" and not found.all():
+            raise ValueError(f"The {key} value is missing from the result {np.flatnonzero(~found)[0]}!")
+
+        if kind is complex:
+            has_imag = np.char.find(column, "I*") >= 0
+            column = np.char.replace(np.char.replace(column, " ", ""), "I*", "")
+            column = np.where(has_imag, np.char.add(column, "j"), column)
+
+        try:
+            records[key] = column.astype(field_dtypes[kind])
+        except ValueError as err:
+            raise ValueError(f"Invalid {key} value in the results: {err}") from None
+
+    return records
+
+
+def read_results(file_names, schema, missing="raise"):
+    """Reads the result files of many runs into one record array, a missing file is a failed run, see results_array."""
+    outputs = []
+    for file_name in file_names:
+        try:
+            with open(file_name) as f:
+                outputs.append(f.read())
+        except FileNotFoundError:
+            outputs.append(None)
+
+    return results_array(outputs, schema, missing)
@@ -5,12 +5,28 @@ The code generated one snapshot from the created model, which can be run during
 The original FEMM code has separate scripting commands for the geometry generation in different subfields
 
 """
+import asyncio
+import math
 import os
+import shutil
+import signal
 import subprocess
+import tempfile
+import time
+import weakref
 from collections import namedtuple
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from string import Template
 from sys import platform
 
+from adze_modeler.geometry import arc_angle
+from adze_modeler.geometry import Geometry
+from adze_modeler.geometry import translation_groups
+from adze_modeler.instrumentation import count
+from adze_modeler.instrumentation import span
+
 # keywords
 kw_current_flow = "current_flow"
 kw_electrostatic = "electrostatic"
@@ -58,22 +74,148 @@ MagneticMaterial = namedtuple(
 MagneticDirichlet = namedtuple("magnetic_dirichlet", ["name", "a_0", "a_1", "a_2", "phi"])
 MagneticMixed = namedtuple("magnetic_mixed", ["name", "c0", "c1"])
 
+# The command templates are compiled once per physical field into %-format strings, the writer looks up the table of
+# its field and formats the values with str(), like Template.substitute did before.
+# The {0} placeholder is the prefix of the field: mi, ei, hi or ci.
+common_commands = {
+    "add_node": "{0}_addnode(%s, %s)",
+    "add_segment": "{0}_addsegment(%s, %s, %s, %s)",
+    "add_blocklabel": "{0}_addblocklabel(%s, %s)",
+    "add_arc": "{0}_addarc(%s, %s, %s, %s, %s, %s)",
+    "delete_selected": "{0}_deleteselected",
+    "delete_selected_nodes": "{0}_deleteselectednodes",
+    "delete_selected_labels": "{0}_deleteselectedlabels",
+    "delete_selected_segments": "{0}_deleteselectedsegments",
+    "delete_selected_arc_segments": "{0}_deleteselectedarcsegments",
+    "clear_selected": "{0}_clearselected()",
+    "select_segment": "{0}_selectsegment(%s, %s)",
+    "select_node": "{0}_selectnode(%s, %s)",
+    "select_label": "{0}_selectlabel(%s, %s)",
+    "select_group": "{0}_selectgroup(%s)",
+    "select_circle": "{0}_selectcircle(%s, %s, %s, %s)",
+    "select_rectangle": "{0}_selectrectangle(%s,%s,%s,%s,%s)",
+    "set_edit_mode": '{0}_seteditmode("%s")',
+    "move_translate": "{0}_movetranslate(%s, %s)",
+}
+
+# commands, which are defined only for the magnetic field
+magnetic_commands = {
+    "analyze": "mi_analyze(%s)",
+    "select_arc_segment": "mi_selectarcsegment(%s, %s)",
+    "set_arc_segment_prop": "mi_setarcsegmentprop(%s, '%s', %s, %s)",
+    "save_as": 'mi_saveas("%s")',
+    "load_solution": "mi_loadsolution()",
+    "get_circuit_properties": "%s = mo_getcircuitproperties('%s')",
+}
+
+field_prefixes = {kw_magnetic: "mi", kw_electrostatic: "ei", kw_heat_flow: "hi", kw_current_flow: "ci"}
+
+field_commands = {
+    field: {name: template.format(prefix) for name, template in common_commands.items()}
+    for field, prefix in field_prefixes.items()
+}
+field_commands[kw_magnetic].update(magnetic_commands)
+
+
+class LuaStream:
+    """
+    Writes the lua commands through to a file-like sink, it can be used in place of the lua_model list of a writer,
+    the commands are not kept in memory.
+
+    :param sink: a file name or an object with a write method, a file opened from the name is buffered
+
+    The size is the number of the written commands, bytes_written is their length in UTF-8.
+    """
+
+    def __init__(self, sink):
+        if hasattr(sink, "write"):
+            self.file = sink
+            self.owns_file = False
+        else:
+            self.file = open(sink, "w")
+            self.owns_file = True
+
+        self.size = 0
+        self.bytes_written = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, line):
+        text = line + "\n"
+        self.file.write(text)
+        self.size += 1
+        self.bytes_written += len(text) if text.isascii() else len(text.encode())
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def close(self):
+        """Flushes the written commands, the sink is closed only if it was opened by the stream."""
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
 
 class FemmWriter:
-    """Writes out a model snapshot"""
+    """
+    Writes out a model snapshot.
+
+    :param sink: by default the lua commands are collected in the lua_model list of the writer, if a file name or a
+                 file-like object is given, they are streamed into it
+    """
+
+    _field = kw_magnetic
+    _commands = field_commands[kw_magnetic]
+
+    def __init__(self, sink=None):
+        self.lua_model = [] if sink is None else LuaStream(sink)  # the lua commands
+
+    @property
+    def field(self):
+        return self._field
 
-    field = kw_magnetic
-    lua_model = []  # list of the lua commands
+    @field.setter
+    def field(self, value):
+        # the command table is looked up here once, not at every generated command
+        self._field = value
+        self._commands = field_commands.get(value)
 
-    def write(self, file_name):
+    def _command(self, name):
+        """Returns the command template of the physical field of the writer."""
+        if self._commands is None:
+            raise ValueError("The physical field is not defined!")
+
+        try:
+            return self._commands[name]
+        except KeyError:
+            raise ValueError(f"The {name} command is not defined for the {self._field} field!") from None
+
+    def write(self, file_name=None):
         """Generate a runnable lua-script for a FEMM calculation.
 
-        :param file_name: the code (re)writes the snapshot from the created geometry to the given code
+        :param file_name: the code (re)writes the snapshot from the created geometry to the given code, a streaming
+                          writer has already written its commands, its sink is flushed (or closed) without file name
         """
+        if isinstance(self.lua_model, LuaStream):
+            if file_name is not None:
+                raise ValueError("The commands of a streaming writer are already written into its sink!")
+
+            with span("femm_writer.write"):
+                self.lua_model.close()
+            count("femm_writer.commands", len(self.lua_model))
+            count("femm_writer.bytes_written", self.lua_model.bytes_written)
+            return
+
+        if file_name is None:
+            raise ValueError("The file name of the lua script is not defined!")
 
-        with open(file_name, "w") as writer:
-            for line in self.lua_model:
-                writer.write(line + "\n")
+        with span("femm_writer.write"), open(file_name, "w") as writer:
+            writer.writelines(line + "\n" for line in self.lua_model)
+            count("femm_writer.commands", len(self.lua_model))
+            count("femm_writer.bytes_written", writer.tell())
 
     def init_problem(self, out_file="femm_data.csv"):
         """
@@ -87,7 +229,7 @@ class FemmWriter:
         cmd_list.append(f'remove("{out_file}")')  # get rid of the old data file, if it exists
         cmd_list.append("newdocument(0)")  # the 0 specifies a magnetics problem
         # cmd_list.append("mi_hidegrid()")
-        cmd = Template("file_out = openfile(\"$outfile\", \"w\")")
+        cmd = Template('file_out = openfile("$outfile", "w")')
         cmd = cmd.substitute(outfile=out_file)
         cmd_list.append(cmd)
         return cmd_list
@@ -110,78 +252,20 @@ class FemmWriter:
         The flag parameter controls whether the fkern window is visible or minimized. For a visible window,
         either specify no value for flag or specify 0. For a minimized window, flag should be set to 1.
         """
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_analyze($flag)")
-
-        return cmd.substitute(flag=flag)
+        return self._command("analyze") % (flag,)
 
     # object add remove commnads from FEMM MANUAL page 84.
     def add_node(self, x, y):
         """adds a node to the given point (x,y)"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_addnode($x_coord, $y_coord)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_addnode($x_coord, $y_coord)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_addnode($x_coord, $y_coord)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_addnode($x_coord, $y_coord)")
-
-        return cmd.substitute(x_coord=x, y_coord=y)
+        return self._command("add_node") % (x, y)
 
     def add_segment(self, x1, y1, x2, y2):
         """Add a new line segment from node closest to (x1,y1) to node closest to (x2,y2)"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_addsegment($x1_coord, $y1_coord, $x2_coord, $y2_coord)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_addsegment($x1_coord, $y1_coord, $x2_coord, $y2_coord)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_addsegment($x1_coord, $y1_coord, $x2_coord, $y2_coord)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_addsegment($x1_coord, $y1_coord, $x2_coord, $y2_coord)")
-
-        return cmd.substitute(x1_coord=x1, y1_coord=y1, x2_coord=x2, y2_coord=y2)
+        return self._command("add_segment") % (x1, y1, x2, y2)
 
     def add_blocklabel(self, x, y):
         """Add a new block label at (x,y)"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_addblocklabel($x_coord, $y_coord)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_addblocklabel($x_coord, $y_coord)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_addblocklabel($x_coord, $y_coord)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_addblocklabel($x_coord, $y_coord)")
-
-        return cmd.substitute(x_coord=x, y_coord=y)
+        return self._command("add_blocklabel") % (x, y)
 
     def add_arc(self, x1, y1, x2, y2, angle, maxseg):
         """
@@ -189,45 +273,11 @@ class FemmWriter:
         with angle ‘angle’ divided into ‘maxseg’ segments.
         with angle ‘angle’ divided into ‘maxseg’ segments.
         """
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_addarc($x_1, $y_1, $x_2, $y_2, $angle, $maxseg)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_addarc($x_1, $y_1, $x_2, $y_2, $angle, $maxseg)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_addarc($x_1, $y_1, $x_2, $y_2, $angle, $maxseg)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_addarc($x_1, $y_1, $x_2, $y_2, $angle, $maxseg)")
-
-        return cmd.substitute(x_1=x1, y_1=y1, x_2=x2, y_2=y2, angle=angle, maxseg=maxseg)
+        return self._command("add_arc") % (x1, y1, x2, y2, angle, maxseg)
 
     def delete_selected(self):
         """Delete all selected objects"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_deleteselected"
-
-        if self.field == kw_electrostatic:
-            cmd = "ei_deleteselected"
-
-        if self.field == kw_heat_flow:
-            cmd = "hi_deleteselected"
-
-        if self.field == kw_current_flow:
-            cmd = "ci_deleteselected"
-
-        return cmd
+        return self._command("delete_selected")
 
     def add_boundary(self, boundary):
         """
@@ -325,87 +375,19 @@ class FemmWriter:
 
     def delete_selected_nodes(self):
         """Delete all selected nodes, the object should be selected the node selection command."""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_deleteselectednodes"
-
-        if self.field == kw_electrostatic:
-            cmd = "ei_deleteselectednodes"
-
-        if self.field == kw_heat_flow:
-            cmd = "hi_deleteselectednodes"
-
-        if self.field == kw_current_flow:
-            cmd = "ci_deleteselectednodes"
-
-        return cmd
+        return self._command("delete_selected_nodes")
 
     def delete_selected_labels(self):
         """Delete all selected labels"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_deleteselectedlabels"
-
-        if self.field == kw_electrostatic:
-            cmd = "ei_deleteselectedlabels"
-
-        if self.field == kw_heat_flow:
-            cmd = "hi_deleteselectedlabels"
-
-        if self.field == kw_current_flow:
-            cmd = "ci_deleteselectedlabels"
-
-        return cmd
+        return self._command("delete_selected_labels")
 
     def delete_selected_segments(self):
         """Delete all selected segments."""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_deleteselectedsegments"
-
-        if self.field == kw_electrostatic:
-            cmd = "ei_deleteselectedsegments"
-
-        if self.field == kw_heat_flow:
-            cmd = "hi_deleteselectedsegments"
-
-        if self.field == kw_current_flow:
-            cmd = "ci_deleteselectedsegments"
-
-        return cmd
+        return self._command("delete_selected_segments")
 
     def delete_selected_arc_segments(self):
         """Delete all selected arc segments."""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_deleteselectedarcsegments"
-
-        if self.field == kw_electrostatic:
-            cmd = "ei_deleteselectedarcsegments"
-
-        if self.field == kw_heat_flow:
-            cmd = "hi_deleteselectedarcsegments"
-
-        if self.field == kw_current_flow:
-            cmd = "ci_deleteselectedarcsegments"
-
-        return cmd
+        return self._command("delete_selected_arc_segments")
 
     def add_circprop(self, circuitname, i, circuittype):
         """
@@ -424,132 +406,30 @@ class FemmWriter:
     # object selection commnads from FEMM MANUAL page 84.
     def clear_selected(self):
         """Clear all selected nodes, blocks, segments and arc segments."""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_clearselected()"
-
-        if self.field == kw_electrostatic:
-            cmd = "ei_clearselected()"
-
-        if self.field == kw_heat_flow:
-            cmd = "hi_clearselected()"
-
-        if self.field == kw_current_flow:
-            cmd = "ci_clearselected()"
-
-        return cmd
+        return self._command("clear_selected")
 
     def select_segment(self, x, y):
         """Select the line segment closest to (x,y)"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectsegment($xp, $yp)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_selectsegment($xp, $yp)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_selectsegment($xp, $yp)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_selectsegment($xp, $yp)")
-
-        return cmd.substitute(xp=x, yp=y)
+        return self._command("select_segment") % (x, y)
 
     def select_arc_segment(self, x, y):
         """Select the arc segment closest to (x,y)"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectarcsegment($xp, $yp)")
-
-        # if self.field == kw_electrostatic:
-        #     cmd = Template("ei_selectnode($xp, $yp)")
-        #
-        # if self.field == kw_heat_flow:
-        #     cmd = Template("hi_selectnode($xp, $yp)")
-        #
-        # if self.field == kw_current_flow:
-        #     cmd = Template("ci_selectnode($xp, $yp)")
-
-        return cmd.substitute(xp=x, yp=y)
+        return self._command("select_arc_segment") % (x, y)
 
     def select_node(self, x, y):
         """Select node closest to (x,y), Returns the coordinates ofthe se-lected node"""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectnode($xp, $yp)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_selectnode($xp, $yp)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_selectnode($xp, $yp)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_selectnode($xp, $yp)")
-
-        return cmd.substitute(xp=x, yp=y)
+        return self._command("select_node") % (x, y)
 
     def select_label(self, x, y):
         """Select the label closet to (x,y). Returns the coordinates of the selected label."""
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectlabel($xp, $yp)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_selectlabel($xp, $yp)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_selectlabel($xp, $yp)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_selectlabel($xp, $yp)")
-
-        return cmd.substitute(xp=x, yp=y)
+        return self._command("select_label") % (x, y)
 
     def select_group(self, n):
         """
         Select the n th group of nodes, segments, arc segments and block labels.
         This function will clear all previously selected elements and leave the edit mode in 4(group)
         """
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectgroup($np)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_selectgroup($np)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_selectgroup($np)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_selectgroup($np)")
-
-        return cmd.substitute(np=n)
+        return self._command("select_group") % (n,)
 
     def select_circle(self, x, y, R, editmode):
         """
@@ -557,24 +437,7 @@ class FemmWriter:
         are given, the current edit mode is used.If the editmode parameter is used, 0 denotes nodes, 2 denotes block
         labels, 2 denotes segments, 3 denotes arcs, and 4 specifies that all entity types are to be selected.
         """
-
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectcircle($xp, $yp, $Rp, $Editmode)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_selectcircle($xp, $yp, $Rp, $Editmode)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_selectcircle($xp, $yp, $Rp, $Editmode)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_selectcircle($xp, $yp, $Rp, $Editmode)")
-
-        return cmd.substitute(xp=x, yp=y, Rp=R, Editmode=editmode)
+        return self._command("select_circle") % (x, y, R, editmode)
 
     def select_rectangle(self, x1, y1, x2, y2, editmode):
         """
@@ -583,24 +446,15 @@ class FemmWriter:
         0 denotes nodes, 2 denotes block labels, 2 denotessegments, 3 denotes arcs, and 4 specifies that all
         entity types are to be selected.
         """
+        return self._command("select_rectangle") % (x1, y1, x2, y2, editmode)
 
-        cmd = None
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
+    def set_edit_mode(self, editmode):
+        """Sets the edit mode: "nodes", "segments", "arcsegments", "blocks" or "group"."""
+        return self._command("set_edit_mode") % (editmode,)
 
-        if self.field == kw_magnetic:
-            cmd = Template("mi_selectrectangle($x1p,$y1p,$x2p,$y2p,$Editmode)")
-
-        if self.field == kw_electrostatic:
-            cmd = Template("ei_selectrectangle($x1p,$y1p,$x2p,$y2p,$Editmode)")
-
-        if self.field == kw_heat_flow:
-            cmd = Template("hi_selectrectangle($x1p,$y1p,$x2p,$y2p,$Editmode)")
-
-        if self.field == kw_current_flow:
-            cmd = Template("ci_selectrectangle($x1p,$y1p,$x2p,$y2p,$Editmode)")
-
-        return cmd.substitute(x1p=x1, y1p=y1, x2p=x2, y2p=y2, Editmode=editmode)
+    def move_translate(self, dx, dy):
+        """Moves the selected objects of the current edit mode by (dx, dy)."""
+        return self._command("move_translate") % (dx, dy)
 
     def set_arc_segment_prop(self, maxsegdeg, propname, hide, group):
         """
@@ -609,13 +463,7 @@ class FemmWriter:
         :param hide: 0 = not hidden in post-processor, 1 == hidden in post processor
         :param group: a member of group number group
         """
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_setarcsegmentprop($maxsegdeg, $propname, $hide, $group)")
-            cmd = cmd.substitute(maxsegdeg=maxsegdeg, propname="'" + propname + "'", hide=hide, group=group)
-        return cmd
+        return self._command("set_arc_segment_prop") % (maxsegdeg, propname, hide, group)
 
     def set_blockprop(self, blockname=None, meshsize=None, circuit_name=None, magdirection=0, group="group", turns=0):
         """
@@ -719,45 +567,124 @@ class FemmWriter:
         mi_saveas("filename") saves the file with name "filename". Note if you use a path you
                               must use two backslashes e.g. "c:\\temp\\myfemmfile.fem
         """
-
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = Template("mi_saveas($filename)")
-
-        return cmd.substitute(filename='"' + file_name + '"')
+        return self._command("save_as") % (file_name,)
 
     def load_solution(self):
         """Loads  and displays the solution."""
+        return self._command("load_solution")
 
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
-
-        if self.field == kw_magnetic:
-            cmd = "mi_loadsolution()"
-
-        return cmd
-
-    def get_circuit_properties(self, circuit_name, result='current, volt, flux'):
+    def get_circuit_properties(self, circuit_name, result="current, volt, flux"):
         """Used primarily to obtain impedance information associated with circuit properties.
         Properties are returned for the circuit property named "circuit".
         Three values are returned by the function.
 
         In order, these results are current, volt and flux of the circuit."""
+        return self._command("get_circuit_properties") % (result, circuit_name)
 
-        if self.field not in fields:
-            raise ValueError("The physical field is not defined!")
+    def write_out_result(self, key, value):
+        # writes out a key_value pair
+        return "write(file_out, '%s', ', ', %s, \"\\n\") \n" % (key, value)
 
-        if self.field == kw_magnetic:
-            cmd = Template("$result = mo_getcircuitproperties($circuit)")
+    def open_document(self, file_name):
+        """Opens a saved model (e.g. a .fem file), it can be used instead of the newdocument command."""
+        return 'open("%s")' % (file_name,)
 
-        return cmd.substitute(circuit="'" + circuit_name + "'", result=result)
+    def write_geometry(self, geometry, maxseg=1):
+        """
+        The commands, which draw the nodes, lines and circle arcs of the geometry, the cubic beziers are not written.
 
-    def write_out_result(self, key, value):
-        # writes out a key_value pair
-        cmd = Template('write(file_out, \'$key\', \', \', $value, "\{}") \n'.format('n'))
-        return cmd.substitute(key=key, value=value)
+        :param maxseg: the maximal angle of the segments of the arcs in degrees, or a function of the (x, y) points of
+                       the start, center and end of an arc, which gives it (e.g. arc_fitting.tolerance_maxseg)
+        :return: list of the commands
+        """
+        return self.write_geometry_diff(geometry.diff(Geometry().snapshot()), maxseg=maxseg)
+
+    def write_geometry_diff(self, diff, base_file=None, maxseg=1):
+        """
+        The commands, which update the model of the snapshot to the current geometry (see Geometry.diff).
+
+        The removed objects are selected at their old coordinates and deleted, then the moved nodes are translated,
+        the nodes with the same translation are moved together in the order of the diff, finally the new objects are
+        drawn.
+
+        :param diff: GeometryDiff
+        :param base_file: the saved model of the snapshot, which is opened first
+        :param maxseg: the maximal angle of the segments of the new arcs in degrees, or a function of the arcs, see
+                       write_geometry
+        :return: list of the commands
+        """
+        # the delete_selected_* commands are returned without the call operator, it is added here
+        cmd_list = []
+        if base_file is not None:
+            cmd_list.append(self.open_document(base_file))
+
+        if diff.removed_lines:
+            for x1, y1, x2, y2 in diff.removed_lines:
+                cmd_list.append(self.select_segment((x1 + x2) / 2, (y1 + y2) / 2))
+            cmd_list.append(self.delete_selected_segments() + "()")
+
+        if diff.removed_arcs:
+            for start, center, end in diff.removed_arcs:
+                cmd_list.append(self.select_arc_segment(*arc_midpoint(start, center, end)))
+            cmd_list.append(self.delete_selected_arc_segments() + "()")
+
+        if diff.removed_nodes:
+            for x, y in diff.removed_nodes:
+                cmd_list.append(self.select_node(x, y))
+            cmd_list.append(self.delete_selected_nodes() + "()")
+
+        if diff.moved_nodes:
+            cmd_list.append(self.set_edit_mode("nodes"))
+            for (dx, dy), moves in translation_groups(diff.moved_nodes).items():
+                for (x, y), _ in moves:
+                    cmd_list.append(self.select_node(x, y))
+                cmd_list.append(self.move_translate(dx, dy))
+                cmd_list.append(self.clear_selected())
+
+        for x, y in diff.added_nodes:
+            cmd_list.append(self.add_node(x, y))
+
+        for x1, y1, x2, y2 in diff.added_lines:
+            cmd_list.append(self.add_segment(x1, y1, x2, y2))
+
+        for start, center, end in diff.added_arcs:
+            segment = maxseg(start, center, end) if callable(maxseg) else maxseg
+            cmd_list.append(self.add_arc(*start, *end, arc_angle(start, center, end), segment))
+
+        return cmd_list
+
+    def write_block_labels(self, regions, materials=None, meshsize=None, circuit_name="", group=0):
+        """
+        The commands, which put a block label into the interior point of every region (see regions.find_regions).
+
+        :param materials: list of the materials of the regions (names or MagneticMaterial-s), the labels of the
+                          regions without a material (None) are not set
+        :param meshsize: the mesh size of the blocks, None -> automesh
+        :param group: the number of the group of the blocks
+        :return: list of the commands
+        """
+        cmd_list = []
+        for i, region in enumerate(regions):
+            x, y = region.point
+            cmd_list.append(self.add_blocklabel(x, y))
+
+            material = None if materials is None else materials[i]
+            if material is not None:
+                blockname = getattr(material, "material_name", material)
+                blockprop = self.set_blockprop(blockname, meshsize, circuit_name, group=group)
+                if blockprop is not None:
+                    cmd_list.append(self.select_label(x, y))
+                    cmd_list.append(blockprop)
+                    cmd_list.append(self.clear_selected())
+
+        return cmd_list
+
+
+def arc_midpoint(start, center, end):
+    """The point in the middle of the counter-clockwise arc."""
+    radius = math.hypot(start[0] - center[0], start[1] - center[1])
+    angle = math.atan2(start[1] - center[1], start[0] - center[0]) + math.radians(arc_angle(start, center, end)) / 2
+    return center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle)
 
 
 class FemmExecutor:
@@ -771,24 +698,52 @@ class FemmExecutor:
     femm_path_linux = "$HOME/.wine/drive_c/femm42/bin/femm.exe"
     femm_path_windows = r"C:\FEMM42\bin\femm.exe"
 
-    def run_femm(self, script_file):
-        """This function runs the femm simulation via filelink"""
+    def run_femm(self, script_file, cache=None, out_file="femm_data.csv"):
+        """
+        This function runs the femm simulation via filelink
+
+        :param cache: a FemmResultCache, if the output of the script is cached, it is written into the out_file
+                      without running FEMM
+        :param out_file: the result file of the script, its content is stored in the cache
+        """
 
         self.script_file = os.path.basename(script_file)
 
+        key = None
+        if cache is not None:
+            with open(self.script_file) as f:
+                key = cache.key(f.read())
+
+            output = cache.load(key)
+            if output is not None:
+                with open(out_file, "w") as f:
+                    f.write(output)
+                return
+
+            # an earlier output should not be stored as the output of this script
+            if os.path.isfile(out_file):
+                os.remove(out_file)
+
         # under linux we are using wine to run FEMM
         if platform == "linux":
             self.femm_command = "wine " + self.femm_path_linux
 
             lua_path = os.path.abspath(self.script_file)
 
-            arg = None
-            if os.path.isfile(lua_path) and platform == "linux":
-                arg = '"' + os.popen('winepath -w "' + lua_path + '"').read().strip() + '"'
-
-            cmd_string = self.femm_command + f" -lua-script={arg}"
-
-            out = subprocess.run(cmd_string, shell=True, stdout=subprocess.PIPE)
+            # a missing winepath is reported like a missing wine
+            try:
+                arg = None
+                if os.path.isfile(lua_path) and platform == "linux":
+                    arg = wine_path(lua_path)
+
+                # the arguments are given as a list, no shell is started for the command
+                args = ["wine", os.path.expandvars(self.femm_path_linux), f"-lua-script={arg}"]
+                with span("femm.run"):
+                    out = subprocess.run(args, stdout=subprocess.PIPE)
+            except (OSError, RuntimeError) as err:
+                print(f"Cannot run FEMM.\n\n {err}")
+                return
+            count("femm.runs")
 
             if out.returncode != 0:
                 err = "Unknown error"
@@ -797,3 +752,486 @@ class FemmExecutor:
                     print(err)
                 # self.problem.logger.error(err)
                 # raise RuntimeError(err)
+            elif key is not None and os.path.isfile(out_file):
+                with open(out_file) as f:
+                    cache.store(key, f.read())
+
+
+FemmResult = namedtuple("FemmResult", ["index", "returncode", "output", "stdout", "stderr", "error"])
+
+
+@lru_cache(maxsize=1024)
+def wine_path(path):
+    """
+    Translates an absolute unix path to the windows path of the same file under wine. The translations are cached,
+    winepath is started only once for a path.
+    """
+    out = subprocess.run(["winepath", "-w", path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if out.returncode != 0 or not out.stdout.strip():
+        raise RuntimeError(f"Cannot translate the path for wine: {path}")
+
+    return out.stdout.strip()
+
+
+class FemmPool:
+    """
+    Runs many FEMM scripts concurrently.
+
+    Every job gets its own temporary working directory, the script is written into it and FEMM is started there, so
+    the relative file names of the scripts (femm_data.csv, the saved .fem and .ans files) do not collide. The FEMM
+    processes are started from a thread pool, the threads only wait for them.
+
+    :param processes: the number of the concurrent FEMM processes, the number of the cpu cores by default
+    :param femm_command: the command, which starts FEMM as a list of arguments, the script is given as the
+                         -lua-script=... argument. It is wine and the default FEMM path under linux and the default
+                         FEMM path under windows.
+    :param use_wine: the script path is translated with winepath, by default if the command starts with wine
+    :param out_file: the result file of the scripts in the working directory, its content is the output of the job
+    :param timeout: time limit of a FEMM run in seconds
+    :param keep_files: the working directories are not removed after the jobs
+    :param cache: a FemmResultCache, the cached outputs are given back without running FEMM
+    """
+
+    def __init__(
+        self,
+        processes=None,
+        femm_command=None,
+        use_wine=None,
+        out_file="femm_data.csv",
+        timeout=None,
+        keep_files=False,
+        cache=None,
+    ):
+        if femm_command is None:
+            if platform == "linux":
+                femm_command = ["wine", os.path.expandvars(FemmExecutor.femm_path_linux)]
+            else:
+                femm_command = [FemmExecutor.femm_path_windows]
+
+        self.processes = processes or os.cpu_count() or 1
+        self.femm_command = list(femm_command)
+        self.use_wine = os.path.basename(self.femm_command[0]) == "wine" if use_wine is None else use_wine
+        self.out_file = out_file
+        self.timeout = timeout
+        self.keep_files = keep_files
+        self.cache = cache
+        self.workdirs = {}
+
+    def script_argument(self, script_path):
+        """The path of the script, which is seen by FEMM."""
+        if not self.use_wine:
+            return script_path
+
+        # only the common parent of the job directories is translated, so the cached translation is reused
+        workdir, name = os.path.split(script_path)
+        root, job = os.path.split(workdir)
+        return wine_path(root) + "\\" + job + "\\" + name
+
+    def write_script(self, index, script):
+        """
+        Creates the working directory of a job and writes the script into it.
+
+        :return: the working directory and the FEMM command of the job
+        """
+        workdir = tempfile.mkdtemp(prefix=f"femm_{index}_")
+        script_path = os.path.join(workdir, "script.lua")
+        with open(script_path, "w") as f:
+            if isinstance(script, str):
+                f.write(script)
+            else:
+                f.writelines(line + "\n" for line in script)
+
+        return workdir, self.femm_command + ["-lua-script=" + self.script_argument(script_path)]
+
+    def job_result(self, index, workdir, returncode, stdout, stderr):
+        """Reads the output of a finished job."""
+        output = None
+        out_path = os.path.join(workdir, self.out_file)
+        if os.path.isfile(out_path):
+            with open(out_path) as f:
+                output = f.read()
+
+        error = None
+        if returncode != 0:
+            error = f"FEMM exited with {returncode}"
+        elif output is None:
+            error = f"FEMM did not write the {self.out_file} file"
+
+        return FemmResult(index, returncode, output, stdout, stderr, error)
+
+    def remove_workdir(self, index, workdir):
+        if self.keep_files:
+            self.workdirs[index] = workdir
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def cached_result(self, index, script):
+        """
+        Looks up the output of the script in the cache.
+
+        :return: the result, which is None if the output is not cached, and the cache key of the script
+        """
+        if self.cache is None:
+            return None, None
+
+        key = self.cache.key(script)
+        output = self.cache.load(key)
+        return (None if output is None else FemmResult(index, 0, output, None, None, None)), key
+
+    def cache_result(self, key, result):
+        """Stores the output of a successful job."""
+        if key is not None and result.error is None:
+            self.cache.store(key, result.output)
+
+    def run_job(self, index, script):
+        """
+        Runs a script in a new working directory, if its output is not cached.
+
+        :param script: the lua script as a string or as a list of commands, e.g. the lua_model of a FemmWriter
+        :return: FemmResult, the output is the content of the result file or None, if it was not written
+        """
+        result, key = self.cached_result(index, script)
+        if result is None:
+            result = self.run_femm_job(index, script)
+            self.cache_result(key, result)
+
+        return result
+
+    def run_femm_job(self, index, script):
+        workdir, args = self.write_script(index, script)
+        try:
+            try:
+                with span("femm.run"):
+                    out = subprocess.run(
+                        args,
+                        cwd=workdir,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True,
+                        timeout=self.timeout,
+                    )
+            except (OSError, subprocess.TimeoutExpired) as err:
+                count("femm.failed_runs")
+                return FemmResult(index, None, None, None, None, f"{type(err).__name__}: {err}")
+            count("femm.runs")
+
+            return self.job_result(index, workdir, out.returncode, out.stdout, out.stderr)
+        finally:
+            self.remove_workdir(index, workdir)
+
+    def run(self, scripts):
+        """
+        Runs the scripts and yields the results in the order of their completion.
+
+        :param scripts: iterable of lua scripts, the index of a result is the position of its script
+        """
+        with ThreadPoolExecutor(self.processes) as pool:
+            futures = [pool.submit(self.run_job, index, script) for index, script in enumerate(scripts)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def map(self, scripts):
+        """Runs the scripts and returns the results in the order of the scripts."""
+        return sorted(self.run(scripts), key=lambda result: result.index)
+
+
+# Lua (4.0) script of a persistent FEMM session, it waits for the job scripts in the working directory of FEMM and runs
+# them one after the other. The quit() command of the jobs is disabled, the session is stopped by the stop file.
+session_driver = """-- adze-modeler session driver
+femm_quit = quit
+function quit() end
+
+while 1 do
+    local job = openfile("job.lua", "r")
+    if job then
+        closefile(job)
+        dofile("job.lua")
+        remove("job.lua")
+        local done = openfile("done.tmp", "w")
+        closefile(done)
+        rename("done.tmp", "done")
+    end
+
+    local stop = openfile("stop", "r")
+    if stop then
+        closefile(stop)
+        femm_quit()
+    end
+end
+"""
+
+
+class FemmSession:
+    """
+    Runs the FEMM scripts one after the other in a long-lived FEMM process, the wine and FEMM startup is paid only
+    once for the session instead of every script.
+
+    FEMM runs a polling driver script, every job is written into the job.lua file of the working directory of the
+    session, then the driver runs it and signs its completion with the done file. The wineserver is started in
+    persistent mode and the wine path translations are cached. If the FEMM process crashes, the job is run again in
+    a separate FEMM process and a new session is started for the next job.
+
+    The driver has no sleep function in FEMM's Lua, it polls the job file continuously while it waits.
+
+    :param femm_command: the command, which starts FEMM, see FemmPool
+    :param use_wine: the script paths are translated with winepath, by default if the command starts with wine
+    :param out_file: the result file of the scripts, its content is the output of the job
+    :param timeout: time limit of a job in seconds, the session is killed if a job runs longer
+    :param poll_interval: the completion of a job is checked in every poll_interval seconds
+    :param cache: a FemmResultCache, the cached outputs are given back without running FEMM
+    """
+
+    def __init__(
+        self, femm_command=None, use_wine=None, out_file="femm_data.csv", timeout=None, poll_interval=0.005, cache=None
+    ):
+        # the pool runs the jobs of a crashed session and looks up the cached results
+        self.cold = FemmPool(1, femm_command, use_wine, out_file, timeout, cache=cache)
+        self.femm_command = self.cold.femm_command
+        self.use_wine = self.cold.use_wine
+        self.out_file = out_file
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+        self.process = None
+        self.workdir = None
+        self.nr_jobs = 0
+        self.nr_starts = 0
+        self.nr_crashes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """Starts a new FEMM process with the driver script."""
+        self.close()
+
+        if self.use_wine:
+            try:
+                subprocess.run(["wineserver", "-p"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError:
+                pass
+
+        self.workdir = tempfile.mkdtemp(prefix="femm_session_")
+        driver = os.path.join(self.workdir, "driver.lua")
+        with open(driver, "w") as f:
+            f.write(session_driver)
+
+        self.process = subprocess.Popen(
+            self.femm_command + ["-lua-script=" + self.cold.script_argument(driver)],
+            cwd=self.workdir,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.nr_starts += 1
+
+    def close(self):
+        """Stops the FEMM process of the session and removes its working directory."""
+        if self.process is not None:
+            if self.process.poll() is None:
+                open(os.path.join(self.workdir, "stop"), "w").close()
+                try:
+                    self.process.wait(5.0)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+
+            self.process = None
+
+        if self.workdir is not None:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+    def run(self, script):
+        """
+        Runs a script in the session.
+
+        :param script: the lua script as a string or as a list of commands
+        :return: FemmResult, its index is the number of the job in the session
+        """
+        index = self.nr_jobs
+        self.nr_jobs += 1
+
+        result, key = self.cold.cached_result(index, script)
+        if result is None:
+            result = self.run_session_job(index, script)
+            self.cold.cache_result(key, result)
+
+        return result
+
+    def run_session_job(self, index, script):
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+
+        out_path = os.path.join(self.workdir, self.out_file)
+        done_path = os.path.join(self.workdir, "done")
+        job_path = os.path.join(self.workdir, "job.lua")
+
+        # the job file appears at once, the driver never reads a partially written script
+        with open(job_path + ".tmp", "w") as f:
+            if isinstance(script, str):
+                f.write(script)
+            else:
+                f.writelines(line + "\n" for line in script)
+        os.replace(job_path + ".tmp", job_path)
+
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        crashed = False
+        with span("femm.run"):
+            while not os.path.exists(done_path):
+                if self.process.poll() is not None and not os.path.exists(done_path):
+                    crashed = True
+                    break
+
+                if deadline is not None and time.monotonic() > deadline:
+                    self.process.kill()
+                    self.close()
+                    count("femm.failed_runs")
+                    return FemmResult(
+                        index, None, None, None, None, f"TimeoutExpired: the job ran over {self.timeout} s"
+                    )
+
+                time.sleep(self.poll_interval)
+
+        # the separate run of the crashed job is recorded by the pool
+        if crashed:
+            self.nr_crashes += 1
+            self.close()
+            count("femm.failed_runs")
+            return self.cold.run_femm_job(index, script)
+        count("femm.runs")
+
+        os.remove(done_path)
+
+        output = None
+        if os.path.isfile(out_path):
+            with open(out_path) as f:
+                output = f.read()
+            os.remove(out_path)
+
+        error = None if output is not None else f"FEMM did not write the {self.out_file} file"
+        return FemmResult(index, 0, output, None, None, error)
+
+    def map(self, scripts):
+        """Runs the scripts in the session and returns the results in their order."""
+        return [self.run(script) for script in scripts]
+
+
+class AsyncFemmExecutor:
+    """
+    asyncio counterpart of the FemmPool, the FEMM processes are awaited in the event loop, no thread is used for a job.
+
+    Every FEMM process is started in a new session, its process group contains the wine processes and FEMM, so the
+    whole process tree is killed if the job runs over the timeout or it is cancelled. The processes parameter limits
+    the number of the concurrently running FEMM processes in an event loop, the other jobs wait for a free slot.
+
+    The parameters are the same as the parameters of the FemmPool.
+    """
+
+    def __init__(
+        self,
+        processes=None,
+        femm_command=None,
+        use_wine=None,
+        out_file="femm_data.csv",
+        timeout=None,
+        keep_files=False,
+        cache=None,
+    ):
+        # the pool writes the scripts, reads the results and looks up the cached outputs, its jobs are not used
+        self.pool = FemmPool(processes, femm_command, use_wine, out_file, timeout, keep_files, cache)
+        self.processes = self.pool.processes
+        self.femm_command = self.pool.femm_command
+        self.use_wine = self.pool.use_wine
+        self.timeout = timeout
+        self.workdirs = self.pool.workdirs
+        # a semaphore belongs to the event loop, where it was first used, every asyncio.run gets its own
+        self.semaphores = weakref.WeakKeyDictionary()
+
+    def semaphore(self):
+        """The semaphore of the running event loop, which limits the number of the FEMM processes."""
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self.semaphores[loop] = asyncio.Semaphore(self.processes)
+
+        return semaphore
+
+    @staticmethod
+    async def kill(process):
+        """Kills the process group of the process and waits for it."""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+
+        await process.wait()
+
+    async def run_job(self, index, script):
+        """
+        Runs a script in a new working directory, if its output is not cached. The cancellation of the job kills its
+        FEMM process.
+
+        :param script: the lua script as a string or as a list of commands
+        :return: FemmResult
+        """
+        result, key = self.pool.cached_result(index, script)
+        if result is None:
+            result = await self.run_femm_job(index, script)
+            self.pool.cache_result(key, result)
+
+        return result
+
+    async def run_femm_job(self, index, script):
+        async with self.semaphore():
+            workdir, args = self.pool.write_script(index, script)
+            try:
+                try:
+                    with span("femm.run"):
+                        process = await asyncio.create_subprocess_exec(
+                            *args,
+                            cwd=workdir,
+                            stdout=asyncio.subprocess.PIPE,
+                            stderr=asyncio.subprocess.PIPE,
+                            start_new_session=True,
+                        )
+                        try:
+                            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+                        except (asyncio.TimeoutError, asyncio.CancelledError):
+                            await self.kill(process)
+                            raise
+                # the TimeoutError is an OSError since Python 3.11
+                except asyncio.TimeoutError:
+                    count("femm.failed_runs")
+                    return FemmResult(
+                        index, None, None, None, None, f"TimeoutExpired: the job ran over {self.timeout} s"
+                    )
+                except OSError as err:
+                    count("femm.failed_runs")
+                    return FemmResult(index, None, None, None, None, f"{type(err).__name__}: {err}")
+                count("femm.runs")
+
+                return self.pool.job_result(index, workdir, process.returncode, stdout.decode(), stderr.decode())
+            finally:
+                self.pool.remove_workdir(index, workdir)
+
+    async def run(self, scripts):
+        """Runs the scripts and yields the results in the order of their completion, it is an async generator."""
+        jobs = [asyncio.ensure_future(self.run_job(index, script)) for index, script in enumerate(scripts)]
+        try:
+            for job in asyncio.as_completed(jobs):
+                yield await job
+        finally:
+            for job in jobs:
+                job.cancel()
+            await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def map(self, scripts):
+        """Runs the scripts and returns the results in the order of the scripts."""
+        return list(await asyncio.gather(*(self.run_job(index, script) for index, script in enumerate(scripts))))
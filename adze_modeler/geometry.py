@@ -3,6 +3,122 @@ This class realize a layer, where the different elements of the geometry can be
 A general geometrical shape can defined by the following objects:
     Nodes (Points), Lines, Circle Arcs, Cubic Bezeirs
 """
+import math
+from collections import namedtuple
+
+import numpy as np
+from adze_modeler.instrumentation import count
+from adze_modeler.instrumentation import span
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import CubicBezier
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.point_index import PointIndex
+
+# the changes of a geometry since a snapshot, the entities are given by the coordinates of their points:
+# nodes (x, y), lines (x1, y1, x2, y2) and arcs ((x, y) of the start, center, end), moved nodes ((x0, y0), (x1, y1))
+GeometryDiff = namedtuple(
+    "GeometryDiff",
+    ["added_nodes", "removed_nodes", "moved_nodes", "added_lines", "removed_lines", "added_arcs", "removed_arcs"],
+)
+
+
+class GeometrySnapshot:
+    """
+    The nodes, lines and circle arcs of a geometry at a given moment, see Geometry.snapshot.
+
+    The objects are identified by the key of the geometry (object_key), the entities are stored by the keys of their
+    points, the nodes by their coordinates. The vertices are the nodes of a FEMM model: the end points of the lines
+    and arcs and the nodes, which are not points of any entity, the centers of the arcs and the points of the cubic
+    beziers are not vertices.
+    """
+
+    def __init__(self, geometry):
+        key = geometry.object_key
+        nodes = geometry.all_nodes()
+        # the snapshot keeps the objects alive, so the identities of the objects without id are not reused
+        self.objects = nodes + list(geometry.lines) + list(geometry.circle_arcs)
+        self.nodes = {key(node): (node.x, node.y) for node in nodes}
+        self.lines = {key(line): (key(line.start_pt), key(line.end_pt)) for line in geometry.lines}
+        self.arcs = {key(arc): (key(arc.start_pt), key(arc.center_pt), key(arc.end_pt)) for arc in geometry.circle_arcs}
+
+        referenced = {k for points in self.lines.values() for k in points}
+        referenced.update(k for points in self.arcs.values() for k in points)
+        for cb in geometry.cubic_beziers:
+            referenced.update(key(point) for point in (cb.start_pt, cb.control1, cb.control2, cb.end_pt))
+        self.vertices = {k for k in self.nodes if k not in referenced}
+        self.vertices.update(k for points in self.lines.values() for k in points)
+        self.vertices.update(points[i] for points in self.arcs.values() for i in (0, 2))
+
+
+def translation(old, new):
+    """The (dx, dy) translation of a moved node, rounded, so the nodes moved together have the same translation."""
+    return round(new[0] - old[0], 9), round(new[1] - old[1], 9)
+
+
+def translation_groups(moved_nodes):
+    """The moved nodes ((x0, y0), (x1, y1)) grouped by their translation, in the order of their first nodes."""
+    groups = {}
+    for old, new in moved_nodes:
+        groups.setdefault(translation(old, new), []).append((old, new))
+    return groups
+
+
+def order_moves(moves, epsilon):
+    """
+    Orders the groups of the moved nodes, so no group is moved onto the old position of a node of a later group.
+
+    The nodes of a group are selected at their old coordinates and moved together, a node moved onto the old
+    position of another group's node would be selected again with it. A group, which cannot be ordered (e.g. two
+    nodes swapping their positions), is not moved, its nodes are removed and added again.
+
+    :param moves: list of (key, (x0, y0), (x1, y1)) tuples
+    :return: the moves in the new order, the set of the keys of the nodes to be removed and added again
+    """
+    groups = {}
+    old_positions = PointIndex(epsilon)
+    for move in moves:
+        group = translation(move[1], move[2])
+        groups.setdefault(group, []).append(move)
+        old_positions.insert(*move[1], group)
+
+    # the groups, which should be moved before the group, a node of the group is moved onto their old positions
+    waiting = {h: set() for h in groups}
+    for h, group_moves in groups.items():
+        for _, _, new in group_moves:
+            g = old_positions.query(*new)
+            if g is not None and g != h:
+                waiting[h].add(g)
+
+    ordered = []
+    readded = set()
+    while waiting:
+        ready = [h for h in waiting if not waiting[h]]
+        if not ready:
+            # every group waits for another one, the blockers are followed to a group of a cycle, which is removed and
+            # added again instead of moved
+            h = next(iter(waiting))
+            visited = set()
+            while h not in visited:
+                visited.add(h)
+                h = next(iter(waiting[h]))
+            readded.update(key for key, _, _ in groups[h])
+        else:
+            h = ready[0]
+            ordered.extend(groups[h])
+        del waiting[h]
+        for blockers in waiting.values():
+            blockers.discard(h)
+
+    return ordered, readded
+
+
+def arc_angle(start, center, end):
+    """The counter-clockwise angle of the arc from the start to the end point in degrees, in the (0, 360] range."""
+    a1 = math.atan2(start[1] - center[1], start[0] - center[0])
+    a2 = math.atan2(end[1] - center[1], end[0] - center[0])
+    angle = math.degrees(a2 - a1) % 360.0
+    return angle if angle > 0.0 else 360.0
 
 
 class Geometry:
@@ -13,8 +129,26 @@ class Geometry:
         self.cubic_beziers = []
         self.epsilon = 1.0e-5
 
-    def add_object(self):
-        return
+    def new_node(self, x, y, id=None):
+        """Creates a node, which can be stored in this geometry."""
+        return Node(x, y, id)
+
+    def add_object(self, obj):
+        """
+        Stores a node or an entity as it is: the points of the entities are not added to the nodes again.
+
+        Used by the streaming importers, which yield every new node before the first entity which uses it.
+        """
+        if isinstance(obj, Node):
+            self.nodes.append(obj)
+        elif isinstance(obj, Line):
+            self.lines.append(obj)
+        elif isinstance(obj, CircleArc):
+            self.circle_arcs.append(obj)
+        elif isinstance(obj, CubicBezier):
+            self.cubic_beziers.append(obj)
+        else:
+            raise TypeError(f"The {type(obj).__name__} object cannot be stored in the geometry!")
 
     def add_node(self, node):
         self.nodes.append(node)
@@ -30,7 +164,7 @@ class Geometry:
         # save every start and end points for the geoemtry
         self.nodes.append(arc.start_pt)
         self.nodes.append(arc.end_pt)
-        self.nodes.append(arc.center)
+        self.nodes.append(arc.center_pt)
 
     def add_cubic_bezier(self, cb):
         self.cubic_beziers.append(cb)
@@ -40,23 +174,264 @@ class Geometry:
         self.nodes.append(cb.control2)
         self.nodes.append(cb.end_pt)
 
+    def editable(self):
+        """
+        The geometry of plain Node, Line, CircleArc and CubicBezier objects, which can be edited in place and
+        whose nodes can be identified by their object identity. The processing functions (bezier.flatten_beziers,
+        arc_fitting.fit_arcs, ...) work on it and store the result by apply. A Geometry gives back itself.
+        """
+        return self
+
+    def apply(self, edited):
+        """Stores the nodes and the entities of the edited geometry (see editable)."""
+        if edited is self:
+            return
+
+        self.nodes = edited.nodes
+        self.lines = edited.lines
+        self.circle_arcs = edited.circle_arcs
+        self.cubic_beziers = edited.cubic_beziers
+
     def merge_points(self):
+        """
+        Merges the nodes, which are closer to each other than epsilon.
+
+        The first node of every group is kept and the start/end/control points of the lines, circle arcs and cubic
+        beziers are re-pointed to the kept node objects. The nodes are looked up in a spatial hash, hence the merge
+        runs in linear time in the number of the nodes.
+        """
+
+        with span("merge_points"):
+            self._merge_points()
+
+    def _merge_points(self):
+        index = PointIndex(self.epsilon)
+        merged = {}  # object id of the node -> the kept node
+        kept = []
+        seen = set()  # object ids of the kept nodes, a shared endpoint is stored more than once
+        for node in self.nodes:
+            survivor = index.get_or_insert(node.x, node.y, node)
+            if survivor is node:
+                if id(node) not in seen:
+                    seen.add(id(node))
+                    kept.append(node)
+            else:
+                merged[id(node)] = survivor
+
+        count("merge_points.nodes_merged", len(self.nodes) - len(kept))
+        self.nodes = kept
+        if not merged:
+            return
+
+        for line in self.lines:
+            line.start_pt = merged.get(id(line.start_pt), line.start_pt)
+            line.end_pt = merged.get(id(line.end_pt), line.end_pt)
+
+        for arc in self.circle_arcs:
+            arc.start_pt = merged.get(id(arc.start_pt), arc.start_pt)
+            arc.center_pt = merged.get(id(arc.center_pt), arc.center_pt)
+            arc.end_pt = merged.get(id(arc.end_pt), arc.end_pt)
+
+        for cb in self.cubic_beziers:
+            cb.start_pt = merged.get(id(cb.start_pt), cb.start_pt)
+            cb.control1 = merged.get(id(cb.control1), cb.control1)
+            cb.control2 = merged.get(id(cb.control2), cb.control2)
+            cb.end_pt = merged.get(id(cb.end_pt), cb.end_pt)
+
+    def all_nodes(self):
+        """Every distinct node object of the geometry: the stored nodes and the points of the entities."""
+        seen = set()
+        result = []
+        for node in self._points():
+            if id(node) not in seen:
+                seen.add(id(node))
+                result.append(node)
+        return result
+
+    def _points(self):
+        yield from self.nodes
+        for line in self.lines:
+            yield line.start_pt
+            yield line.end_pt
+        for arc in self.circle_arcs:
+            yield arc.start_pt
+            yield arc.center_pt
+            yield arc.end_pt
+        for cb in self.cubic_beziers:
+            yield cb.start_pt
+            yield cb.control1
+            yield cb.control2
+            yield cb.end_pt
+
+    def _entity_points(self, label):
+        """Object ids of the points of the entities with the given label."""
+        points = set()
+        for line in self.lines:
+            if line.label == label:
+                points.update((id(line.start_pt), id(line.end_pt)))
+        for arc in self.circle_arcs:
+            if arc.label == label:
+                points.update((id(arc.start_pt), id(arc.center_pt), id(arc.end_pt)))
+        for cb in self.cubic_beziers:
+            if cb.label == label:
+                points.update((id(cb.start_pt), id(cb.control1), id(cb.control2), id(cb.end_pt)))
+        return points
+
+    def select_nodes(self, label=None, id_range=None, bbox=None):
+        """
+        Selects the nodes, which fulfil every given condition. Every node is selected once, even if it is shared
+        between several entities.
+
+        :param label: the label of the node or the label of an entity, which contains the node
+        :param id_range: (first, last) closed interval of the node ids
+        :param bbox: (x_min, y_min, x_max, y_max) closed bounding box of the nodes
+        """
+        nodes = self.all_nodes()
+
+        if label is not None:
+            entity_points = self._entity_points(label)
+            nodes = [node for node in nodes if node.label == label or id(node) in entity_points]
+
+        if id_range is not None:
+            first, last = id_range
+            nodes = [node for node in nodes if node.id is not None and first <= node.id <= last]
+
+        if bbox is not None:
+            x_min, y_min, x_max, y_max = bbox
+            nodes = [node for node in nodes if x_min <= node.x <= x_max and y_min <= node.y <= y_max]
+
+        return nodes
+
+    def transform(self, matrix, label=None, id_range=None, bbox=None):
+        """
+        Applies the affine transformation to the selected nodes (see select_nodes) in one vectorized step.
+
+        :param matrix: 2x3 matrix of the transformation, (x, y) -> matrix[:, :2] @ (x, y) + matrix[:, 2]
+        :return: the number of the moved nodes
+        """
+        nodes = self.select_nodes(label, id_range, bbox)
+        if not nodes:
+            return 0
+
+        matrix = np.asarray(matrix, dtype=float)
+        xy = np.empty((len(nodes), 2))
+        xy[:, 0] = [node.x for node in nodes]
+        xy[:, 1] = [node.y for node in nodes]
+        xy = xy @ matrix[:, :2].T + matrix[:, 2]
+
+        # every coordinate is rounded to the precision of its node
+        precisions = np.array([node.precision for node in nodes])
+        for precision in np.unique(precisions):
+            selected = precisions == precision
+            xy[selected] = np.round(xy[selected], int(precision)) + 0.0  # avoids -0.0
+
+        for node, (x, y) in zip(nodes, xy.tolist()):
+            node.x = x
+            node.y = y
+
+        return len(nodes)
+
+    def translate(self, dx, dy, label=None, id_range=None, bbox=None):
+        """Moves the selected nodes by (dx, dy)."""
+        return self.transform([[1.0, 0.0, dx], [0.0, 1.0, dy]], label, id_range, bbox)
+
+    def rotate(self, rad, center=(0.0, 0.0), label=None, id_range=None, bbox=None):
+        """Rotates the selected nodes counter-clockwise by rad radians around the center point."""
+        s = math.sin(rad)
+        c = math.cos(rad)
+        cx, cy = center
+        matrix = [[c, -s, cx - c * cx + s * cy], [s, c, cy - s * cx - c * cy]]
+        return self.transform(matrix, label, id_range, bbox)
+
+    def scale(self, factor, center=(0.0, 0.0), label=None, id_range=None, bbox=None):
+        """Scales the selected nodes from the center point."""
+        cx, cy = center
+        matrix = [[factor, 0.0, cx * (1.0 - factor)], [0.0, factor, cy * (1.0 - factor)]]
+        return self.transform(matrix, label, id_range, bbox)
+
+    def mirror(self, p1, p2, label=None, id_range=None, bbox=None):
+        """Mirrors the selected nodes to the line, which goes through the p1 and p2 (x, y) points."""
+        dx = p2[0] - p1[0]
+        dy = p2[1] - p1[1]
+        length = math.hypot(dx, dy)
+        if length == 0.0:
+            raise ValueError("The mirror axis is not defined by two different points!")
+
+        ux = dx / length
+        uy = dy / length
+        reflection = np.array([[2 * ux * ux - 1, 2 * ux * uy], [2 * ux * uy, 2 * uy * uy - 1]])
+        offset = np.asarray(p1, dtype=float) - reflection @ np.asarray(p1, dtype=float)
+        return self.transform(np.column_stack([reflection, offset]), label, id_range, bbox)
+
+    def object_key(self, obj):
+        """The nodes and the entities are identified by their ids, the objects without id by their identity."""
+        return ("object", id(obj)) if obj.id is None else obj.id
+
+    def snapshot(self):
+        """Saves the state of the nodes, lines and circle arcs, the changes since the snapshot are given by diff."""
+        return GeometrySnapshot(self)
+
+    def diff(self, snapshot):
+        """
+        The nodes and entities added, removed and moved since the snapshot.
+
+        A line follows its moved nodes. An arc follows its moved end points only if its angle does not change, else
+        it is removed and added again. An entity re-pointed to other nodes is removed and added again. The moved
+        nodes are given in the order of their translations, which cannot be ordered are removed and added again with
+        their entities, see order_moves.
+
+        :return: GeometryDiff, the removed objects are given by their old coordinates, the others by the new ones
+        """
+        current = GeometrySnapshot(self)
+        old_nodes = snapshot.nodes
+        new_nodes = current.nodes
+
+        added_nodes = [new_nodes[k] for k in new_nodes if k in current.vertices and k not in snapshot.vertices]
+        removed_nodes = [old_nodes[k] for k in old_nodes if k in snapshot.vertices and k not in current.vertices]
+        moves = []
+        for k in new_nodes:
+            if k in current.vertices and k in snapshot.vertices:
+                old = old_nodes[k]
+                xy = new_nodes[k]
+                if abs(xy[0] - old[0]) > self.epsilon or abs(xy[1] - old[1]) > self.epsilon:
+                    moves.append((k, old, xy))
 
-        for i in range(len(self.nodes) - 1):
-            for j in range(len(self.nodes) - 1, i, -1):
-                if self.nodes[i].distance_to(self.nodes[j]) < self.epsilon:
+        moves, readded = order_moves(moves, self.epsilon)
+        moved_nodes = [(old, xy) for _, old, xy in moves]
+        removed_nodes.extend(old_nodes[k] for k in new_nodes if k in readded)
+        added_nodes.extend(new_nodes[k] for k in new_nodes if k in readded)
 
-                    # renumber the start/end points of the different shape elements
-                    for line in self.lines:
-                        if line.start_pt.id == self.nodes[j].id:
-                            line.start_pt.id = self.nodes[i].id
+        added_lines = []
+        removed_lines = []
+        for k, points in current.lines.items():
+            old = snapshot.lines.get(k)
+            if old != points or readded.intersection(points):
+                added_lines.append(new_nodes[points[0]] + new_nodes[points[1]])
+                if old is not None:
+                    removed_lines.append(old_nodes[old[0]] + old_nodes[old[1]])
+        for k, old in snapshot.lines.items():
+            if k not in current.lines:
+                removed_lines.append(old_nodes[old[0]] + old_nodes[old[1]])
 
-                        if line.end_pt.id == self.nodes[j].id:
-                            line.end_pt.id = self.nodes[i].id
+        added_arcs = []
+        removed_arcs = []
+        for k, points in current.arcs.items():
+            old = snapshot.arcs.get(k)
+            new_arc = tuple(new_nodes[point] for point in points)
+            if old is not None:
+                old_arc = tuple(old_nodes[point] for point in old)
+                if old == points and abs(arc_angle(*old_arc) - arc_angle(*new_arc)) <= 1.0e-9:
+                    if not readded.intersection(points):
+                        continue
+                removed_arcs.append(old_arc)
+            added_arcs.append(new_arc)
+        for k, old in snapshot.arcs.items():
+            if k not in current.arcs:
+                removed_arcs.append(tuple(old_nodes[point] for point in old))
 
-                    del self.nodes[j]
-            # if node_1.distance_to(node_2) < self.epsilon:
-            #    print(i)
+        return GeometryDiff(
+            added_nodes, removed_nodes, moved_nodes, added_lines, removed_lines, added_arcs, removed_arcs
+        )
 
     def meshi_it(self, mesh_strategy):
         mesh = mesh_strategy(self.nodes, self.lines, self.circle_arcs, self.cubic_beziers)
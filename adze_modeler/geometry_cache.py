@@ -0,0 +1,131 @@
+"""
+Content-addressed, persistent cache of the imported geometries.
+
+The key of an entry is the hash of the content of the imported file and the import options, hence a modified file
+is imported again, but a renamed or copied file is not. An entry is a directory of .npy files (see
+array_geometry.to_arrays), which are opened as memory-mapped arrays. The least recently used entries are removed,
+when the size of the cache exceeds the given limit.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.array_geometry import from_arrays
+from adze_modeler.array_geometry import to_arrays
+from adze_modeler.dxf_handlers import import_dxf_stream
+from adze_modeler.svg_handlers import import_svg_stream
+
+CACHE_FORMAT = 1  # changing the format of the entries invalidates the old entries
+ARRAY_NAMES = ("x", "y", "node_ids", "lines", "line_ids", "arcs", "arc_ids", "beziers", "bezier_ids")
+
+
+class GeometryCache:
+    """Stores the merged geometries of the imported svg and DXF files on the disk."""
+
+    def __init__(self, directory, max_bytes=512 * 1024**2):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, file_name, epsilon=1.0e-5, precision=6):
+        """The hash of the content of the file and the import options."""
+        digest = hashlib.sha256()
+        with open(file_name, "rb") as content:
+            for chunk in iter(lambda: content.read(1 << 20), b""):
+                digest.update(chunk)
+
+        extension = os.path.splitext(os.fspath(file_name))[1].lower()
+        digest.update(f"|{extension}|{epsilon!r}|{precision!r}|{CACHE_FORMAT}".encode())
+        return digest.hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """Opens the geometry of the entry memory-mapped (copy-on-write), returns None if it is not in the cache."""
+        entry = self.entry(key)
+        if not os.path.isdir(entry):
+            return None
+
+        arrays = {name: np.load(os.path.join(entry, name + ".npy"), mmap_mode="c") for name in ARRAY_NAMES}
+        os.utime(entry)  # the modification time of the entry is its last use
+        return from_arrays(arrays, copy=False)
+
+    def store(self, key, geometry):
+        """Saves the geometry into the cache and removes the least recently used entries if the cache is too big."""
+        arrays = to_arrays(geometry)
+        temp = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            for name in ARRAY_NAMES:
+                np.save(os.path.join(temp, name + ".npy"), arrays[name])
+            os.rename(temp, self.entry(key))
+        except OSError:
+            # an other process has stored the same entry in the meantime
+            shutil.rmtree(temp, ignore_errors=True)
+
+        self.evict()
+
+    def entries(self):
+        """List of (last use, size in bytes, path) of the entries."""
+        result = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            result.append((os.stat(path).st_mtime, size, path))
+        return result
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Removes the least recently used entries until the size of the cache is below max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def import_file(self, file_name, epsilon=1.0e-5, precision=6):
+        """
+        Gives back the merged geometry of an svg or DXF file, the file is parsed only if it is not in the cache.
+
+        :param epsilon: the nodes closer than epsilon are merged during the import
+        :param precision: the number of digits of the coordinates after the transformations of the geometry
+        :return: ArrayGeometry
+        """
+        key = self.key(file_name, epsilon, precision)
+        geometry = self.load(key)
+        if geometry is not None:
+            self.hits += 1
+            geometry.store.precision = precision
+            geometry.epsilon = epsilon
+            return geometry
+
+        self.misses += 1
+        geometry = ArrayGeometry()
+        geometry.epsilon = epsilon
+        geometry.store.precision = precision
+
+        extension = os.path.splitext(os.fspath(file_name))[1].lower()
+        if extension == ".svg":
+            import_svg_stream(os.fspath(file_name), geometry, epsilon)
+        elif extension == ".dxf":
+            import_dxf_stream(os.fspath(file_name), geometry, epsilon)
+        else:
+            raise ValueError(f"Unknown file type: {file_name}")
+
+        self.store(key, geometry)
+        return geometry
@@ -1,4 +1,7 @@
 import pygmsh.geo as gmsh
+from adze_modeler.instrumentation import count
+from adze_modeler.instrumentation import span
+from adze_modeler.point_index import PointIndex
 
 
 def node_gmsh_point_distance(node, point):
@@ -11,42 +14,38 @@ def node_gmsh_point_distance(node, point):
 def gmsh_writer(nodes, lines, arcs, cubic_beziers):
     lcar = 5.0
     epsilon = 1e-6
-    with gmsh.Geometry() as geom:
-        # add nodes
-        points = []
+    with span("gmsh_writer"), gmsh.Geometry() as geom:
+        # add nodes, the points are indexed by the node objects and by their coordinates
+        points = {}
+        index = PointIndex(epsilon)
         for node in nodes:
             temp = geom.add_point([node.x, node.y], lcar)
-            # temp._id = node.id
-            points.append(temp)
+            points[id(node)] = temp
+            index.insert(node.x, node.y, temp)
+
+        def point_of(node):
+            point = points.get(id(node))
+            if point is None:
+                point = index.query(node.x, node.y)
+            if point is None:
+                raise ValueError(f"There is no gmsh point for the node {node}, it is not in the list of nodes.")
+            return point
 
         # add lines
         glines = []
         for line in lines:
-            for i in range(len(points)):
-                if node_gmsh_point_distance(line.start_pt, points[i]) < epsilon:
-                    start_pt = points[i]
-
-                if node_gmsh_point_distance(line.end_pt, points[i]) < epsilon:
-                    end_pt = points[i]
-
-            temp = geom.add_line(p0=start_pt, p1=end_pt)
+            temp = geom.add_line(p0=point_of(line.start_pt), p1=point_of(line.end_pt))
             glines.append(temp)
 
         # add cubic beziers
         gbeziers = []
         for cb in cubic_beziers:
-            for i in range(len(points)):
-                if node_gmsh_point_distance(cb.start_pt, points[i]) < epsilon:
-                    start_pt = points[i]
-                if node_gmsh_point_distance(cb.end_pt, points[i]) < epsilon:
-                    end_pt = points[i]
-                if node_gmsh_point_distance(cb.control1, points[i]) < epsilon:
-                    control1 = points[i]
-                if node_gmsh_point_distance(cb.control2, points[i]) < epsilon:
-                    control2 = points[i]
-
-            temp = geom.add_bspline([start_pt, control1, control2, end_pt])
+            control_points = [point_of(cb.start_pt), point_of(cb.control1), point_of(cb.control2), point_of(cb.end_pt)]
+            temp = geom.add_bspline(control_points)
             gbeziers.append(temp)
+
+        count("gmsh_writer.points", len(nodes))
+        count("gmsh_writer.entities", len(glines) + len(gbeziers))
         # ll = geom.add_curve_loop(glines)
         # pl = geom.add_plane_surface(ll)
 
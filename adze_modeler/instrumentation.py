@@ -0,0 +1,135 @@
+"""
+Opt-in instrumentation of the pipeline: named spans and counters.
+
+The import, merge, meshing, script writing and FEMM run steps are wrapped into spans, which measure their wall time,
+and they increment counters, e.g. the number of the imported entities, the merged nodes or the written bytes. The
+instrumentation is disabled by default, then span returns a shared no-op context manager and count returns at once,
+so the instrumented functions cost only a function call more.
+
+    from adze_modeler import instrumentation
+
+    instrumentation.enable()
+    geo = import_svg("model.svg")
+    ...
+    print(instrumentation.summary())
+    instrumentation.write_json("profile.json")
+
+The finished spans are logged to the "adze_modeler.instrumentation" logger on the DEBUG level, with the name and the
+duration of the span in the extra fields of the record.
+"""
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+enabled = False
+
+_lock = threading.Lock()
+_spans = {}  # name -> [count, total time, min time, max time]
+_counters = {}
+
+
+class _NullSpan:
+    """The span of the disabled instrumentation."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class Span:
+    """Measures the wall time between entering and leaving the span."""
+
+    __slots__ = ("name", "start", "elapsed")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+        with _lock:
+            stats = _spans.get(self.name)
+            if stats is None:
+                _spans[self.name] = [1, self.elapsed, self.elapsed, self.elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += self.elapsed
+                stats[2] = min(stats[2], self.elapsed)
+                stats[3] = max(stats[3], self.elapsed)
+
+        logger.debug("%s: %.6f s", self.name, self.elapsed, extra={"span": self.name, "elapsed": self.elapsed})
+        return False
+
+
+def span(name):
+    """
+    Context manager, which records the duration of the enclosed block under the given name.
+
+    :param name: dotted name of the step, e.g. "import_svg" or "femm.run"
+    """
+    if not enabled:
+        return _null_span
+
+    return Span(name)
+
+
+def count(name, value=1):
+    """Adds the value to the named counter."""
+    if not enabled:
+        return
+
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Clears the recorded spans and counters."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def summary():
+    """
+    The recorded spans and counters.
+
+    :return: dict with a "spans" dict of {name: {"count", "total", "min", "max", "mean"}} (the times are in seconds)
+             and a "counters" dict of {name: value}
+    """
+    with _lock:
+        spans = {
+            name: {"count": n, "total": total, "min": low, "max": high, "mean": total / n}
+            for name, (n, total, low, high) in _spans.items()
+        }
+        return {"spans": spans, "counters": dict(_counters)}
+
+
+def write_json(file_name):
+    """Writes the summary into a JSON file."""
+    with open(file_name, "w") as f:
+        json.dump(summary(), f, indent=2, sort_keys=True)
@@ -0,0 +1,764 @@
+"""
+Intersection tests of many line segments and arcs, and the repair of the geometry into a planar graph.
+
+Two broad phases give the candidate pairs of the exact tests. The sort and sweep (candidate_pairs) sorts the bounding
+boxes by the left ends of their x intervals, the candidates of an entity are the following entities, which start
+before it ends, the pairs are generated with NumPy and filtered by the overlap of their y intervals. It is
+O(n log n + c), where c is the number of the pairs whose x intervals overlap, which is small for the drawings, where
+most of the entities are short, but quadratic for many long entities (e.g. long parallel or radial lines).
+
+The sweep line (SweepLine, sweep_pairs) is a Bentley-Ottmann sweep: the x-monotone pieces of the lines and arcs are
+kept in a list ordered by their y at the sweep position, only the neighbours of the list are tested and the crossing
+neighbours are swapped at their intersection events, hence it runs in O((n + k) log n) for k common points. It is
+done in pure Python, planarize uses it when the sort and sweep would give much more candidates than entities.
+"""
+import heapq
+import itertools
+import math
+from collections import namedtuple
+
+import numpy as np
+from adze_modeler.geometry import arc_angle
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.point_index import PointIndex
+
+PlanarReport = namedtuple("PlanarReport", ["intersections", "entities_before", "entities_after"])
+
+DENSE_RATIO = 16  # planarize uses the sweep line above this many sort and sweep candidates per entity
+
+
+def sweep_counts(xmin, xmax):
+    """
+    The sweep order of the boxes and the number of the following boxes in that order, whose x interval overlaps.
+
+    :return: (order, counts) arrays, counts.sum() is the number of the candidate pairs of the sort and sweep
+    """
+    order = np.argsort(xmin, kind="stable")
+    ends = np.searchsorted(xmin[order], xmax[order], side="right")
+    return order, np.maximum(ends - np.arange(len(order)) - 1, 0)
+
+
+def candidate_pairs(xmin, xmax, ymin, ymax, chunk_size=1_000_000):
+    """
+    Yields the pairs of the boxes, whose x and y intervals overlap.
+
+    :param xmin, xmax, ymin, ymax: arrays of the bounding boxes
+    :param chunk_size: the approximate number of the pairs, which are generated at once, a chunk has at most
+                       max(chunk_size, n - 1) pairs
+    :return: iterator of (i, j) index arrays, i < j in the sweep order
+    """
+    order, counts = sweep_counts(xmin, xmax)
+    totals = np.cumsum(counts)
+
+    first = 0
+    while first < len(order):
+        last = int(np.searchsorted(totals, totals[first] - counts[first] + chunk_size, side="right"))
+        last = min(max(last, first + 1), len(order))
+        chunk = counts[first:last]
+        nr_pairs = int(chunk.sum())
+        if nr_pairs:
+            i = np.repeat(np.arange(first, last), chunk)
+            j = i + 1 + np.arange(nr_pairs) - np.repeat(np.cumsum(chunk) - chunk, chunk)
+            i = order[i]
+            j = order[j]
+            overlap = (ymin[i] <= ymax[j]) & (ymin[j] <= ymax[i])
+            yield i[overlap], j[overlap]
+        first = last
+
+
+def orientation(ax, ay, bx, by, cx, cy):
+    """The sign of the turn a -> b -> c: positive counter-clockwise, negative clockwise, zero for collinear points."""
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def crossing_pairs(start, end, keys=None, chunk_size=1_000_000):
+    """
+    Finds the pairs of the intersecting segments.
+
+    :param start: (n, 2) array of the start points of the segments
+    :param end: (n, 2) array of the end points
+    :param keys: (n, 2) array of the node keys of the endpoints, the pairs with a common endpoint are not reported
+    :return: (m, 2) array of the indices of the intersecting segments
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    xmin = np.minimum(start[:, 0], end[:, 0])
+    xmax = np.maximum(start[:, 0], end[:, 0])
+    ymin = np.minimum(start[:, 1], end[:, 1])
+    ymax = np.maximum(start[:, 1], end[:, 1])
+
+    pairs = []
+    for i, j in candidate_pairs(xmin, xmax, ymin, ymax, chunk_size):
+        if keys is not None:
+            shared = (keys[i, 0] == keys[j, 0]) | (keys[i, 0] == keys[j, 1])
+            shared |= (keys[i, 1] == keys[j, 0]) | (keys[i, 1] == keys[j, 1])
+            i = i[~shared]
+            j = j[~shared]
+
+        ax, ay, bx, by = start[i, 0], start[i, 1], end[i, 0], end[i, 1]
+        cx, cy, dx, dy = start[j, 0], start[j, 1], end[j, 0], end[j, 1]
+        crossing = (orientation(ax, ay, bx, by, cx, cy) * orientation(ax, ay, bx, by, dx, dy) <= 0) & (
+            orientation(cx, cy, dx, dy, ax, ay) * orientation(cx, cy, dx, dy, bx, by) <= 0
+        )
+        pairs.append(np.column_stack([i[crossing], j[crossing]]))
+
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+
+    return np.concatenate(pairs)
+
+
+class ArcShape:
+    """The circle, the start angle and the counter-clockwise sweep of a CircleArc in radians."""
+
+    __slots__ = ("cx", "cy", "radius", "start", "sweep")
+
+    def __init__(self, arc):
+        self.cx = arc.center_pt.x
+        self.cy = arc.center_pt.y
+        self.radius = math.hypot(arc.start_pt.x - self.cx, arc.start_pt.y - self.cy)
+        self.start = math.atan2(arc.start_pt.y - self.cy, arc.start_pt.x - self.cx)
+        self.sweep = math.radians(
+            arc_angle((arc.start_pt.x, arc.start_pt.y), (self.cx, self.cy), (arc.end_pt.x, arc.end_pt.y))
+        )
+
+    def offset(self, x, y):
+        """The counter-clockwise angle of the point from the start of the arc, in the [0, 2 pi) range."""
+        return (math.atan2(y - self.cy, x - self.cx) - self.start) % (2.0 * math.pi)
+
+    def contains(self, x, y, epsilon):
+        """Checks whether a point of the circle is on the arc."""
+        offset = self.offset(x, y)
+        slack = epsilon / self.radius if self.radius > 0.0 else 0.0
+        return offset <= self.sweep + slack or offset >= 2.0 * math.pi - slack
+
+    def bbox(self):
+        xs = [self.cx + self.radius * math.cos(self.start), self.cx + self.radius * math.cos(self.start + self.sweep)]
+        ys = [self.cy + self.radius * math.sin(self.start), self.cy + self.radius * math.sin(self.start + self.sweep)]
+        for k in range(4):
+            if (k * math.pi / 2.0 - self.start) % (2.0 * math.pi) <= self.sweep:
+                xs.append(self.cx + self.radius * math.cos(k * math.pi / 2.0))
+                ys.append(self.cy + self.radius * math.sin(k * math.pi / 2.0))
+        return min(xs), max(xs), min(ys), max(ys)
+
+
+def line_line_points(a, b, c, d, epsilon):
+    """
+    The common points of the line segments a-b and c-d.
+
+    :param a, b, c, d: (m, 2) arrays of the endpoints of the pairs
+    :return: the index of the pair and the (x, y) coordinates of the common points, the overlapping collinear segments
+             give the endpoints inside the other segment
+    """
+    r = b - a
+    q = d - c
+    ac = c - a
+    denominator = r[:, 0] * q[:, 1] - r[:, 1] * q[:, 0]
+    length_r = np.hypot(r[:, 0], r[:, 1])
+    length_q = np.hypot(q[:, 0], q[:, 1])
+    parallel = np.abs(denominator) <= 1.0e-12 * length_r * length_q
+
+    pairs = []
+    points = []
+
+    # crossing segments
+    safe = np.where(parallel, 1.0, denominator)
+    t = (ac[:, 0] * q[:, 1] - ac[:, 1] * q[:, 0]) / safe
+    u = (ac[:, 0] * r[:, 1] - ac[:, 1] * r[:, 0]) / safe
+    slack_t = epsilon / np.maximum(length_r, epsilon)
+    slack_u = epsilon / np.maximum(length_q, epsilon)
+    crossing = ~parallel & (t >= -slack_t) & (t <= 1.0 + slack_t) & (u >= -slack_u) & (u <= 1.0 + slack_u)
+    pairs.append(np.flatnonzero(crossing))
+    points.append(a[crossing] + t[crossing, np.newaxis] * r[crossing])
+
+    # overlapping collinear segments, the endpoints of a segment inside the other one
+    collinear = parallel & (np.abs(ac[:, 0] * r[:, 1] - ac[:, 1] * r[:, 0]) <= epsilon * np.maximum(length_r, epsilon))
+    for p, base, direction, length in (
+        (c, a, r, length_r),
+        (d, a, r, length_r),
+        (a, c, q, length_q),
+        (b, c, q, length_q),
+    ):
+        offset = ((p - base) * direction).sum(axis=1) / np.maximum(length, epsilon) ** 2
+        inside = collinear & (offset > 0.0) & (offset < 1.0)
+        pairs.append(np.flatnonzero(inside))
+        points.append(p[inside])
+
+    return np.concatenate(pairs), np.concatenate(points)
+
+
+def line_arc_points(a, b, shape, epsilon):
+    """The common points of the line segment a-b and the arc."""
+    rx, ry = b[0] - a[0], b[1] - a[1]
+    fx, fy = a[0] - shape.cx, a[1] - shape.cy
+    aa = rx * rx + ry * ry
+    if aa == 0.0:
+        return []
+
+    bb = 2.0 * (fx * rx + fy * ry)
+    cc = fx * fx + fy * fy - shape.radius**2
+    discriminant = bb * bb - 4.0 * aa * cc
+    slack = epsilon / math.sqrt(aa)
+    if discriminant < -2.0 * epsilon * shape.radius * 4.0 * aa:
+        return []
+
+    root = math.sqrt(max(discriminant, 0.0))
+    points = []
+    for t in {(-bb - root) / (2.0 * aa), (-bb + root) / (2.0 * aa)}:
+        if -slack <= t <= 1.0 + slack:
+            x, y = float(a[0] + t * rx), float(a[1] + t * ry)
+            if shape.contains(x, y, epsilon):
+                points.append((x, y))
+    return points
+
+
+def arc_arc_points(first, second, epsilon):
+    """The common points of two arcs, the overlapping arcs of the same circle give the endpoints inside the other."""
+    dx, dy = second.cx - first.cx, second.cy - first.cy
+    distance = math.hypot(dx, dy)
+    if distance <= epsilon:
+        if abs(first.radius - second.radius) > epsilon:
+            return []
+
+        points = []
+        for shape, other in ((first, second), (second, first)):
+            for angle in (shape.start, shape.start + shape.sweep):
+                x, y = shape.cx + shape.radius * math.cos(angle), shape.cy + shape.radius * math.sin(angle)
+                if other.contains(x, y, epsilon):
+                    points.append((x, y))
+        return points
+
+    if distance > first.radius + second.radius + epsilon or distance < abs(first.radius - second.radius) - epsilon:
+        return []
+
+    along = (first.radius**2 - second.radius**2 + distance**2) / (2.0 * distance)
+    height = math.sqrt(max(first.radius**2 - along**2, 0.0))
+    mx, my = first.cx + along * dx / distance, first.cy + along * dy / distance
+    points = []
+    for sign in (1.0, -1.0) if height > 0.0 else (1.0,):
+        x, y = mx - sign * height * dy / distance, my + sign * height * dx / distance
+        if first.contains(x, y, epsilon) and second.contains(x, y, epsilon):
+            points.append((x, y))
+    return points
+
+
+# the kinds of the sweep events, the events at the same x are processed in this order
+INSERT, CROSS, POINT, VERTICAL, REMOVE = range(5)
+
+
+class SweepPiece:
+    """
+    An x-monotone piece of a line or a circle arc in the frame of a sweep: y = y + slope * (x - x) for a line and
+    y = cy + sign * sqrt(radius^2 - (x - cx)^2) for an arc. The x interval [x0, x1] is extended by the tolerance at
+    both ends, so the entities, which only touch at an end, are in the sweep together.
+    """
+
+    __slots__ = ("entity", "x0", "x1", "x", "y", "slope", "cx", "cy", "radius", "sign", "active")
+
+    def __init__(self, entity, x0, x1):
+        self.entity = entity
+        self.x0 = x0
+        self.x1 = x1
+        self.x = self.y = self.slope = None
+        self.cx = self.cy = self.radius = self.sign = None
+        self.active = False
+
+    def y_at(self, x):
+        if self.radius is None:
+            return self.y + self.slope * (x - self.x)
+
+        return self.cy + self.sign * math.sqrt(max(self.radius**2 - (x - self.cx) ** 2, 0.0))
+
+    def slope_at(self, x):
+        if self.radius is None:
+            return self.slope
+
+        dx = x - self.cx
+        height = math.sqrt(max(self.radius**2 - dx**2, 0.0))
+        if height == 0.0:
+            return -self.sign * math.copysign(math.inf, dx)
+        return -self.sign * dx / height
+
+
+def line_circle_xs(line, arc, tolerance):
+    """The x coordinates of the common points of the line of a piece and the half circle of an arc piece."""
+    length = math.hypot(1.0, line.slope)
+    ux, uy = 1.0 / length, line.slope / length
+    wx, wy = arc.cx - line.x, arc.cy - line.y
+    along = wx * ux + wy * uy
+    distance = wx * wx + wy * wy - along * along
+    if distance > (arc.radius + tolerance) ** 2:
+        return []
+
+    half = math.sqrt(max(arc.radius**2 - distance, 0.0))
+    xs = []
+    for t in (along - half, along + half):
+        x, y = line.x + t * ux, line.y + t * uy
+        if arc.sign * (y - arc.cy) >= -tolerance:
+            xs.append(x)
+    return xs
+
+
+def circle_circle_xs(first, second, tolerance):
+    """The x coordinates of the common points of the half circles of two arc pieces."""
+    dx, dy = second.cx - first.cx, second.cy - first.cy
+    distance = math.hypot(dx, dy)
+    if distance <= tolerance:
+        return []
+
+    if distance > first.radius + second.radius + tolerance:
+        return []
+    if distance < abs(first.radius - second.radius) - tolerance:
+        return []
+
+    along = (first.radius**2 - second.radius**2 + distance**2) / (2.0 * distance)
+    height = math.sqrt(max(first.radius**2 - along**2, 0.0))
+    mx, my = first.cx + along * dx / distance, first.cy + along * dy / distance
+    xs = []
+    for sign in (1.0, -1.0):
+        x, y = mx - sign * height * dy / distance, my + sign * height * dx / distance
+        if first.sign * (y - first.cy) >= -tolerance and second.sign * (y - second.cy) >= -tolerance:
+            xs.append(x)
+    return xs
+
+
+def piece_crossings(first, second, tolerance):
+    """The sorted x coordinates of the common points of two pieces inside their common x interval."""
+    lo = max(first.x0, second.x0)
+    hi = min(first.x1, second.x1)
+    if lo > hi:
+        return []
+
+    if first.radius is None and second.radius is None:
+        difference = first.slope - second.slope
+        if difference == 0.0:
+            return []
+        xs = [(second.y - first.y + first.slope * first.x - second.slope * second.x) / difference]
+    elif first.radius is None:
+        xs = line_circle_xs(first, second, tolerance)
+    elif second.radius is None:
+        xs = line_circle_xs(second, first, tolerance)
+    else:
+        xs = circle_circle_xs(first, second, tolerance)
+
+    return sorted(x for x in xs if lo <= x <= hi)
+
+
+class SweepLine:
+    """
+    Bentley-Ottmann sweep of lines and arcs from left to right, it collects the pairs of the entities, which may have
+    a common point.
+
+    The status is a list of the pieces, which cross the sweep line, ordered by their y at the sweep position. A new
+    piece is tested with its neighbours, the neighbours are swapped at their common point and tested with their new
+    neighbours, hence every intersecting pair becomes adjacent before its leftmost common point. At an intersection
+    event every piece closer to the point than the tolerance is reordered together, so the common points of many
+    entities are processed only once. The nodes (the endpoints of the entities) are looked up in the status, the
+    pieces closer to them than the tolerance are candidates, too.
+
+    The status is a plain list searched by bisection, its insertions and deletions move the pointers with a memmove,
+    which is negligible next to the Python comparisons even for 10^5 pieces.
+
+    The vertical lines (and the pieces narrower than the tolerance) are not put into the status, they query the
+    pieces in their y interval. A single sweep measures the distances vertically, sweep_pairs runs a second one in
+    the transposed frame, so the steep entities are close to a node in the frame, where they are not steep.
+    """
+
+    def __init__(self, epsilon):
+        self.epsilon = epsilon
+        self.band = 2.0 * epsilon
+        self.status = []
+        self.events = []
+        self.nodes = {}  # entity -> [(node id, x, y) of its endpoints]
+        self.points = {}  # node id -> [x, y, the entities of the endpoint]
+        self.scheduled = set()
+        self.processed = set()
+        self.pairs = set()
+        self.counter = itertools.count()  # breaks the ties of the events, the pieces are not compared
+
+    def push(self, x, kind, *payload):
+        self.events.append((x, kind, next(self.counter), payload))
+
+    def add_endpoints(self, entity, endpoints):
+        """Registers the (node id, x, y) endpoints of an entity."""
+        self.nodes[entity] = endpoints
+        for node, x, y in endpoints:
+            self.points.setdefault(node, [x, y, set()])[2].add(entity)
+
+    def add_line(self, entity, x0, y0, x1, y1):
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+
+        if x1 - x0 <= self.epsilon:
+            self.push(0.5 * (x0 + x1), VERTICAL, min(y0, y1), max(y0, y1), entity)
+            return
+
+        extension = self.band * (x1 - x0) / math.hypot(x1 - x0, y1 - y0)
+        piece = SweepPiece(entity, x0 - extension, x1 + extension)
+        piece.x, piece.y, piece.slope = x0, y0, (y1 - y0) / (x1 - x0)
+        self.add_piece(piece)
+
+    def add_arc(self, entity, cx, cy, radius, start, sweep):
+        """Adds the x-monotone pieces of the arc, which turns counter-clockwise from the start angle (in radians)."""
+        if radius <= self.epsilon:
+            self.push(cx, VERTICAL, cy - radius, cy + radius, entity)
+            return
+
+        # the arc is split at its leftmost and rightmost points
+        angles = [start]
+        k = math.floor(start / math.pi) + 1
+        while k * math.pi < start + sweep:
+            angles.append(k * math.pi)
+            k += 1
+        angles.append(start + sweep)
+
+        for t0, t1 in zip(angles, angles[1:]):
+            low, high = sorted((cx + radius * math.cos(t0), cx + radius * math.cos(t1)))
+            if high - low <= self.epsilon:
+                ys = [math.sin(t0), math.sin(t1)]
+                ys.extend(math.sin(t) for t in (0.5 * math.pi, 1.5 * math.pi, 2.5 * math.pi) if t0 < t < t1)
+                self.push(0.5 * (low + high), VERTICAL, cy + radius * min(ys), cy + radius * max(ys), entity)
+                continue
+
+            piece = SweepPiece(entity, max(low - self.band, cx - radius), min(high + self.band, cx + radius))
+            piece.cx, piece.cy, piece.radius = cx, cy, radius
+            piece.sign = 1.0 if math.sin(0.5 * (t0 + t1)) > 0.0 else -1.0
+            self.add_piece(piece)
+
+    def add_piece(self, piece):
+        self.push(piece.x0, INSERT, piece)
+        self.push(piece.x1, REMOVE, piece)
+
+    def add_pair(self, first, second):
+        if first != second:
+            self.pairs.add((first, second) if first < second else (second, first))
+
+    def node_at(self, entity, x, y):
+        """The id of an endpoint of the entity closer to the point than the tolerance, or None."""
+        for node, nx, ny in self.nodes[entity]:
+            if abs(nx - x) <= self.band and abs(ny - y) <= self.band:
+                return node
+        return None
+
+    def lower_bound(self, x, y):
+        """The position of the first piece in the status, which is above y at x."""
+        status = self.status
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if status[mid].y_at(x) < y:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def index_of(self, piece, x):
+        status = self.status
+        y = piece.y_at(x)
+        i = self.lower_bound(x, y - self.band)
+        while i < len(status) and status[i].y_at(x) <= y + self.band:
+            if status[i] is piece:
+                return i
+            i += 1
+
+        # the rounding errors of the intersection events can leave the piece a bit out of order
+        return status.index(piece)
+
+    def schedule(self, below, above, x):
+        """Adds the next intersection event of two neighbouring pieces."""
+        if below.entity == above.entity:
+            return
+
+        for crossing in piece_crossings(below, above, self.band):
+            if crossing >= x:
+                key = (id(below), id(above), round(crossing / self.band))
+                if key not in self.scheduled:
+                    self.scheduled.add(key)
+                    heapq.heappush(self.events, (crossing, CROSS, next(self.counter), (below, above)))
+                return
+
+    def schedule_around(self, lo, hi, x):
+        status = self.status
+        for k in range(max(lo - 1, 0), min(hi, len(status) - 1)):
+            self.schedule(status[k], status[k + 1], x)
+
+    def insert(self, piece, x):
+        status = self.status
+        y = piece.y_at(x)
+        slope = piece.slope_at(x)
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = status[mid].y_at(x)
+            if other < y or (other == y and status[mid].slope_at(x) < slope):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        status.insert(lo, piece)
+        piece.active = True
+        self.schedule_around(lo, lo + 1, x)
+
+    def remove(self, piece, x):
+        i = self.index_of(piece, x)
+        del self.status[i]
+        piece.active = False
+        self.schedule_around(i, i, x)
+
+    def cross(self, below, above, x):
+        """Reorders the pieces around the common point and collects their pairs."""
+        y = below.y_at(x)
+        key = (round(x / self.band), round(y / self.band))
+        if key in self.processed:
+            return
+        self.processed.add(key)
+
+        status = self.status
+        lo = self.lower_bound(x, y - self.band)
+        hi = lo
+        while hi < len(status) and status[hi].y_at(x) <= y + self.band:
+            hi += 1
+        for piece in (below, above):
+            i = self.index_of(piece, x)
+            lo, hi = min(lo, i), max(hi, i + 1)
+
+        after = x + self.epsilon
+        status[lo:hi] = sorted(status[lo:hi], key=lambda piece: piece.y_at(after))
+
+        # the entities with a common endpoint at the point do not need to be split there
+        free = []
+        groups = {}
+        for piece in status[lo:hi]:
+            node = self.node_at(piece.entity, x, y)
+            if node is None:
+                free.append(piece.entity)
+            else:
+                groups.setdefault(node, []).append(piece.entity)
+
+        grouped = list(groups.values())
+        for k, entity in enumerate(free):
+            for other in free[k + 1 :]:
+                self.add_pair(entity, other)
+            for group in grouped:
+                for other in group:
+                    self.add_pair(entity, other)
+        for k, group in enumerate(grouped):
+            for other_group in grouped[k + 1 :]:
+                for entity in group:
+                    for other in other_group:
+                        self.add_pair(entity, other)
+
+        self.schedule_around(lo, hi, x)
+
+    def point(self, x, y, entities):
+        """Collects the pieces closer to a node than the tolerance."""
+        status = self.status
+        i = self.lower_bound(x, y - self.band)
+        while i < len(status) and status[i].y_at(x) <= y + self.band:
+            other = status[i].entity
+            if other not in entities:
+                for entity in entities:
+                    self.add_pair(entity, other)
+            i += 1
+
+    def vertical(self, x, low, high, entity):
+        """Collects the pieces, which cross a vertical line."""
+        status = self.status
+        i = self.lower_bound(x, low - self.band)
+        while i < len(status):
+            y = status[i].y_at(x)
+            if y > high + self.band:
+                break
+
+            other = status[i].entity
+            node = self.node_at(other, x, y)
+            if node is None or node not in (shared for shared, _, _ in self.nodes[entity]):
+                self.add_pair(entity, other)
+            i += 1
+
+    def run(self):
+        """
+        Runs the sweep.
+
+        :return: set of the (i, j) pairs of the entities, i < j
+        """
+        for node, (x, y, entities) in self.points.items():
+            self.push(x, POINT, y, entities)
+
+        events = self.events
+        heapq.heapify(events)
+        while events:
+            x, kind, _, payload = heapq.heappop(events)
+            if kind == INSERT:
+                self.insert(payload[0], x)
+            elif kind == CROSS:
+                if payload[0].active and payload[1].active:
+                    self.cross(payload[0], payload[1], x)
+            elif kind == POINT:
+                self.point(x, *payload)
+            elif kind == VERTICAL:
+                self.vertical(x, *payload)
+            else:
+                self.remove(payload[0], x)
+
+        return self.pairs
+
+
+def sweep_pairs(lines, arcs, epsilon):
+    """
+    Finds the pairs of the entities, which may have a common point, with two sweeps: from left to right and from
+    bottom to top (in the transposed frame).
+
+    :param lines: list of Line
+    :param arcs: list of CircleArc
+    :return: (i, j) index arrays, the arcs are indexed after the lines
+    """
+    shapes = [ArcShape(arc) for arc in arcs]
+    pairs = set()
+    for transposed in (False, True):
+
+        def frame(x, y):
+            return (y, x) if transposed else (x, y)
+
+        sweep = SweepLine(epsilon)
+        for k, entity in enumerate(lines + arcs):
+            endpoints = [(id(node), *frame(node.x, node.y)) for node in (entity.start_pt, entity.end_pt)]
+            sweep.add_endpoints(k, endpoints)
+
+        for k, line in enumerate(lines):
+            sweep.add_line(k, *frame(line.start_pt.x, line.start_pt.y), *frame(line.end_pt.x, line.end_pt.y))
+
+        for k, shape in enumerate(shapes):
+            # the transposition mirrors the arc, it turns from the mirrored end point
+            start = 0.5 * math.pi - shape.start - shape.sweep if transposed else shape.start
+            sweep.add_arc(len(lines) + k, *frame(shape.cx, shape.cy), shape.radius, start, shape.sweep)
+
+        pairs |= sweep.run()
+
+    pairs = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def planarize(geometry, epsilon=None, sweep=None):
+    """
+    Splits the crossing, overlapping and touching lines and circle arcs at their common points.
+
+    Every common point becomes a node (an existing node closer than epsilon is reused), the entities are split at
+    the nodes inside them, the pieces keep the label of the entity and the duplicated pieces of the overlapping
+    entities are removed, hence the result is a planar graph. The beziers are not split. The nodes of the geometry
+    should be merged (Geometry.merge_points) before. An ArrayGeometry is edited through Geometry.editable.
+
+    :param epsilon: the tolerance of the common points, the epsilon of the geometry by default
+    :param sweep: the candidate pairs are found by the sweep line (sweep_pairs) if True, by the sort and sweep of the
+                  bounding boxes (candidate_pairs) if False, by default the sweep line is used if the sort and sweep
+                  would give more than DENSE_RATIO candidates per entity, see the module docstring
+    :return: PlanarReport with the number of the new common points inside the entities and the number of the lines
+             and arcs before and after the splitting
+    """
+    epsilon = geometry.epsilon if epsilon is None else epsilon
+    edited = geometry.editable()
+    lines = list(edited.lines)
+    arcs = list(edited.circle_arcs)
+    shapes = [ArcShape(arc) for arc in arcs]
+    entities_before = len(lines) + len(arcs)
+
+    # bounding boxes of the lines followed by the arcs
+    boxes = np.empty((len(lines) + len(arcs), 4))
+    ends = np.array([(line.start_pt.x, line.start_pt.y, line.end_pt.x, line.end_pt.y) for line in lines]).reshape(-1, 4)
+    boxes[: len(lines), 0] = np.minimum(ends[:, 0], ends[:, 2])
+    boxes[: len(lines), 1] = np.maximum(ends[:, 0], ends[:, 2])
+    boxes[: len(lines), 2] = np.minimum(ends[:, 1], ends[:, 3])
+    boxes[: len(lines), 3] = np.maximum(ends[:, 1], ends[:, 3])
+    for k, shape in enumerate(shapes):
+        boxes[len(lines) + k] = shape.bbox()
+    boxes[:, [0, 2]] -= epsilon
+    boxes[:, [1, 3]] += epsilon
+
+    if sweep is None:
+        sweep = int(sweep_counts(boxes[:, 0], boxes[:, 1])[1].sum()) > DENSE_RATIO * len(boxes)
+    if sweep:
+        chunks = [sweep_pairs(lines, arcs, epsilon)]
+    else:
+        chunks = candidate_pairs(boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3])
+
+    common = []  # (entity, entity, x, y)
+    for i, j in chunks:
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        both_lines = j < len(lines)
+        li, lj = i[both_lines], j[both_lines]
+        found, xy = line_line_points(ends[li, :2], ends[li, 2:], ends[lj, :2], ends[lj, 2:], epsilon)
+        common.extend(zip(li[found].tolist(), lj[found].tolist(), xy[:, 0].tolist(), xy[:, 1].tolist()))
+
+        for p, q in zip(i[~both_lines].tolist(), j[~both_lines].tolist()):
+            if p < len(lines):
+                found = line_arc_points(ends[p, :2], ends[p, 2:], shapes[q - len(lines)], epsilon)
+            else:
+                found = arc_arc_points(shapes[p - len(lines)], shapes[q - len(lines)], epsilon)
+            common.extend((p, q, x, y) for x, y in found)
+
+    # the common points are snapped to the endpoints of the intersecting entities
+    index = PointIndex(epsilon)
+    involved = {k for p, q, x, y in common for k in (p, q)}
+    for k in sorted(involved):
+        entity = lines[k] if k < len(lines) else arcs[k - len(lines)]
+        for node in (entity.start_pt, entity.end_pt):
+            index.get_or_insert(node.x, node.y, node)
+
+    # the nodes inside the entities
+    splits = {}
+    intersections = set()
+    for p, q, x, y in common:
+        node = index.query(x, y)
+        if node is None:
+            node = Node(x, y)
+            index.insert(x, y, node)
+            edited.nodes.append(node)
+        for k in (p, q):
+            entity = lines[k] if k < len(lines) else arcs[k - len(lines)]
+            if node is not entity.start_pt and node is not entity.end_pt:
+                splits.setdefault(k, {})[id(node)] = node
+                intersections.add(id(node))
+
+    new_lines = []
+    new_arcs = []
+    for k, line in enumerate(lines):
+        if k not in splits:
+            new_lines.append(line)
+            continue
+
+        dx, dy = line.end_pt.x - line.start_pt.x, line.end_pt.y - line.start_pt.y
+        nodes = sorted(splits[k].values(), key=lambda n: (n.x - line.start_pt.x) * dx + (n.y - line.start_pt.y) * dy)
+        nodes = [line.start_pt] + nodes + [line.end_pt]
+        new_lines.extend(Line(start, end, label=line.label) for start, end in zip(nodes, nodes[1:]))
+
+    for k, arc in enumerate(arcs):
+        if len(lines) + k not in splits:
+            new_arcs.append(arc)
+            continue
+
+        shape = shapes[k]
+        nodes = sorted(splits[len(lines) + k].values(), key=lambda n: shape.offset(n.x, n.y))
+        nodes = [arc.start_pt] + nodes + [arc.end_pt]
+        new_arcs.extend(CircleArc(start, arc.center_pt, end, label=arc.label) for start, end in zip(nodes, nodes[1:]))
+
+    # the overlapping pieces are removed
+    seen = set()
+    edited.lines = []
+    for line in new_lines:
+        key = frozenset((id(line.start_pt), id(line.end_pt)))
+        if key not in seen:
+            seen.add(key)
+            edited.lines.append(line)
+
+    seen = set()
+    edited.circle_arcs = []
+    for arc in new_arcs:
+        key = (id(arc.start_pt), id(arc.end_pt), round(arc.center_pt.x / epsilon), round(arc.center_pt.y / epsilon))
+        if key not in seen:
+            seen.add(key)
+            edited.circle_arcs.append(arc)
+
+    geometry.apply(edited)
+    return PlanarReport(len(intersections), entities_before, len(edited.lines) + len(edited.circle_arcs))
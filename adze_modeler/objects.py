@@ -7,6 +7,8 @@ class Node:
     the label can be important to rotate and copy and rotate the selected part of the geometry.
     """
 
+    __slots__ = ("x", "y", "id", "label", "precision")
+
     def __init__(self, x=0.0, y=0.0, id=None, label=None, precision=6):
         self.x = x
         self.y = y
@@ -16,15 +18,15 @@ class Node:
 
     def __add__(self, p):
         """Point(x1+x2, y1+y2)"""
-        return Node(self.x + p.x, self.y + p.y)
+        return _node(self.x + p.x, self.y + p.y)
 
     def __sub__(self, p):
         """Point(x1-x2, y1-y2)"""
-        return Node(self.x - p.x, self.y - p.y)
+        return _node(self.x - p.x, self.y - p.y)
 
     def __mul__(self, scalar):
         """Point(x1*x2, y1*y2)"""
-        return Node(self.x * scalar, self.y * scalar)
+        return _node(self.x * scalar, self.y * scalar)
 
     def __str__(self):
         return f"({self.x}, {self.y}, id={self.id},label={self.label})"
@@ -33,11 +35,11 @@ class Node:
         return f"{self.__class__.__name__}({self.x!r}, {self.y!r}, id={self.id!r},label={self.label!r})"
 
     def length(self):
-        return math.sqrt(self.x ** 2 + self.y ** 2)
+        return math.hypot(self.x, self.y)
 
     def distance_to(self, p):
         """Calculate the distance between two points."""
-        return (self - p).length()
+        return math.hypot(self.x - p.x, self.y - p.y)
 
     def as_tuple(self):
         """(x, y)"""
@@ -63,9 +65,11 @@ class Node:
 
         The new position is returned as a new Point.
         """
-        s, c = [f(rad) for f in (math.sin, math.cos)]
-        x, y = (c * self.x - s * self.y, s * self.x + c * self.y)
-        return Node(round(x, self.precision), round(y, self.precision))
+        s = math.sin(rad)
+        c = math.cos(rad)
+        x = c * self.x - s * self.y
+        y = s * self.x + c * self.y
+        return _node(round(x, self.precision), round(y, self.precision))
 
     def rotate_about(self, p, theta):
         """Rotate counter-clockwise around a point, by theta degrees. The new position is returned as a new Point."""
@@ -76,9 +80,22 @@ class Node:
         return result
 
 
+def _node(x, y):
+    """Creates a Node without the argument handling of Node.__init__, used by the arithmetic operators."""
+    node = object.__new__(Node)
+    node.x = x
+    node.y = y
+    node.id = None
+    node.label = None
+    node.precision = 6
+    return node
+
+
 class Line:
     """A directed line, which is defined by the (start -> end) points"""
 
+    __slots__ = ("start_pt", "end_pt", "id", "label")
+
     def __init__(self, start_pt, end_pt, id=None, label=None):
         self.start_pt = start_pt
         self.end_pt = end_pt
@@ -92,6 +109,8 @@ class Line:
 class CircleArc:
     """A directed line, which is defined by the (start -> end) points"""
 
+    __slots__ = ("start_pt", "center_pt", "end_pt", "id", "label")
+
     def __init__(self, start_pt, center_pt, end_pt, id=None, label=None):
         self.start_pt = start_pt
         self.center_pt = center_pt
@@ -106,6 +125,8 @@ class CircleArc:
 
 
 class CubicBezier:
+    __slots__ = ("start_pt", "control1", "control2", "end_pt", "id", "label")
+
     def __init__(self, start_pt, control1, control2, end_pt, id=None, label=None):
         self.start_pt = start_pt
         self.control1 = control1
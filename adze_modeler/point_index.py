@@ -0,0 +1,81 @@
+"""
+Spatial hash of the points of a geometry.
+
+The plane is divided into square cells with the size of the merge tolerance (epsilon), every point is stored in the
+cell which contains it. Two points closer than epsilon are always in the same or in neighbouring cells, therefore a
+lookup checks only the 3x3 cells around the query point instead of every stored point.
+"""
+import math
+
+
+class PointIndex:
+    """Finds the stored items, which are closer than epsilon to a given (x, y) point."""
+
+    def __init__(self, epsilon=1.0e-5):
+        if epsilon <= 0.0:
+            raise ValueError("The epsilon of the point index should be positive!")
+
+        self.epsilon = epsilon
+        self.cells = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def cell_of(self, x, y):
+        """Returns the key of the cell, which contains the (x, y) point."""
+        return math.floor(x / self.epsilon), math.floor(y / self.epsilon)
+
+    def insert(self, x, y, item):
+        """Stores the item at the (x, y) point."""
+        self.cells.setdefault(self.cell_of(x, y), []).append((self.size, x, y, item))
+        self.size += 1
+
+    def query(self, x, y):
+        """
+        Returns the earliest inserted item, which is closer than epsilon to (x, y).
+
+        :return: the stored item or None if there is no such point in the index
+        """
+        i = math.floor(x / self.epsilon)
+        j = math.floor(y / self.epsilon)
+        cells = self.cells
+        limit = self.epsilon * self.epsilon
+        found = None
+        # the own cell of the point comes first, it contains the match in most of the cases
+        neighbours = (
+            (i, j),
+            (i - 1, j - 1),
+            (i - 1, j),
+            (i - 1, j + 1),
+            (i, j - 1),
+            (i, j + 1),
+            (i + 1, j - 1),
+            (i + 1, j),
+            (i + 1, j + 1),
+        )
+        for key in neighbours:
+            cell = cells.get(key)
+            if cell is None:
+                continue
+
+            for entry in cell:
+                if found is not None and entry[0] > found[0]:
+                    break
+
+                dx = entry[1] - x
+                dy = entry[2] - y
+                if dx * dx + dy * dy < limit:
+                    found = entry
+                    break
+
+        return None if found is None else found[3]
+
+    def get_or_insert(self, x, y, item):
+        """Returns the stored item closer than epsilon to (x, y), if there is no such item, the given one is stored."""
+        found = self.query(x, y)
+        if found is None:
+            self.insert(x, y, item)
+            return item
+
+        return found
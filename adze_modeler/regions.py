@@ -0,0 +1,438 @@
+"""
+Region detection: the faces of the planar graph of the geometry and an interior point of every face.
+
+The lines and the circle arcs (split into short chords) are the edges of the graph, every edge gives two directed
+half-edges. The half-edges are sorted by their angle around their start nodes, and the boundary of a face is walked by
+leaving every node on the half-edge, which precedes the reverse of the arriving one in counter-clockwise order. The
+cycles with positive area are the bounded faces, the others are the outer boundaries of the connected parts of the
+graph, which are the holes of the smallest face around them.
+
+The interior point of a face is its pole of inaccessibility (the polylabel algorithm): the point farthest from the
+boundary, found by a quadtree search, which refines the cells of all faces together. It is inside the face even for
+concave faces and faces with holes, where the centroid may be outside, and it is far from the segments, so FEMM
+assigns the block label to the right block.
+
+The geometry should be planar (intersections.planarize) and its nodes merged (Geometry.merge_points), the cubic
+beziers are not used (bezier.flatten_beziers). An ArrayGeometry is read through Geometry.editable.
+"""
+import math
+
+import numpy as np
+from adze_modeler.geometry import arc_angle
+from adze_modeler.intersections import candidate_pairs
+
+
+class Region:
+    """A bounded face of the geometry."""
+
+    __slots__ = ("boundary", "holes", "area", "point")
+
+    def __init__(self, boundary, holes, area, point=None):
+        self.boundary = boundary  # (n, 2) array of the counter-clockwise boundary
+        self.holes = holes  # list of (n, 2) arrays
+        self.area = area  # without the holes
+        self.point = point  # interior point
+
+    @property
+    def rings(self):
+        return [self.boundary] + self.holes
+
+    @property
+    def bbox(self):
+        return (*self.boundary.min(axis=0), *self.boundary.max(axis=0))
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({len(self.boundary)} points, {len(self.holes)} holes, area={self.area!r}, "
+            f"point={self.point!r})"
+        )
+
+
+def ring_edges(rings):
+    """The (4, n) array of the (x1, y1, x2, y2) coordinates of the edges of the closed rings."""
+    edges = np.concatenate([np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings])
+    return edges.T
+
+
+class PolygonEdges:
+    """The edges of many polygons in one array, the edges of a polygon are one after the other."""
+
+    __slots__ = ("edges", "first", "counts")
+
+    def __init__(self, polygons):
+        """:param polygons: list of the rings of the polygons, see points_in_polygon"""
+        edges = [ring_edges(rings) for rings in polygons]
+        self.counts = np.array([e.shape[1] for e in edges], dtype=np.int64)
+        self.first = np.cumsum(self.counts) - self.counts
+        self.edges = np.hstack(edges) if edges else np.empty((4, 0))
+
+    def test(self, points, owner, distances=True, chunk_size=1_000_000):
+        """
+        The even-odd test and the boundary distances of the points against their polygons.
+
+        Every point is paired with every edge of its polygon, the pairs of a point are reduced by NumPy's reduceat,
+        at most about chunk_size pairs are made at once.
+
+        :param points: (n, 2) array of the points
+        :param owner: the indices of the polygons of the points
+        :return: boolean array of the points inside their polygons and the array of their distances from the
+                 boundaries (None if distances is False)
+        """
+        inside = np.zeros(len(points), dtype=bool)
+        distance = np.empty(len(points)) if distances else None
+        pair_counts = self.counts[owner]
+        totals = np.cumsum(pair_counts)
+
+        start = 0
+        while start < len(points):
+            stop = int(np.searchsorted(totals, totals[start] - pair_counts[start] + chunk_size, side="right"))
+            stop = min(max(stop, start + 1), len(points))
+            counts = pair_counts[start:stop]
+            offsets = np.cumsum(counts) - counts
+            point = np.repeat(np.arange(start, stop), counts)
+            edge = np.repeat(self.first[owner[start:stop]] - offsets, counts) + np.arange(len(point))
+
+            x1, y1, x2, y2 = self.edges[:, edge]
+            px = points[point, 0]
+            py = points[point, 1]
+            crossing = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside[start:stop] = np.logical_xor.reduceat(crossing & (px < x), offsets)
+
+            if distances:
+                dx = x2 - x1
+                dy = y2 - y1
+                length2 = dx * dx + dy * dy
+                px = px - x1
+                py = py - y1
+                t = np.divide(px * dx + py * dy, length2, out=np.zeros(len(point)), where=length2 > 0.0)
+                t = np.clip(t, 0.0, 1.0)
+                distance[start:stop] = np.minimum.reduceat(np.hypot(px - t * dx, py - t * dy), offsets)
+
+            start = stop
+
+        return inside, distance
+
+    def signed_distances(self, points, owner, chunk_size=1_000_000):
+        """The distances of the points from the boundaries of their polygons, negative outside."""
+        inside, distance = self.test(points, owner, chunk_size=chunk_size)
+        return np.where(inside, distance, -distance)
+
+
+def points_in_polygon(points, rings, chunk_size=1_000_000):
+    """
+    Even-odd test of the points against a polygon.
+
+    :param points: (n, 2) array of the points
+    :param rings: the boundary and the holes of the polygon, list of (k, 2) arrays
+    :param chunk_size: the approximate number of the point-edge pairs, which are tested at once
+    :return: boolean array, the points on the boundary are inside or outside
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    owner = np.zeros(len(points), dtype=np.int64)
+    return PolygonEdges([rings]).test(points, owner, distances=False, chunk_size=chunk_size)[0]
+
+
+def best_points(points, values, owner, best, best_values):
+    """Updates the best points (with the largest values) of the owners in place."""
+    better = np.flatnonzero(values > best_values[owner])
+    if len(better):
+        better = better[np.lexsort((values[better], owner[better]))]
+        last = np.append(owner[better][1:] != owner[better][:-1], True)
+        better = better[last]
+        best[owner[better]] = points[better]
+        best_values[owner[better]] = values[better]
+
+
+def poles_of_inaccessibility(polygons, precision=None, max_cells=64, chunk_size=1_000_000):
+    """
+    The interior points of the polygons, which are the farthest from their boundaries (polylabel).
+
+    The bounding box of a polygon is split into square cells, the cells, which may contain a better point than the
+    best one by more than the precision, are split into four, the others are dropped. The cells of all polygons are
+    refined together, round by round. At most max_cells cells of a polygon (those with the largest possible distances)
+    are split in a round, which bounds the work on the mazes of narrow passages, where many cells are close to the
+    best one. Only the tested points are returned, so a positive distance means an interior point in any case.
+
+    :param polygons: list of the rings of the polygons, see points_in_polygon
+    :param precision: the results are at most this closer to the boundaries than the poles, default: 1e-3 times the
+                      shorter side of the bounding box of every polygon
+    :param max_cells: the maximal number of the cells of a polygon, which are split in a round
+    :param chunk_size: the approximate number of the point-edge pairs, which are tested at once
+    :return: (n, 2) array of the points and the array of their distances from the boundaries
+    """
+    edges = PolygonEdges(polygons)
+    lower = np.array([rings[0].min(axis=0) for rings in polygons]).reshape(-1, 2)
+    upper = np.array([rings[0].max(axis=0) for rings in polygons]).reshape(-1, 2)
+    cell_size = (upper - lower).min(axis=1)
+    precision = 1.0e-3 * cell_size if precision is None else np.full(len(polygons), precision, dtype=float)
+
+    # the centroids of the boundaries are good first guesses for the round shapes
+    best = lower.copy()
+    best_distances = np.zeros(len(polygons))
+    valid = np.flatnonzero(cell_size > 0.0)
+    best[valid] = np.array([polygons[i][0].mean(axis=0) for i in valid.tolist()]).reshape(-1, 2)
+    best_distances[valid] = edges.signed_distances(best[valid], valid, chunk_size)
+
+    # the cells are the rows of (x, y, half size, distance) and their polygons
+    grids = []
+    for i in valid.tolist():
+        (xmin, ymin), (xmax, ymax), size = lower[i], upper[i], cell_size[i]
+        x, y = np.meshgrid(np.arange(xmin, xmax, size) + size / 2.0, np.arange(ymin, ymax, size) + size / 2.0)
+        grids.append(np.column_stack([x.ravel(), y.ravel(), np.full(x.size, size / 2.0)]))
+    cells = np.vstack(grids) if grids else np.empty((0, 3))
+    owner = np.repeat(valid, [len(grid) for grid in grids]).astype(np.int64)
+    cells = np.column_stack([cells, edges.signed_distances(cells[:, :2], owner, chunk_size)])
+    best_points(cells[:, :2], cells[:, 3], owner, best, best_distances)
+
+    while True:
+        bounds = cells[:, 3] + cells[:, 2] * math.sqrt(2.0)
+        promising = bounds - best_distances[owner] > precision[owner]
+        order = np.flatnonzero(promising)
+        order = order[np.lexsort((-bounds[order], owner[order]))]
+        first = np.searchsorted(owner[order], owner[order], side="left")
+        order = order[np.arange(len(order)) - first < max_cells]
+        cells = cells[order]
+        owner = owner[order]
+        if not len(cells):
+            break
+
+        h = cells[:, 2:3] / 2.0
+        children = np.vstack(
+            [cells[:, :2] + h * offset for offset in ((-1.0, -1.0), (1.0, -1.0), (-1.0, 1.0), (1.0, 1.0))]
+        )
+        owner = np.tile(owner, 4)
+        distances = edges.signed_distances(children, owner, chunk_size)
+        best_points(children, distances, owner, best, best_distances)
+        cells = np.column_stack([children, np.tile(h[:, 0], 4), distances])
+
+    return best, best_distances
+
+
+def pole_of_inaccessibility(rings, precision=None, max_cells=64):
+    """
+    The interior point of a polygon, which is the farthest from its boundary, see poles_of_inaccessibility.
+
+    :param rings: the boundary and the holes of the polygon, list of (k, 2) arrays
+    :return: (x, y), the point and its distance from the boundary
+    """
+    points, distances = poles_of_inaccessibility([rings], precision, max_cells)
+    return (float(points[0, 0]), float(points[0, 1])), float(distances[0])
+
+
+def box_point_pairs(boxes, points, chunk_size=1_000_000):
+    """
+    Yields the pairs of the boxes and the points in them (sort and sweep, see intersections.candidate_pairs).
+
+    :param boxes: (n, 4) array of the (xmin, ymin, xmax, ymax) boxes
+    :param points: (m, 2) array of the points
+    :return: iterator of (box, point) index arrays
+    """
+    xmin = np.concatenate([boxes[:, 0], points[:, 0]])
+    ymin = np.concatenate([boxes[:, 1], points[:, 1]])
+    xmax = np.concatenate([boxes[:, 2], points[:, 0]])
+    ymax = np.concatenate([boxes[:, 3], points[:, 1]])
+    n = len(boxes)
+    for i, j in candidate_pairs(xmin, xmax, ymin, ymax, chunk_size):
+        mixed = (i < n) != (j < n)
+        i = i[mixed]
+        j = j[mixed]
+        yield np.where(i < n, i, j), np.where(i < n, j, i) - n
+
+
+def graph_edges(geometry, arc_step=5.0):
+    """
+    The points and the straight edges of the lines and the arcs of the geometry.
+
+    :param arc_step: the maximal angle of the chords of the arcs in degrees, an arc has at least two chords
+    :return: (n, 2) array of the points and the (m, 2) array of the point indices of the edges
+    """
+    # the nodes are identified by their identity, which needs plain objects (see Geometry.editable)
+    geometry = geometry.editable()
+    keys = {}
+    points = []
+
+    def key(node):
+        k = keys.get(id(node))
+        if k is None:
+            k = keys[id(node)] = len(points)
+            points.append((node.x, node.y))
+        return k
+
+    edges = [(key(line.start_pt), key(line.end_pt)) for line in geometry.lines]
+    for arc in geometry.circle_arcs:
+        start = (arc.start_pt.x, arc.start_pt.y)
+        center = (arc.center_pt.x, arc.center_pt.y)
+        sweep = math.radians(arc_angle(start, center, (arc.end_pt.x, arc.end_pt.y)))
+        radius = math.hypot(start[0] - center[0], start[1] - center[1])
+        angle = math.atan2(start[1] - center[1], start[0] - center[0])
+        n = max(math.ceil(math.degrees(sweep) / arc_step), 2)
+
+        previous = key(arc.start_pt)
+        for i in range(1, n):
+            a = angle + sweep * i / n
+            points.append((center[0] + radius * math.cos(a), center[1] + radius * math.sin(a)))
+            edges.append((previous, len(points) - 1))
+            previous = len(points) - 1
+        edges.append((previous, key(arc.end_pt)))
+
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    return np.array(points, dtype=float).reshape(-1, 2), edges
+
+
+def face_cycles(points, edges):
+    """
+    The cycles of the half-edges around the faces of the planar graph.
+
+    The half-edges 2k and 2k + 1 are the two directions of the edge k, the face of a half-edge is on its left.
+
+    :return: list of the cycles (lists of the starting points of their half-edges) and the array of their signed areas
+    """
+    origin = edges.ravel()
+    target = edges[:, ::-1].ravel()
+    direction = points[target] - points[origin]
+    angle = np.arctan2(direction[:, 1], direction[:, 0])
+
+    # the half-edges around every point in counter-clockwise order
+    order = np.lexsort((angle, origin))
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    sorted_origin = origin[order]
+    first = np.searchsorted(sorted_origin, sorted_origin, side="left")
+    last = np.searchsorted(sorted_origin, sorted_origin, side="right") - 1
+    previous = np.where(np.arange(len(order)) > first, np.arange(len(order)) - 1, last)
+
+    twin = np.arange(len(origin)) ^ 1
+    following = order[previous[position[twin]]].tolist()
+
+    cycle_of = np.full(len(origin), -1, dtype=np.int64)
+    cycles = []
+    origin_list = origin.tolist()
+    for h in range(len(origin)):
+        if cycle_of[h] >= 0:
+            continue
+        cycle = []
+        while cycle_of[h] < 0:
+            cycle_of[h] = len(cycles)
+            cycle.append(origin_list[h])
+            h = following[h]
+        cycles.append(cycle)
+
+    a = points[origin]
+    b = points[target]
+    areas = np.bincount(cycle_of, a[:, 0] * b[:, 1] - b[:, 0] * a[:, 1], minlength=len(cycles)) / 2.0
+    return cycles, areas
+
+
+def connected_parts(nr_points, edges):
+    """The index of the connected part of every point (union-find)."""
+    parent = list(range(nr_points))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in edges.tolist():
+        ra, rb = root(a), root(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    return np.array([root(i) for i in range(nr_points)], dtype=np.int64)
+
+
+def find_regions(geometry, arc_step=5.0, precision=None):
+    """
+    The bounded regions of the geometry with an interior point.
+
+    :param arc_step: the maximal angle of the chords of the arcs in degrees in the boundaries of the regions
+    :param precision: the precision of the interior points, see poles_of_inaccessibility
+    :return: list of Region
+    """
+    points, edges = graph_edges(geometry, arc_step)
+    if not len(edges):
+        return []
+
+    cycles, areas = face_cycles(points, edges)
+    parts = connected_parts(len(points), edges)
+
+    regions = [Region(points[cycle], [], area) for cycle, area in zip(cycles, areas.tolist()) if area > 0.0]
+    face_parts = np.array([parts[cycle[0]] for cycle, area in zip(cycles, areas) if area > 0.0], dtype=np.int64)
+    face_areas = np.array([region.area for region in regions])
+
+    # the outer boundaries of the connected parts are the holes of the smallest face of the other parts around them
+    holes = [cycle for cycle, area in zip(cycles, areas) if area <= 0.0]
+    hole_areas = areas[areas <= 0.0]
+    hole_starts = np.array([cycle[0] for cycle in holes], dtype=np.int64)
+    hole_points = points[hole_starts]
+    boundaries = PolygonEdges([[region.boundary] for region in regions])
+    bboxes = np.array([region.bbox for region in regions]).reshape(-1, 4)
+    containing = []
+    for face, hole in box_point_pairs(bboxes, hole_points):
+        other = face_parts[face] != parts[hole_starts[hole]]
+        face = face[other]
+        hole = hole[other]
+        inside = boundaries.test(hole_points[hole], face, distances=False)[0]
+        containing.append(np.column_stack([hole[inside], face[inside]]))
+
+    containing = np.vstack(containing) if containing else np.empty((0, 2), dtype=np.int64)
+    containing = containing[np.lexsort((face_areas[containing[:, 1]], containing[:, 0]))]
+    hole, first = np.unique(containing[:, 0], return_index=True)
+    for k, i in zip(hole.tolist(), containing[first, 1].tolist()):
+        regions[i].holes.append(points[holes[k]][::-1])
+        regions[i].area += float(hole_areas[k])
+
+    poles, distances = poles_of_inaccessibility([region.rings for region in regions], precision)
+    for region, pole in zip(regions, poles.tolist()):
+        region.point = tuple(pole)
+
+    return regions
+
+
+def locate(points, regions, chunk_size=1_000_000):
+    """
+    The regions of the points.
+
+    :param points: (n, 2) array of the points
+    :param chunk_size: the approximate number of the point-edge pairs, which are tested at once
+    :return: array of the indices of the regions, -1 for the points outside of the regions
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    result = np.full(len(points), -1, dtype=np.int64)
+    if not regions:
+        return result
+
+    edges = PolygonEdges([region.rings for region in regions])
+    bboxes = np.array([region.bbox for region in regions])
+    for region, point in box_point_pairs(bboxes, points, chunk_size):
+        inside = edges.test(points[point], region, distances=False, chunk_size=chunk_size)[0]
+        result[point[inside]] = region[inside]
+    return result
+
+
+def assign_labels(geometry, regions, labels):
+    """
+    The labels of the regions: every model.Label is assigned to the region of its node.
+
+    :param labels: list of model.Label, the node_id of a label is the id of a node of the geometry
+    :return: list of the labels of the regions, None for the regions without a label
+    """
+    nodes = {node.id: node for node in geometry.nodes}
+    missing = [label.node_id for label in labels if label.node_id not in nodes]
+    if missing:
+        raise ValueError(f"The nodes of the labels are not in the geometry: {missing}")
+
+    points = [(nodes[label.node_id].x, nodes[label.node_id].y) for label in labels]
+    assigned = [None] * len(regions)
+    for label, i in zip(labels, locate(points, regions).tolist()):
+        if i < 0:
+            raise ValueError(f"The label {label.label_id} is outside of the regions!")
+        if assigned[i] is not None:
+            raise ValueError(f"The labels {assigned[i].label_id} and {label.label_id} are in the same region!")
+        assigned[i] = label
+
+    return assigned
@@ -0,0 +1,170 @@
+"""
+Simplification of the polylines of a geometry (Douglas-Peucker).
+
+The lines are collected into chains between fixed nodes (see arc_fitting.line_chains): the junctions, where other
+than two lines meet, the endpoints of the arcs and beziers and the nodes where the label changes. The fixed nodes are
+never removed, so the boundaries shared by neighbouring regions stay connected. The inner nodes of a chain, which are
+closer to the simplified polyline than the tolerance, are removed.
+
+The Douglas-Peucker splits are done for every chain at once: in a round, the farthest point of every open span is
+searched in one NumPy pass over the points, so the number of the rounds is the depth of the recursion. A simplified
+span, which would cross another segment of the geometry, gets back its original points.
+"""
+from collections import Counter
+
+import numpy as np
+from adze_modeler.arc_fitting import line_chains
+from adze_modeler.intersections import crossing_pairs
+from adze_modeler.objects import Line
+
+
+def span_distances(points, s, e):
+    """
+    The distances of the inner points of the spans from their chords.
+
+    :param points: (n, 2) array of the points of the chains
+    :param s, e: the indices of the first and last points of the spans, e - s >= 2
+    :return: the indices of the inner points and the index of their span and their distances
+    """
+    counts = e - s - 1
+    span = np.repeat(np.arange(len(s)), counts)
+    inner = np.repeat(s + 1, counts) + np.arange(len(span)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    a = points[s][span]
+    d = points[e][span] - a
+    p = points[inner] - a
+    length2 = (d * d).sum(axis=1)
+    t = np.divide((p * d).sum(axis=1), length2, out=np.zeros(len(span)), where=length2 > 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    distance = np.hypot(p[:, 0] - t * d[:, 0], p[:, 1] - t * d[:, 1])
+    return inner, span, distance
+
+
+def farthest_points(inner, span, distance, counts):
+    """
+    The farthest inner point of every span.
+
+    :param inner, span, distance: the inner points of the spans, see span_distances
+    :param counts: the number of the inner points of the spans, the spans are one after the other
+    """
+    farthest = np.maximum.reduceat(distance, np.cumsum(counts) - counts)
+    candidates = np.flatnonzero(distance == np.repeat(farthest, counts))
+    spans, position = np.unique(span[candidates], return_index=True)
+    return inner[candidates[position]]
+
+
+def douglas_peucker(points, keep, tolerance):
+    """
+    Marks the points, which are kept by the simplification.
+
+    :param points: (n, 2) array of the points of the chains, one after the other
+    :param keep: boolean array, the fixed points (the ends of the chains) are True, it is updated in place
+    """
+    kept = np.flatnonzero(keep)
+    s = kept[:-1]
+    e = kept[1:]
+    while True:
+        selected = e - s >= 2
+        s = s[selected]
+        e = e[selected]
+        if not len(s):
+            return keep
+
+        inner, span, distance = span_distances(points, s, e)
+        split = np.maximum.reduceat(distance, np.cumsum(e - s - 1) - (e - s - 1)) > tolerance
+        selected = split[span]
+        middle = farthest_points(inner[selected], span[selected], distance[selected], (e - s - 1)[split])
+        keep[middle] = True
+        s, e = np.concatenate([s[split], middle]), np.concatenate([middle, e[split]])
+
+
+def simplify(geometry, tolerance=1.0e-3):
+    """
+    Removes the collinear and the nearly collinear inner nodes of the polylines.
+
+    The lines between the kept nodes of a chain are kept as they are, the others are replaced by new lines with the
+    label of the chain. The arcs and beziers are not changed, the crossings are checked only between the lines.
+    The nodes of the geometry should be merged (Geometry.merge_points) before the simplification. An ArrayGeometry is
+    edited through Geometry.editable.
+
+    :param tolerance: the maximal distance of the removed nodes from the simplified polylines
+    :return: the number of the removed nodes
+    """
+    if tolerance < 0.0:
+        raise ValueError("The tolerance of the simplification should not be negative!")
+
+    edited = geometry.editable()
+    chains = line_chains(edited)
+    if not chains:
+        return 0
+
+    nodes = [node for chain_nodes, chain_lines in chains for node in chain_nodes]
+    lengths = np.array([len(chain_nodes) for chain_nodes, chain_lines in chains])
+    starts = np.cumsum(lengths) - lengths
+    ends = starts + lengths - 1
+    points = np.array([(node.x, node.y) for node in nodes], dtype=float)
+    node_keys = {}
+    keys = np.array([node_keys.setdefault(id(node), len(node_keys)) for node in nodes])
+    chain_of = np.repeat(np.arange(len(chains)), lengths)
+
+    keep = np.zeros(len(nodes), dtype=bool)
+    keep[starts] = True
+    keep[ends] = True
+
+    # a closed chain keeps its farthest point from its start
+    closed = (keys[starts] == keys[ends]) & (lengths > 3)
+    if closed.any():
+        inner, span, distance = span_distances(points, starts[closed], ends[closed])
+        keep[farthest_points(inner, span, distance, lengths[closed] - 2)] = True
+
+    while True:
+        douglas_peucker(points, keep, tolerance)
+
+        # a closed chain keeps at least a triangle
+        nr_kept = np.add.reduceat(keep.astype(np.int64), starts)
+        triangles = closed & (nr_kept < 4)
+        for s, e in zip(starts[triangles], ends[triangles]):
+            kept = np.flatnonzero(keep[s : e + 1])
+            a, b = max(zip(kept, kept[1:]), key=lambda span: span[1] - span[0])
+            keep[s + (a + b) // 2] = True
+
+        # the chains between the same nodes do not collapse into the same line
+        collapsed = np.flatnonzero((nr_kept == 2) & (lengths > 2))
+        if len(collapsed):
+            lines_of = Counter(frozenset((keys[s], keys[e])) for s, e in zip(starts, ends) if e - s == 1)
+            for s, e in zip(starts[collapsed], ends[collapsed]):
+                pair = frozenset((keys[s], keys[e]))
+                if lines_of[pair]:
+                    keep[(s + e) // 2] = True
+                lines_of[pair] += 1
+
+        kept = np.flatnonzero(keep)
+        same_chain = chain_of[kept[:-1]] == chain_of[kept[1:]]
+        s = kept[:-1][same_chain]
+        e = kept[1:][same_chain]
+        pairs = crossing_pairs(points[s], points[e], np.column_stack([keys[s], keys[e]]))
+
+        # the simplified spans of the crossings get back their points, the original lines were not crossing
+        crossing = np.unique(pairs)
+        crossing = crossing[e[crossing] - s[crossing] >= 2]
+        if not len(crossing):
+            break
+
+        for i in crossing:
+            keep[s[i] : e[i]] = True
+
+    removed = set()
+    lines = []
+    for (chain_nodes, chain_lines), start in zip(chains, starts):
+        kept = np.flatnonzero(keep[start : start + len(chain_nodes)]).tolist()
+        for a, b in zip(kept, kept[1:]):
+            if b - a == 1:
+                lines.append(chain_lines[a])
+            else:
+                lines.append(Line(chain_nodes[a], chain_nodes[b], label=chain_lines[a].label))
+                removed.update(id(node) for node in chain_nodes[a + 1 : b])
+
+    edited.lines = lines
+    edited.nodes = [node for node in edited.nodes if id(node) not in removed]
+    geometry.apply(edited)
+    return len(removed)
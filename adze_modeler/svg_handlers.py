@@ -1,7 +1,15 @@
+from xml.etree.ElementTree import iterparse
+
 import adze_modeler.geometry as geo
 import adze_modeler.objects as obj
 import pygmsh
 import svgpathtools as svg
+from adze_modeler.instrumentation import count
+from adze_modeler.instrumentation import span
+from adze_modeler.point_index import PointIndex
+from svgpathtools.svg_to_paths import polygon2pathd
+from svgpathtools.svg_to_paths import polyline2pathd
+from svgpathtools.svg_to_paths import rect2pathd
 
 
 def import_svg(svg_img, *args):
@@ -11,37 +19,129 @@ def import_svg(svg_img, *args):
     return: gives back a new geometry
     """
 
-    # reads the main objects from an svg file
-    paths = svg.svg2paths(svg_img)
-    imported_geo = geo.Geometry()
+    with span("import_svg"):
+        # reads the main objects from an svg file
+        paths = svg.svg2paths(svg_img)
+        imported_geo = geo.Geometry()
 
-    # id start from the given number
-    id = 0
+        # id start from the given number
+        id = 0
+
+        for path in paths:
+            for seg in path:
+                if isinstance(seg, svg.Path):
+                    for element in seg:
+                        if isinstance(element, svg.Line):
+                            start = obj.Node(element.start.real, element.start.imag, id)
+                            end = obj.Node(element.end.real, element.end.imag, id + 1)
+                            imported_geo.add_line(obj.Line(start, end, id + 2))
+                            id += 3
 
-    for path in paths:
-        for seg in path:
-            if isinstance(seg, svg.Path):
-                for element in seg:
-                    if isinstance(element, svg.Line):
-                        start = obj.Node(element.start.real, element.start.imag, id)
-                        end = obj.Node(element.end.real, element.end.imag, id + 1)
-                        imported_geo.add_line(obj.Line(start, end, id + 2))
-                        id += 3
-
-                    if isinstance(element, svg.CubicBezier):
-                        start = obj.Node(element.start.real, element.start.imag, id)
-                        control1 = obj.Node(element.control1.real, element.control1.imag, id + 1)
-                        control2 = obj.Node(element.control2.real, element.control2.imag, id + 2)
-                        end = obj.Node(element.end.real, element.end.imag, id + 3)
-                        imported_geo.add_cubic_bezier(obj.CubicBezier(start, control1, control2, end, id + 4))
-                        id += 5
-
-    imported_geo.merge_points()
+                        if isinstance(element, svg.CubicBezier):
+                            start = obj.Node(element.start.real, element.start.imag, id)
+                            control1 = obj.Node(element.control1.real, element.control1.imag, id + 1)
+                            control2 = obj.Node(element.control2.real, element.control2.imag, id + 2)
+                            end = obj.Node(element.end.real, element.end.imag, id + 3)
+                            imported_geo.add_cubic_bezier(obj.CubicBezier(start, control1, control2, end, id + 4))
+                            id += 5
+
+        imported_geo.merge_points()
+        count("import_svg.entities", len(imported_geo.lines) + len(imported_geo.cubic_beziers))
 
     # print(imported_geo)
     return imported_geo
 
 
+def svg_path_strings(svg_img):
+    """
+    Yields the path strings of the drawing elements (path, polyline, polygon, line, rect) in document order.
+
+    The file is parsed incrementally and the processed elements are released, so the whole document is never kept
+    in the memory.
+    """
+    for _, element in iterparse(svg_img, events=("end",)):
+        tag = element.tag.rsplit("}", 1)[-1]
+        d = None
+        if tag == "path":
+            d = element.get("d")
+        elif tag == "polyline":
+            d = polyline2pathd(element.attrib)
+        elif tag == "polygon":
+            d = polygon2pathd(element.attrib)
+        elif tag == "line":
+            d = "M{} {}L{} {}".format(*(element.get(key, "0") for key in ("x1", "y1", "x2", "y2")))
+        elif tag == "rect":
+            d = rect2pathd(element.attrib)
+
+        element.clear()
+        if d:
+            yield d
+
+
+def iter_svg(svg_img, epsilon=1.0e-5, new_node=obj.Node):
+    """
+    Streaming counterpart of import_svg: yields the nodes and the entities of the svg image path by path.
+
+    The endpoints are merged during the import: a node is yielded only once, before the first entity which uses it,
+    the following entities get the same node object. The id numbers are the same as in the case of import_svg.
+
+    :param svg_img: the name of the file, which contains the imported svg image
+    :param epsilon: the nodes closer than epsilon are merged
+    :param new_node: creates the nodes from (x, y, id), e.g. the new_node method of a geometry
+    """
+    index = PointIndex(epsilon)
+    new_nodes = []
+
+    def node(point, id):
+        found = index.query(point.real, point.imag)
+        if found is None:
+            found = new_node(point.real, point.imag, id)
+            index.insert(point.real, point.imag, found)
+            new_nodes.append(found)
+        return found
+
+    # id start from the given number
+    id = 0
+
+    for d in svg_path_strings(svg_img):
+        for element in svg.parse_path(d):
+            entity = None
+            if isinstance(element, svg.Line):
+                start = node(element.start, id)
+                end = node(element.end, id + 1)
+                entity = obj.Line(start, end, id + 2)
+                id += 3
+
+            if isinstance(element, svg.CubicBezier):
+                start = node(element.start, id)
+                control1 = node(element.control1, id + 1)
+                control2 = node(element.control2, id + 2)
+                end = node(element.end, id + 3)
+                entity = obj.CubicBezier(start, control1, control2, end, id + 4)
+                id += 5
+
+            if entity is not None:
+                yield from new_nodes
+                new_nodes.clear()
+                yield entity
+
+
+def import_svg_stream(svg_img, geometry=None, epsilon=1.0e-5):
+    """
+    Imports the svg file with iter_svg, the nodes are merged during the import instead of calling merge_points.
+
+    :param geometry: the imported objects are added to this geometry, a new geometry is created by default
+    :return: the geometry
+    """
+    if geometry is None:
+        geometry = geo.Geometry()
+
+    for item in iter_svg(svg_img, epsilon, geometry.new_node):
+        geometry.add_object(item)
+
+    return geometry
+
+
 if __name__ == "__main__":
     with pygmsh.geo.Geometry() as geom:
         lcar = 0.1
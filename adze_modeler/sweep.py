@@ -0,0 +1,190 @@
+"""
+Parametric sweeps of the FEMM models.
+
+The model is written once with the FemmWriter, where the swept values (dimensions, currents, material properties) are
+given as Parameter placeholders. The placeholders can be combined with the arithmetic operators, the expressions are
+written into the script and they are evaluated by FEMM's Lua, e.g. writer.add_node((ri + ro) / 2, -z) gives
+mi_addnode((($ri + $ro) / 2), (- $z)). The script is compiled once into a ScriptTemplate, which generates a variant for
+every row of a parameter matrix with one %-formatting, the variants are run with a FEMM executor (e.g. FemmPool).
+"""
+import itertools
+import re
+
+placeholder_re = re.compile(r"\$([A-Za-z_]\w*)")
+lua_prefix = "sweep_"  # prefix of the Lua variables of the parameters
+
+
+class Expression:
+    """Lua expression of the parameters, its string is written into the script."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+    def __neg__(self):
+        # the space keeps a negative value from forming a Lua comment (--)
+        return Expression(f"(- {self})")
+
+    def __add__(self, other):
+        return Expression(f"({self} + {other})")
+
+    def __radd__(self, other):
+        return Expression(f"({other} + {self})")
+
+    def __sub__(self, other):
+        return Expression(f"({self} - {other})")
+
+    def __rsub__(self, other):
+        return Expression(f"({other} - {self})")
+
+    def __mul__(self, other):
+        return Expression(f"({self} * {other})")
+
+    def __rmul__(self, other):
+        return Expression(f"({other} * {self})")
+
+    def __truediv__(self, other):
+        return Expression(f"({self} / {other})")
+
+    def __rtruediv__(self, other):
+        return Expression(f"({other} / {self})")
+
+
+class Parameter(Expression):
+    """Placeholder of a swept value, it is written as $name into the script."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        if not re.fullmatch(r"[A-Za-z_]\w*", name):
+            raise ValueError(f"Invalid parameter name: {name!r}")
+
+        super().__init__("$" + name)
+        self.name = name
+
+    def __repr__(self):
+        return f"Parameter({self.name!r})"
+
+
+def in_string(line, position):
+    """Checks whether the position of the line is in a Lua string literal."""
+    quote = None
+    i = 0
+    while i < position:
+        c = line[i]
+        if quote is None:
+            if c in "'\"":
+                quote = c
+        elif c == "\\":
+            i += 1
+        elif c == quote:
+            quote = None
+        i += 1
+
+    return quote is not None
+
+
+class ScriptTemplate:
+    """
+    Lua script with $name placeholders, which is compiled into a %-format string.
+
+    The placeholders in the expressions are replaced by the global Lua variables sweep_<name>, which are assigned at
+    the beginning of the script, so a variant is the values in a short header and the copy of the unchanged script.
+    Only the placeholders in the string literals (e.g. in a material name) are substituted into the text.
+
+    :param script: the script as a string or as a list of commands, e.g. the lua_model of a FemmWriter
+    """
+
+    def __init__(self, script):
+        if not isinstance(script, str):
+            script = "".join(line + "\n" for line in script)
+
+        names = set()
+        variables = set()
+
+        def compile_placeholder(match, line):
+            names.add(match.group(1))
+            if in_string(line, match.start()):
+                return f"%({match.group(1)})s"
+
+            variables.add(match.group(1))
+            return lua_prefix + match.group(1)
+
+        body = []
+        for line in script.replace("%", "%%").splitlines(keepends=True):
+            body.append(placeholder_re.sub(lambda match: compile_placeholder(match, line), line))
+
+        self.names = sorted(names)
+        header = "".join(f"{lua_prefix}{name} = %({name})s\n" for name in sorted(variables))
+        self.template = header + "".join(body)
+
+    def substitute(self, values):
+        """
+        Returns the script with the given values.
+
+        :param values: dict of the values of the parameters, they are written with str()
+        """
+        try:
+            return self.template % values
+        except KeyError as err:
+            raise ValueError(f"The value of the {err.args[0]} parameter is missing!") from None
+
+    def variants(self, matrix):
+        """
+        Yields the scripts of the rows of the parameter matrix.
+
+        :param matrix: dict of the columns of the parameter values (e.g. the result of grid) or a list of dicts
+        """
+        template = self.template
+        for values in matrix_rows(matrix):
+            try:
+                yield template % values
+            except KeyError as err:
+                raise ValueError(f"The value of the {err.args[0]} parameter is missing!") from None
+
+
+def matrix_rows(matrix):
+    """Converts the columns of a parameter matrix into a list of dicts."""
+    if not isinstance(matrix, dict):
+        return list(matrix)
+
+    names = list(matrix)
+    columns = [list(matrix[name]) for name in names]
+    if len({len(column) for column in columns}) > 1:
+        raise ValueError("The columns of the parameter matrix have different lengths!")
+
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def grid(**axes):
+    """
+    The full factorial design of the given parameter values.
+
+    :return: dict of the columns, every combination of the values is a row
+    """
+    names = list(axes)
+    rows = list(itertools.product(*(axes[name] for name in names)))
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+def run_sweep(template, matrix, executor):
+    """
+    Runs the variants of the template with a FEMM executor.
+
+    :param template: ScriptTemplate or a script with placeholders
+    :param matrix: the parameter matrix, see ScriptTemplate.variants
+    :param executor: a FEMM executor with a map method, e.g. FemmPool or FemmSession
+    :return: the rows of the matrix and the results of the executor in the same order
+    """
+    if not isinstance(template, ScriptTemplate):
+        template = ScriptTemplate(template)
+
+    rows = matrix_rows(matrix)
+    return rows, executor.map(list(template.variants(rows)))
@@ -0,0 +1,48 @@
+"""
+Scaling of FemmPool with the number of the concurrent jobs, FEMM is replaced by the stand-in executable of the tests,
+which sleeps for the given startup delay.
+
+Usage:
+
+    python benchmarks/bench_femm_pool.py 32 0.5
+"""
+import os
+import sys
+import time
+
+from adze_modeler.femm_wrapper import FemmPool
+from adze_modeler.femm_wrapper import FemmWriter
+
+fake_femm = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "test_femm_execution", "fake_femm.py")
+
+
+def script(i):
+    writer = FemmWriter()
+    writer.lua_model.extend(writer.init_problem())
+    writer.lua_model.append(writer.add_node(float(i), 0.0))
+    writer.lua_model.append(writer.save_as("test.fem"))
+    writer.lua_model.append(writer.analyze())
+    writer.lua_model.append(writer.write_out_result("index", i))
+    writer.lua_model.extend(writer.close())
+    return writer.lua_model
+
+
+def bench(nr_jobs, delay):
+    scripts = [script(i) for i in range(nr_jobs)]
+    command = [sys.executable, os.path.abspath(fake_femm), f"--delay={delay}"]
+
+    for processes in (1, 2, 4, 8, 16):
+        start = time.perf_counter()
+        results = FemmPool(processes, command).map(scripts)
+        elapsed = time.perf_counter() - start
+        failed = sum(result.error is not None for result in results)
+        print(
+            f"{processes:>3d} processes: {nr_jobs} jobs in {elapsed:6.2f} s, {nr_jobs / elapsed:6.2f} jobs/s, "
+            f"{failed} failed"
+        )
+
+
+if __name__ == "__main__":
+    nr_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    bench(nr_jobs, delay)
@@ -0,0 +1,39 @@
+"""
+Per-job overhead of a persistent FemmSession against a new FEMM process for every job. FEMM is replaced by the
+stand-in executable of the tests, which sleeps for the given startup delay.
+
+Usage:
+
+    python benchmarks/bench_femm_session.py 20 0.5
+"""
+import os
+import sys
+import time
+
+from adze_modeler.femm_wrapper import FemmPool
+from adze_modeler.femm_wrapper import FemmSession
+from bench_femm_pool import fake_femm
+from bench_femm_pool import script
+
+
+def bench(nr_jobs, delay):
+    scripts = [script(i) for i in range(nr_jobs)]
+    command = [sys.executable, os.path.abspath(fake_femm), f"--delay={delay}"]
+
+    start = time.perf_counter()
+    FemmPool(1, command).map(scripts)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with FemmSession(command) as session:
+        session.map(scripts)
+    warm = time.perf_counter() - start
+
+    print(f"new process per job: {nr_jobs} jobs in {cold:6.2f} s, {1e3 * cold / nr_jobs:7.1f} ms/job")
+    print(f"persistent session:  {nr_jobs} jobs in {warm:6.2f} s, {1e3 * warm / nr_jobs:7.1f} ms/job")
+
+
+if __name__ == "__main__":
+    nr_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    bench(nr_jobs, delay)
@@ -0,0 +1,44 @@
+"""
+Emission time of the FEMM commands of a large synthetic geometry with FemmWriter.
+
+Usage:
+
+    python benchmarks/bench_femm_writer.py 200000
+"""
+import math
+import sys
+import time
+
+from adze_modeler.femm_wrapper import FemmWriter
+
+
+def emit(writer, nr_entities):
+    """Emits the nodes, segments, arcs and block labels of nr_entities/4 small quads."""
+    lua_model = []
+    for i in range(nr_entities // 4):
+        x = float(i % 1000)
+        y = float(i // 1000)
+        lua_model.append(writer.add_node(x, y))
+        lua_model.append(writer.add_segment(x, y, x + 0.5, y))
+        lua_model.append(writer.add_arc(x + 0.5, y, x, y + 0.5, 90.0, 1))
+        lua_model.append(writer.add_blocklabel(x + 0.25, y + 0.25))
+        lua_model.append(writer.select_label(x + 0.25, y + 0.25))
+        lua_model.append(writer.clear_selected())
+    return lua_model
+
+
+def bench(nr_entities):
+    writer = FemmWriter()
+    start = time.perf_counter()
+    lua_model = emit(writer, nr_entities)
+    elapsed = time.perf_counter() - start
+    size = sum(len(line) + 1 for line in lua_model)
+    print(
+        f"{len(lua_model):>9d} commands ({size / 1e6:.1f} MB): {elapsed:7.3f} s, "
+        f"{1e6 * elapsed / len(lua_model):.2f} us/command, {math.floor(len(lua_model) / elapsed)} commands/s"
+    )
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [200_000]:
+        bench(size)
@@ -0,0 +1,50 @@
+"""
+Benchmark of the Geometry.merge_points with synthetic geometries.
+
+Every line shares its endpoints with the neighbouring lines (closed polygons), hence approximately the half of the
+nodes are merged. Usage:
+
+    python benchmarks/bench_merge_points.py 10000 100000 1000000
+"""
+import math
+import sys
+import time
+
+from adze_modeler.geometry import Geometry
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+def polygon_geometry(nr_nodes, sides=64):
+    """Creates a geometry from regular polygons, which contains approximately nr_nodes (duplicated) nodes."""
+    geo = Geometry()
+    nr_polygons = max(1, nr_nodes // (2 * sides))
+    id = 0
+    for k in range(nr_polygons):
+        cx = 10.0 * (k % 1000)
+        cy = 10.0 * (k // 1000)
+        corners = [
+            (cx + math.cos(2.0 * math.pi * i / sides), cy + math.sin(2.0 * math.pi * i / sides)) for i in range(sides)
+        ]
+        for i in range(sides):
+            x1, y1 = corners[i]
+            x2, y2 = corners[(i + 1) % sides]
+            geo.add_line(Line(Node(x1, y1, id), Node(x2, y2, id + 1), id + 2))
+            id += 3
+
+    return geo
+
+
+def bench(nr_nodes):
+    geo = polygon_geometry(nr_nodes)
+    before = len(geo.nodes)
+    start = time.perf_counter()
+    geo.merge_points()
+    elapsed = time.perf_counter() - start
+    print(f"{before:>10d} nodes -> {len(geo.nodes):>10d} nodes: {elapsed:8.3f} s")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        bench(size)
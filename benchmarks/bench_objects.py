@@ -0,0 +1,117 @@
+"""
+Memory and construction time of the slotted Node and Line classes compared to the same classes with a __dict__.
+
+The slots halve the objects themselves, but the float and int attribute values stay separate objects whatever the
+layout of the class. The last row stores the same nodes and lines in an ArrayGeometry, where the values are packed
+into numpy arrays as well.
+
+Usage:
+
+    python benchmarks/bench_objects.py 100000
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+class DictNode:
+    """The Node class as it was before adding __slots__, it stores its attributes in a __dict__."""
+
+    def __init__(self, x=0.0, y=0.0, id=None, label=None, precision=6):
+        self.x = x
+        self.y = y
+        self.id = id
+        self.label = label
+        self.precision = precision
+
+    def __add__(self, p):
+        return DictNode(self.x + p.x, self.y + p.y)
+
+
+class DictLine:
+    def __init__(self, start_pt, end_pt, id=None, label=None):
+        self.start_pt = start_pt
+        self.end_pt = end_pt
+        self.id = id
+        self.label = label
+
+
+def instance_size(obj):
+    """Size of the object and its __dict__ without the attribute values."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def build(node_class, line_class, count):
+    nodes = [node_class(float(i), 0.5 * i, i) for i in range(count)]
+    lines = [line_class(nodes[i - 1], nodes[i], i) for i in range(1, count)]
+    return nodes, lines
+
+
+def measure(node_class, line_class, count):
+    start = time.perf_counter()
+    nodes, lines = build(node_class, line_class, count)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(1, count):
+        nodes[i] + nodes[i - 1]
+    arithmetic = time.perf_counter() - start
+    instance = instance_size(nodes[0]) + instance_size(lines[0])
+    del nodes, lines
+
+    tracemalloc.start()
+    nodes, lines = build(node_class, line_class, count)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return instance, memory, elapsed, arithmetic
+
+
+def build_arrays(count):
+    geometry = ArrayGeometry(capacity=count)
+    indices = geometry.add_nodes(np.arange(count, dtype=float), 0.5 * np.arange(count), np.arange(count))
+    geometry.add_lines(np.column_stack((indices[:-1], indices[1:])), np.arange(1, count))
+    return geometry
+
+
+def measure_arrays(count):
+    start = time.perf_counter()
+    build_arrays(count)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    geometry = build_arrays(count)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del geometry
+    return memory, elapsed
+
+
+def bench(count):
+    print(f"{count} nodes and lines")
+    for name, node_class, line_class in (("__dict__", DictNode, DictLine), ("__slots__", Node, Line)):
+        instance, memory, elapsed, arithmetic = measure(node_class, line_class, count)
+        print(
+            f"{name:>10s}: node+line objects {instance:4d} bytes, with the attribute values {memory / count:6.1f} bytes, "
+            f"construction {elapsed:6.3f} s, addition {arithmetic:6.3f} s"
+        )
+
+    memory, elapsed = measure_arrays(count)
+    print(
+        f"{'arrays':>10s}: node+line rows, with the attribute values {memory / count:6.1f} bytes, construction {elapsed:6.3f} s"
+    )
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [100_000]:
+        bench(size)
@@ -0,0 +1,65 @@
+"""
+Script generation time of a parametric sweep: the model is written once with Parameter placeholders and compiled into
+a ScriptTemplate, then a variant is generated for every row of the parameter matrix.
+
+Usage:
+
+    python benchmarks/bench_sweep.py 10000
+"""
+import sys
+import time
+
+from adze_modeler.femm_wrapper import FemmWriter
+from adze_modeler.sweep import grid
+from adze_modeler.sweep import Parameter
+from adze_modeler.sweep import ScriptTemplate
+
+
+def coil_script(nr_turns=50):
+    """A coil model of nr_turns rectangular turns, the dimensions and the current are parameters."""
+    ri = Parameter("ri")
+    w = Parameter("w")
+    h = Parameter("h")
+    i = Parameter("i")
+
+    writer = FemmWriter()
+    writer.lua_model.extend(writer.init_problem())
+    writer.lua_model.append(writer.magnetic_problem(0, "millimeters", "axi"))
+    writer.lua_model.append(writer.add_circprop("icoil", i, 1))
+    for turn in range(nr_turns):
+        z = turn * h
+        writer.lua_model.append(writer.add_node(ri, z))
+        writer.lua_model.append(writer.add_node(ri + w, z))
+        writer.lua_model.append(writer.add_segment(ri, z, ri + w, z))
+        writer.lua_model.append(writer.add_blocklabel(ri + w / 2, z + h / 2))
+    writer.lua_model.append(writer.analyze())
+    writer.lua_model.extend(writer.close())
+    return writer.lua_model
+
+
+def bench(nr_variants):
+    start = time.perf_counter()
+    template = ScriptTemplate(coil_script())
+    compiled = time.perf_counter() - start
+
+    side = round(nr_variants ** (1 / 4))
+    matrix = grid(
+        ri=[1.0 + 0.1 * k for k in range(side)],
+        w=[0.5 + 0.05 * k for k in range(side)],
+        h=[0.2 + 0.01 * k for k in range(side)],
+        i=[1.0 * k for k in range(nr_variants // side**3)],
+    )
+
+    start = time.perf_counter()
+    variants = list(template.variants(matrix))
+    elapsed = time.perf_counter() - start
+    size = sum(len(variant) for variant in variants)
+
+    print(f"template compiled in {1e3 * compiled:.1f} ms, {len(template.template) / 1e3:.1f} kB")
+    print(
+        f"{len(variants)} variants ({size / 1e6:.1f} MB): {elapsed:.3f} s, {1e6 * elapsed / len(variants):.1f} us/variant"
+    )
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
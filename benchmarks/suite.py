@@ -0,0 +1,300 @@
+"""
+Benchmark suite of the import -> merge -> mesh -> script pipeline.
+
+The cases run on the bundled examples (the owl and the triangle svg images, the motor dxf) and on synthetic geometries,
+which are scaled up to many thousands of entities. Every case is run --repeat times, the best time is recorded, then it
+is run once more with tracemalloc to measure the peak of the allocated memory. The results are written into a JSON
+file, which can be compared with a stored baseline, a case is a regression if it is slower (or uses more memory) than
+the baseline by more than the threshold. The gmsh_writer cases are skipped if gmsh is not available.
+
+Usage:
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --threshold 0.25
+    python benchmarks/suite.py --quick --save-baseline benchmarks/baseline.json
+
+The exit code is 1 if there is a regression.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import ezdxf
+from adze_modeler.dxf_handlers import import_dxf
+from adze_modeler.femm_wrapper import FemmWriter
+from adze_modeler.geometry import Geometry
+from adze_modeler.intersections import planarize
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.svg_handlers import import_svg
+from bench_merge_points import polygon_geometry
+
+examples = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+SUITE_FORMAT = 1
+
+
+def synthetic_svg(file_name, nr_paths, sides=16):
+    """Writes an svg image of nr_paths closed polygons and nr_paths circles of cubic beziers."""
+    with open(file_name, "w") as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10000 10000">\n')
+        for k in range(nr_paths):
+            cx = 10.0 * (k % 1000)
+            cy = 10.0 * (k // 1000)
+            corners = [
+                (cx + 4.0 * math.cos(2.0 * math.pi * i / sides), cy + 4.0 * math.sin(2.0 * math.pi * i / sides))
+                for i in range(sides)
+            ]
+            d = "M " + " L ".join(f"{x:.6f},{y:.6f}" for x, y in corners) + " Z"
+            f.write(f'<path d="{d}"/>\n')
+            f.write(
+                f'<path d="M {cx + 2},{cy} C {cx + 2},{cy + 1.1} {cx + 1.1},{cy + 2} {cx},{cy + 2} '
+                f"C {cx - 1.1},{cy + 2} {cx - 2},{cy + 1.1} {cx - 2},{cy} "
+                f"C {cx - 2},{cy - 1.1} {cx - 1.1},{cy - 2} {cx},{cy - 2} "
+                f'C {cx + 1.1},{cy - 2} {cx + 2},{cy - 1.1} {cx + 2},{cy} Z"/>\n'
+            )
+        f.write("</svg>\n")
+
+
+def synthetic_dxf(file_name, nr_blocks):
+    """Writes a dxf file of nr_blocks rectangles with rounded corners (4 lines and 4 arcs)."""
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for k in range(nr_blocks):
+        x = 10.0 * (k % 1000)
+        y = 10.0 * (k // 1000)
+        msp.add_line((x + 1, y), (x + 5, y))
+        msp.add_line((x + 6, y + 1), (x + 6, y + 5))
+        msp.add_line((x + 5, y + 6), (x + 1, y + 6))
+        msp.add_line((x, y + 5), (x, y + 1))
+        msp.add_arc((x + 5, y + 1), 1.0, 270, 360)
+        msp.add_arc((x + 5, y + 5), 1.0, 0, 90)
+        msp.add_arc((x + 1, y + 5), 1.0, 90, 180)
+        msp.add_arc((x + 1, y + 1), 1.0, 180, 270)
+    doc.saveas(file_name)
+
+
+def arc_geometry(nr_arcs):
+    """Half circles, which share their endpoints with a closing line."""
+    geo = Geometry()
+    for k in range(nr_arcs):
+        x = 10.0 * (k % 1000)
+        y = 10.0 * (k // 1000)
+        geo.add_arc(CircleArc(Node(x + 1.0, y), Node(x, y), Node(x - 1.0, y)))
+        geo.add_line(Line(Node(x - 1.0, y), Node(x + 1.0, y)))
+    return geo
+
+
+def long_segments(nr_lines):
+    """
+    Long parallel lines, whose bounding boxes overlap: the worst case of the sort and sweep, planarize runs the sweep
+    line on them. The two sizes of the suite show its O(n log n) scaling.
+    """
+    geo = Geometry()
+    for k in range(nr_lines):
+        geo.add_line(Line(Node(0.0, 0.01 * k), Node(1000.0, 1000.0 + 0.01 * k)))
+    return geo
+
+
+def femm_script(geometry):
+    """Emits the FEMM commands of the geometry: the nodes, segments and arcs and a block label in every cell."""
+    writer = FemmWriter()
+    lua_model = writer.init_problem()
+    lua_model.extend(writer.write_geometry(geometry))
+    for node in geometry.nodes:
+        lua_model.append(writer.add_blocklabel(node.x + 0.25, node.y + 0.25))
+        lua_model.append(writer.select_label(node.x + 0.25, node.y + 0.25))
+        lua_model.append(writer.clear_selected())
+    lua_model.extend(writer.close())
+    return lua_model
+
+
+def merge_case(geometry_factory):
+    """The geometry is created in the setup, so only the merge is measured."""
+
+    def setup():
+        return (geometry_factory(),)
+
+    return setup, lambda geo: geo.merge_points()
+
+
+def cases(directory, quick=False):
+    """
+    The cases of the suite.
+
+    :param directory: the synthetic input files are written here
+    :param quick: smaller synthetic geometries
+    :return: dict of the names and the (setup, run) pairs, run is called with the arguments returned by setup
+    """
+    scale = 1 if quick else 10
+    synthetic_svg_file = os.path.join(directory, "synthetic.svg")
+    synthetic_svg(synthetic_svg_file, 100 * scale)
+    synthetic_dxf_file = os.path.join(directory, "synthetic.dxf")
+    synthetic_dxf(synthetic_dxf_file, 250 * scale)
+
+    owl = os.path.join(examples, "owl", "owl-shape.svg")
+    owl_detailed = os.path.join(examples, "owl", "owl-svgrepo-com.svg")
+    triangle = os.path.join(examples, "triangle", "triangle.svg")
+    motor = os.path.join(examples, "motor", "motor_geometry.dxf")
+
+    def constant(*args):
+        return lambda: args
+
+    suite = {
+        "import_svg/triangle": (constant(triangle), import_svg),
+        "import_svg/owl": (constant(owl), import_svg),
+        "import_svg/owl_detailed": (constant(owl_detailed), import_svg),
+        f"import_svg/synthetic_{200 * scale}_paths": (constant(synthetic_svg_file), import_svg),
+        "import_dxf/motor": (constant(motor), import_dxf),
+        f"import_dxf/synthetic_{2000 * scale}_entities": (constant(synthetic_dxf_file), import_dxf),
+        f"merge_points/polygons_{10_000 * scale}_nodes": merge_case(lambda: polygon_geometry(10_000 * scale)),
+        f"merge_points/arcs_{2000 * scale}": merge_case(lambda: arc_geometry(1000 * scale)),
+        f"planarize/long_segments_{300 * scale}": (lambda: (long_segments(300 * scale),), planarize),
+        f"planarize/long_segments_{3000 * scale}": (lambda: (long_segments(3000 * scale),), planarize),
+        "femm_writer/owl": (lambda: (import_svg(owl),), femm_script),
+        "femm_writer/motor": (lambda: (import_dxf(motor),), femm_script),
+        f"femm_writer/polygons_{10_000 * scale}_nodes": (
+            lambda: (merged(polygon_geometry(10_000 * scale)),),
+            femm_script,
+        ),
+    }
+
+    try:
+        from adze_modeler.gmsh import gmsh_writer
+    except (ImportError, OSError) as err:
+        print(f"The gmsh_writer cases are skipped: {err}", file=sys.stderr)
+    else:
+
+        def mesh(geo):
+            gmsh_writer(geo.nodes, geo.lines, geo.circle_arcs, geo.cubic_beziers)
+
+        suite["gmsh_writer/triangle"] = (lambda: (import_svg(triangle),), mesh)
+        suite["gmsh_writer/owl"] = (lambda: (import_svg(owl),), mesh)
+
+    return suite
+
+
+def merged(geometry):
+    geometry.merge_points()
+    return geometry
+
+
+def measure(setup, run, repeat):
+    """Returns the best time of repeat runs in seconds and the peak of the allocated memory of one run in bytes."""
+    best = math.inf
+    for _ in range(repeat):
+        args = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+
+    args = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def run_suite(repeat=5, quick=False, select=None):
+    """
+    Runs the cases of the suite.
+
+    :param select: runs only the cases, whose name contains this string
+    :return: the results as a JSON serializable dict
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (setup, run) in cases(directory, quick).items():
+            if select is not None and select not in name:
+                continue
+
+            elapsed, peak = measure(setup, run, repeat)
+            results[name] = {"time": elapsed, "peak_memory": peak}
+            print(f"{name:<45s} {1000 * elapsed:10.2f} ms {peak / 2 ** 20:10.2f} MiB")
+
+    return {
+        "format": SUITE_FORMAT,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "repeat": repeat,
+        "cases": results,
+    }
+
+
+def compare(results, baseline, threshold=0.25, min_time=0.005):
+    """
+    Compares the results with the baseline, only the cases of both are compared.
+
+    :param threshold: the allowed relative increase of the time and of the peak memory
+    :param min_time: the allowed absolute increase of the time in seconds, the short cases are noisy
+    :return: list of the regressions as (name, metric, baseline value, current value)
+    """
+    if baseline.get("quick") != results.get("quick"):
+        print("The baseline and the results have different sizes (--quick), they are not compared.", file=sys.stderr)
+        return []
+
+    regressions = []
+    for name, current in results["cases"].items():
+        reference = baseline["cases"].get(name)
+        if reference is None:
+            continue
+
+        if current["time"] > max(reference["time"] * (1.0 + threshold), reference["time"] + min_time):
+            regressions.append((name, "time", reference["time"], current["time"]))
+        if current["peak_memory"] > reference["peak_memory"] * (1.0 + threshold):
+            regressions.append((name, "peak_memory", reference["peak_memory"], current["peak_memory"]))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite of the adze-modeler pipeline.")
+    parser.add_argument("--output", help="the results are written into this JSON file")
+    parser.add_argument("--baseline", help="the results are compared with this JSON file")
+    parser.add_argument("--save-baseline", help="the results are written as a new baseline into this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative increase (default: 0.25)")
+    parser.add_argument("--min-time", type=float, default=0.005, help="allowed increase in seconds (default: 0.005)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of the timed runs of a case (default: 5)")
+    parser.add_argument("--quick", action="store_true", help="smaller synthetic geometries")
+    parser.add_argument("--select", help="runs only the cases, whose name contains this string")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.repeat, args.quick, args.select)
+    for file_name in (args.output, args.save_baseline):
+        if file_name:
+            with open(file_name, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold, args.min_time)
+        for name, metric, reference, current in regressions:
+            print(f"REGRESSION {name} {metric}: {reference:.6g} -> {current:.6g} ({current / reference - 1.0:+.0%})")
+
+        if regressions:
+            return 1
+
+        print(f"No regression against {args.baseline} (threshold {args.threshold:.0%}).")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
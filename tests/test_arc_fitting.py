@@ -0,0 +1,101 @@
+import math
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.arc_fitting import fit_arc
+from adze_modeler.arc_fitting import fit_arcs
+from adze_modeler.arc_fitting import line_chains
+from adze_modeler.arc_fitting import segment_angle
+from adze_modeler.arc_fitting import tolerance_maxseg
+from adze_modeler.femm_wrapper import FemmWriter
+from adze_modeler.geometry import Geometry
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+def polygon(geo, points, closed=False, label=None):
+    nodes = [Node(x, y) for x, y in points]
+    if closed:
+        nodes.append(nodes[0])
+    for start, end in zip(nodes, nodes[1:]):
+        geo.add_line(Line(start, end, label=label))
+    return nodes
+
+
+def circle_points(n, radius=10.0, start=0.0, stop=360.0):
+    angles = np.radians(np.linspace(start, stop, n + 1))
+    return np.column_stack([radius * np.cos(angles), radius * np.sin(angles)])
+
+
+class TestArcFitting(TestCase):
+    def test_fit_arc(self):
+        self.assertEqual((0.0, 0.0), tuple(np.round(fit_arc(circle_points(10, stop=90.0), 0.05), 9)))
+        # straight, zig-zag and too long polylines
+        self.assertIsNone(fit_arc(np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [3.0, 0.0]]), 1.0e-3))
+        self.assertIsNone(fit_arc(np.array([[0.0, 0.0], [1.0, 0.1], [2.0, 0.0], [3.0, 0.1]]), 1.0e-3))
+        self.assertIsNone(fit_arc(circle_points(30, stop=270.0), 1.0e-3))
+
+    def test_line_chains(self):
+        geo = Geometry()
+        polygon(geo, [(0.0, 0.0), (1.0, 0.0), (2.0, 0.0)])
+        polygon(geo, [(0.0, 1.0), (1.0, 1.0), (2.0, 1.0)], closed=True)
+
+        chains = line_chains(geo)
+        self.assertEqual([2, 3], [len(lines) for nodes, lines in chains])
+        self.assertIs(chains[1][0][0], chains[1][0][-1])
+
+    def test_full_circle(self):
+        geo = Geometry()
+        polygon(geo, circle_points(360)[:-1], closed=True)
+
+        report = fit_arcs(geo, 1.0e-3)
+        self.assertEqual((360, 2, 360, 2), report)
+        self.assertEqual([], geo.lines)
+        for arc in geo.circle_arcs:
+            self.assertAlmostEqual(0.0, arc.center_pt.x)
+            self.assertAlmostEqual(
+                180.0,
+                math.degrees(math.atan2(arc.end_pt.y, arc.end_pt.x) - math.atan2(arc.start_pt.y, arc.start_pt.x))
+                % 360.0,
+            )
+
+    def test_clockwise_chain_between_lines(self):
+        geo = Geometry()
+        points = [(-20.0, 10.0)] + circle_points(30, start=90.0, stop=0.0).tolist() + [(10.0, -20.0)]
+        nodes = polygon(geo, points, label="rotor")
+
+        report = fit_arcs(geo, 0.01)
+        self.assertEqual((32, 3, 30, 1), report)
+        arc = geo.circle_arcs[0]
+        self.assertIs(nodes[-2], arc.start_pt)
+        self.assertIs(nodes[1], arc.end_pt)
+        self.assertEqual("rotor", arc.label)
+        self.assertEqual(2, len(geo.lines))
+
+    def test_array_geometry(self):
+        geo = ArrayGeometry()
+        points = circle_points(360)[:-1]
+        nodes = geo.add_nodes(points[:, 0], points[:, 1])
+        geo.add_lines(np.column_stack([nodes, np.roll(nodes, -1)]))
+        self.assertEqual([360], [len(lines) for nodes, lines in line_chains(geo)])
+
+        report = fit_arcs(geo, 1.0e-3)
+        self.assertEqual((360, 2, 360, 2), report)
+        self.assertEqual(0, len(geo.line_table))
+        self.assertEqual(2, len(geo.arc_table))
+        # the two end nodes of the arcs and their centers
+        self.assertEqual(4, len(geo.store))
+
+    def test_maxseg(self):
+        self.assertAlmostEqual(math.degrees(2.0 * math.acos(0.999)), segment_angle(10.0, 0.01))
+        self.assertEqual(1.0, segment_angle(10.0, 1.0e-6))
+        self.assertEqual(10.0, segment_angle(10.0, 5.0))
+
+        geo = Geometry()
+        polygon(geo, circle_points(90, stop=90.0))
+        fit_arcs(geo, 1.0e-3)
+        commands = FemmWriter().write_geometry(geo, maxseg=tolerance_maxseg(1.0, max_angle=5.0))
+        self.assertEqual(3, len(commands))
+        self.assertTrue(commands[2].startswith("mi_addarc(10.0, 0.0, "))
+        self.assertTrue(commands[2].endswith(", 5.0)"))
@@ -0,0 +1,122 @@
+from math import pi
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.array_geometry import from_arrays
+from adze_modeler.array_geometry import NodeStore
+from adze_modeler.array_geometry import to_arrays
+from adze_modeler.geometry import Geometry
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+class TestNodeStore(TestCase):
+    def test_add_and_grow(self):
+        store = NodeStore(capacity=1)
+        store.add(1.0, 2.0, id=5, label="a")
+        store.add(3.0, 4.0)
+        store.extend([5.0, 6.0], [7.0, 8.0], [10, 11])
+
+        self.assertEqual(4, len(store))
+        self.assertEqual([1.0, 3.0, 5.0, 6.0], store.x.tolist())
+        self.assertEqual((3.0, 4.0), store.view(1).as_tuple())
+        self.assertEqual(5, store.view(0).id)
+        self.assertIsNone(store.view(1).id)
+        self.assertEqual("a", store.view(0).label)
+
+    def test_view_writes_the_arrays(self):
+        store = NodeStore()
+        node = store.view(store.add(1.0, 0.0))
+        node.move_xy(1.0, 2.0)
+
+        self.assertEqual((2.0, 2.0), (store.x[0], store.y[0]))
+
+
+class TestArrayGeometry(TestCase):
+    def test_object_api(self):
+        geo = ArrayGeometry()
+
+        a = Node(1.0, 0.0, id=1)
+        b = Node(0.5, 0.0, id=2)
+        geo.add_line(Line(a, b, id=3, label="test"))
+        geo.add_arc(CircleArc(Node(1.0, 0.0), Node(0.0, 0.0), Node(0.0, 1.0), id=4))
+
+        self.assertEqual(5, len(geo.nodes))
+        self.assertEqual("test", geo.lines[0].label)
+        self.assertEqual((0.5, 0.0), geo.lines[0].end_pt.as_tuple())
+        self.assertEqual((0.0, 0.0), geo.circle_arcs[0].center_pt.as_tuple())
+
+        # the endpoint of an entity can be replaced by a node of the geometry
+        geo.lines[0].end_pt = geo.nodes[4]
+        self.assertEqual((0.0, 1.0), geo.lines[0].end_pt.as_tuple())
+
+    def test_index_arrays(self):
+        geo = ArrayGeometry(capacity=2)
+        indices = geo.add_nodes([0.0, 1.0, 1.0, 0.0], [0.0, 0.0, 1.0, 1.0], ids=[0, 1, 2, 3])
+        geo.add_lines(np.column_stack([indices, np.roll(indices, -1)]))
+
+        self.assertEqual(4, len(geo.lines))
+        self.assertEqual(3, geo.lines[3].start_pt.id)
+        self.assertEqual(0, geo.lines[3].end_pt.id)
+
+    def test_merge_points(self):
+        geo = ArrayGeometry()
+
+        geo.add_line(Line(Node(0.0, 0.0, id=0), Node(1.0, 0.0, id=1)))
+        geo.add_line(Line(Node(1.0 + 1e-7, 0.0, id=2), Node(1.0, 1.0, id=3)))
+        geo.merge_points()
+
+        self.assertEqual([0, 1, 3], [node.id for node in geo.nodes])
+        self.assertEqual([[0, 1], [1, 2]], geo.line_table.rows.tolist())
+
+    def test_transform_selection(self):
+        geo = ArrayGeometry()
+        indices = geo.add_nodes([1.0, 2.0, 2.0], [0.0, 0.0, 1.0], ids=[0, 1, 2])
+        geo.add_lines([[indices[0], indices[1]], [indices[1], indices[2]]])
+        geo.lines[0].label = "rotor"
+
+        self.assertEqual(2, geo.rotate(pi / 2, label="rotor"))
+        self.assertEqual([(0.0, 1.0), (0.0, 2.0), (2.0, 1.0)], [node.as_tuple() for node in geo.nodes])
+
+        self.assertEqual(1, geo.translate(1.0, -1.0, bbox=(1.0, 0.0, 3.0, 3.0)))
+        self.assertEqual((3.0, 0.0), geo.lines[1].end_pt.as_tuple())
+        self.assertEqual([1, 2], [node.id for node in geo.select_nodes(id_range=(1, 2))])
+
+    def test_arrays_of_a_geometry(self):
+        geo = Geometry()
+        geo.add_line(Line(Node(0.0, 0.0, id=0), Node(1.0, 0.0, id=1), id=2))
+        geo.merge_points()
+        geo.add_arc(CircleArc(geo.lines[0].end_pt, Node(0.0, 0.0, id=3), Node(0.0, 1.0, id=4), id=5))
+
+        arrays = to_arrays(geo)
+        self.assertEqual([0, 1, 4, 3], arrays["node_ids"].tolist())
+        self.assertEqual([[0, 1]], arrays["lines"].tolist())
+        self.assertEqual([[1, 3, 2]], arrays["arcs"].tolist())
+        self.assertEqual((0, 4), arrays["beziers"].shape)
+
+        copy = from_arrays(arrays)
+        self.assertEqual(2, copy.lines[0].id)
+        self.assertEqual((0.0, 1.0), copy.circle_arcs[0].end_pt.as_tuple())
+        self.assertEqual(arrays["arcs"].tolist(), to_arrays(copy)["arcs"].tolist())
+
+    def test_editable_and_apply(self):
+        geo = ArrayGeometry()
+        a = geo.new_node(0.0, 0.0, id=1)
+        b = geo.new_node(1.0, 0.0)
+        geo.add_line(Line(a, b, label="edge"))
+
+        edited = geo.editable()
+        self.assertIs(edited.lines[0].end_pt, edited.nodes[1])
+        self.assertEqual((1, "edge"), (edited.nodes[0].id, edited.lines[0].label))
+
+        c = Node(1.0, 1.0)
+        edited.lines.append(Line(edited.nodes[1], c, id=7))
+        edited.nodes.append(c)
+        geo.apply(edited)
+
+        self.assertEqual([[0, 1], [1, 2]], geo.line_table.rows.tolist())
+        self.assertEqual([None, 7], [line.id for line in geo.lines])
+        self.assertEqual(["edge", None], [line.label for line in geo.lines])
+        self.assertEqual([1, None, None], [node.id for node in geo.nodes])
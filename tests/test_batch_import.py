@@ -0,0 +1,44 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.batch_import import import_files
+from adze_modeler.geometry import Geometry
+from importlib_resources import files
+
+
+class TestBatchImport(TestCase):
+    def setUp(self):
+        handle, self.broken_file = tempfile.mkstemp(suffix=".dxf")
+        with os.fdopen(handle, "w") as broken:
+            broken.write("this is not a DXF file")
+
+        self.file_names = [
+            files("examples.owl").joinpath("owl-shape.svg").as_posix(),
+            self.broken_file,
+            files("examples.triangle").joinpath("triangle.svg").as_posix(),
+            files("examples.motor").joinpath("motor_geometry.dxf").as_posix(),
+        ]
+
+    def tearDown(self):
+        os.remove(self.broken_file)
+
+    def test_results_in_input_order(self):
+        results = import_files(self.file_names, processes=2)
+
+        self.assertEqual(self.file_names, [result.file_name for result in results])
+        self.assertIsNone(results[1].geometry)
+        self.assertIn(self.broken_file, results[1].error)
+
+        self.assertIsInstance(results[2].geometry, ArrayGeometry)
+        self.assertEqual(3, len(results[2].geometry.nodes))
+        self.assertEqual(3, len(results[2].geometry.lines))
+        self.assertEqual(368, len(results[3].geometry.lines))
+
+    def test_geometry_objects(self):
+        results = import_files(self.file_names[2:3], compact=False)
+
+        self.assertIsInstance(results[0].geometry, Geometry)
+        self.assertIsNone(results[0].error)
+        self.assertIs(results[0].geometry.lines[0].end_pt, results[0].geometry.lines[1].start_pt)
@@ -0,0 +1,68 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.bezier import flatten
+from adze_modeler.bezier import flatten_beziers
+from adze_modeler.bezier import segment_counts
+from adze_modeler.geometry import Geometry
+from adze_modeler.geometry_cache import GeometryCache
+from adze_modeler.objects import CubicBezier
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from importlib_resources import files
+
+# quarter circle of unit radius
+QUARTER = np.array([[[1.0, 0.0], [1.0, 0.5523], [0.5523, 1.0], [0.0, 1.0]]])
+
+
+class TestFlattening(TestCase):
+    def test_straight_curve(self):
+        points = np.array([[[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [3.0, 0.0]]])
+        self.assertEqual([1], segment_counts(points, 1.0e-6).tolist())
+
+    def test_segment_counts(self):
+        self.assertEqual([2], segment_counts(QUARTER, 0.1).tolist())
+        self.assertEqual([19], segment_counts(QUARTER, 1.0e-3).tolist())
+        self.assertEqual([5], segment_counts(QUARTER, 1.0e-3, max_segments=5).tolist())
+        self.assertRaises(ValueError, segment_counts, QUARTER, 0.0)
+
+    def test_flatten(self):
+        xy, counts = flatten(np.concatenate([QUARTER, QUARTER]), 1.0e-3)
+
+        self.assertEqual([19, 19], counts.tolist())
+        self.assertEqual((36, 2), xy.shape)
+        # the inner points are on the curve, which is close to the unit circle
+        self.assertTrue(np.allclose(np.hypot(xy[:, 0], xy[:, 1]), 1.0, atol=1.0e-3))
+
+    def test_flatten_beziers(self):
+        geo = Geometry()
+        a = Node(1.0, 0.0)
+        b = Node(0.0, 1.0)
+        geo.add_cubic_bezier(CubicBezier(a, Node(1.0, 0.5523), Node(0.5523, 1.0), b, label="curve"))
+        geo.add_line(Line(b, a))
+
+        self.assertEqual(19, flatten_beziers(geo, 1.0e-3))
+        self.assertEqual([], geo.cubic_beziers)
+        self.assertEqual(20, len(geo.lines))
+        self.assertIs(a, geo.lines[1].start_pt)
+        self.assertIs(b, geo.lines[-1].end_pt)
+        self.assertEqual("curve", geo.lines[-1].label)
+        # the control points are removed, the endpoints are kept
+        self.assertEqual(4 + 18, len(geo.nodes))
+
+    def test_flatten_cached_geometry(self):
+        owl = files("examples.owl").joinpath("owl-shape.svg").as_posix()
+        with tempfile.TemporaryDirectory() as directory:
+            geo = GeometryCache(directory).import_file(owl)
+
+        nr_beziers = len(geo.cubic_beziers)
+        nr_lines = len(geo.lines)
+        self.assertGreater(nr_beziers, 0)
+
+        new_lines = flatten_beziers(geo, 1.0e-2)
+        self.assertGreaterEqual(new_lines, nr_beziers)
+        self.assertEqual([], geo.cubic_beziers)
+        self.assertEqual(nr_lines + new_lines, len(geo.lines))
+        # the polylines are connected to the stored nodes
+        self.assertEqual(len(geo.store), len({(n.x, n.y) for line in geo.lines for n in (line.start_pt, line.end_pt)}))
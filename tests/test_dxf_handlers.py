@@ -1,6 +1,12 @@
+import os
+import tempfile
 from unittest import TestCase
 
+import ezdxf
+from adze_modeler.array_geometry import ArrayGeometry
 from adze_modeler.dxf_handlers import import_dxf
+from adze_modeler.dxf_handlers import import_dxf_stream
+from adze_modeler.dxf_handlers import iter_dxf
 from importlib_resources import files
 
 
@@ -10,3 +16,59 @@ class TestDXFImport(TestCase):
         print(eml)
         geo = import_dxf(eml.as_posix())
         print(geo)
+
+        # the motor is built from block references, they are exploded into lines and arcs
+        self.assertEqual(368, len(geo.lines))
+        self.assertEqual(149, len(geo.circle_arcs))
+
+    def test_streaming_import_of_the_motor(self):
+        eml = files("examples.motor").joinpath("motor_geometry.dxf")
+        geo = import_dxf_stream(eml.as_posix())
+
+        self.assertEqual(368, len(geo.lines))
+        self.assertEqual(149, len(geo.circle_arcs))
+
+
+class TestDXFEntities(TestCase):
+    def setUp(self):
+        doc = ezdxf.new()
+        msp = doc.modelspace()
+        msp.add_line((0.0, 0.0), (2.0, 0.0))
+        msp.add_arc((1.0, 0.0), 1.0, 0.0, 180.0)
+        msp.add_circle((5.0, 5.0), 1.0)
+        msp.add_lwpolyline([(10.0, 0.0, 0.0), (11.0, 0.0, 1.0), (11.0, 2.0, 0.0)], format="xyb", close=True)
+        msp.add_polyline2d([(20.0, 0.0), (21.0, 0.0), (21.0, 1.0)])
+
+        handle, self.file_name = tempfile.mkstemp(suffix=".dxf")
+        os.close(handle)
+        doc.saveas(self.file_name)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def test_import(self):
+        geo = import_dxf(self.file_name)
+
+        # line + 2 lines of the lwpolyline + 2 lines of the polyline
+        self.assertEqual(5, len(geo.lines))
+        # arc + 2 half circles + the bulge of the lwpolyline
+        self.assertEqual(4, len(geo.circle_arcs))
+
+        arc = geo.circle_arcs[0]
+        self.assertEqual((2.0, 0.0), arc.start_pt.as_tuple())
+        self.assertEqual((1.0, 0.0), arc.center_pt.as_tuple())
+
+        bulge = geo.circle_arcs[3]
+        self.assertEqual((11.0, 0.0), bulge.start_pt.as_tuple())
+        self.assertEqual((11.0, 1.0), bulge.center_pt.as_tuple())
+        self.assertEqual((11.0, 2.0), bulge.end_pt.as_tuple())
+
+    def test_streaming_batches(self):
+        batches = list(iter_dxf(self.file_name, batch_size=2))
+
+        self.assertEqual(5, len(batches))
+        streamed = import_dxf_stream(self.file_name, ArrayGeometry())
+        self.assertEqual(5, len(streamed.lines))
+        self.assertEqual(4, len(streamed.circle_arcs))
+        # the endpoints are merged during the import
+        self.assertEqual(streamed.lines[0].end_pt.index, streamed.circle_arcs[0].start_pt.index)
@@ -0,0 +1,120 @@
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from unittest import TestCase
+
+from adze_modeler.femm_cache import FemmResultCache
+from adze_modeler.femm_cache import MemoryBackend
+from adze_modeler.femm_cache import normalize_script
+from adze_modeler.femm_cache import script_key
+from adze_modeler.femm_cache import SQLiteBackend
+from adze_modeler.femm_wrapper import FemmExecutor
+from adze_modeler.femm_wrapper import FemmPool
+from adze_modeler.femm_wrapper import FemmWriter
+
+fake_femm = os.path.join(os.path.dirname(__file__), "test_femm_execution", "fake_femm.py")
+
+
+def node_script(x, out_file="femm_data.csv", fem_file="test.fem"):
+    writer = FemmWriter()
+    writer.lua_model.extend(writer.init_problem(out_file))
+    writer.lua_model.append(writer.add_node(x, 0.0))
+    writer.lua_model.append(writer.save_as(fem_file))
+    writer.lua_model.append(writer.analyze())
+    writer.lua_model.append(writer.write_out_result("x", x))
+    writer.lua_model.extend(writer.close())
+    return writer.lua_model
+
+
+class TestScriptKey(TestCase):
+    def test_normalize(self):
+        lines = normalize_script('-- comment\n\n  remove("a.csv")\nfile_out = openfile("/tmp/a.csv", "w")\n')
+        self.assertEqual(['file_out = openfile("", "w")'], lines)
+        self.assertEqual(['mi_saveas("")'], normalize_script(['mi_saveas("/tmp/femm_1/test.fem")']))
+
+    def test_key(self):
+        self.assertEqual(script_key(node_script(1.0)), script_key(node_script(1.0, "out.csv", "/tmp/x/model.fem")))
+        self.assertEqual(script_key(node_script(1.0)), script_key("\n".join(node_script(1.0))))
+        self.assertNotEqual(script_key(node_script(1.0)), script_key(node_script(2.0)))
+
+
+class TestBackends(TestCase):
+    def test_memory_lru(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", "1")
+        backend.set("b", "2")
+        backend.get("a")
+        backend.set("c", "3")
+
+        self.assertEqual(2, len(backend))
+        self.assertEqual("1", backend.get("a"))
+        self.assertIsNone(backend.get("b"))
+
+    def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.db")
+            backend = SQLiteBackend(path)
+            backend.set("a", "x, 1.0\n")
+            backend.close()
+
+            backend = SQLiteBackend(path)
+            self.assertEqual("x, 1.0\n", backend.get("a"))
+            self.assertIsNone(backend.get("b"))
+            backend.clear()
+            self.assertEqual(0, len(backend))
+            backend.close()
+
+
+class TestFemmResultCache(TestCase):
+    def test_cached_pool(self):
+        cache = FemmResultCache()
+        pool = FemmPool(2, [sys.executable, fake_femm], cache=cache)
+
+        first = pool.map([node_script(1.0), node_script(2.0)])
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+        # the cached results are given back without running FEMM
+        pool.femm_command = [sys.executable, "-c", "import sys; sys.exit(1)"]
+        second = pool.map([node_script(2.0, "other.csv"), node_script(1.0)])
+
+        self.assertEqual((2, 2), (cache.hits, cache.misses))
+        self.assertEqual([first[1].output, first[0].output], [result.output for result in second])
+        self.assertEqual("x, 1.0\n", second[1].output)
+
+    def test_failed_jobs_are_not_cached(self):
+        cache = FemmResultCache()
+        pool = FemmPool(1, [sys.executable, "-c", "import sys; sys.exit(1)"], cache=cache)
+        pool.map([node_script(1.0)])
+
+        self.assertEqual(0, len(cache))
+
+    def test_counters_of_the_threads(self):
+        cache = FemmResultCache()
+        cache.store("a", "x, 1.0\n")
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(cache.load, ["a", "b"] * 2000))
+
+        self.assertEqual((2000, 2000), (cache.hits, cache.misses))
+
+    def test_cached_executor(self):
+        cache = FemmResultCache()
+        cache.store(cache.key(node_script(1.0)), "x, 1.0\n")
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            try:
+                with open("test.lua", "w") as f:
+                    f.writelines(line + "\n" for line in node_script(1.0))
+
+                with mock.patch("adze_modeler.femm_wrapper.subprocess.run") as run:
+                    FemmExecutor().run_femm("test.lua", cache=cache)
+                    run.assert_not_called()
+
+                with open("femm_data.csv") as f:
+                    self.assertEqual("x, 1.0\n", f.read())
+                self.assertEqual((1, 0), (cache.hits, cache.misses))
+            finally:
+                os.chdir(cwd)
@@ -0,0 +1,120 @@
+"""
+Stand-in for the FEMM executable in the tests and the benchmarks, it needs no wine and no FEMM.
+
+It reads the lua script given by the -lua-script=... argument and mimics the file outputs of the commands, which are
+generated by the FemmWriter: the result file of openfile, the written key-value pairs, the saved .fem and the solved
+.ans files. The expressions are not evaluated, a numeric literal or a variable with an assigned numeric literal is
+written as it is, every other value is written as 0.
+
+The driver script of a FemmSession is recognized by its first line, the polling loop of the driver is done here: the
+job.lua files are run until the stop file appears. With --crash-after=n the session exits without notice after n jobs.
+
+Usage:
+
+    python fake_femm.py [--delay=seconds] [--crash-after=n] -lua-script=script.lua
+"""
+import os
+import re
+import sys
+import time
+
+openfile_re = re.compile(r'(\w+)\s*=\s*openfile\("([^"]*)"')
+remove_re = re.compile(r'^remove\("([^"]*)"\)')
+saveas_re = re.compile(r'^\w\w_saveas\("([^"]*)"\)')
+write_re = re.compile(r"^write\((\w+), '([^']*)', ', ', (.*), \"\\n\"\)")
+assignment_re = re.compile(r"^(\w+) = ([-+.\deE]+)$")
+
+
+def value_of(expression, variables):
+    try:
+        return str(float(variables.get(expression, expression)))
+    except ValueError:
+        return "0"
+
+
+def run(script_file):
+    files = {}
+    variables = {}
+    saved = None
+
+    with open(script_file) as script:
+        for line in script:
+            line = line.strip()
+
+            match = assignment_re.match(line)
+            if match:
+                variables[match.group(1)] = match.group(2)
+                continue
+
+            match = openfile_re.match(line)
+            if match:
+                files[match.group(1)] = open(match.group(2), "w")
+                continue
+
+            match = remove_re.match(line)
+            if match:
+                if os.path.isfile(match.group(1)):
+                    os.remove(match.group(1))
+                continue
+
+            match = saveas_re.match(line)
+            if match:
+                saved = match.group(1)
+                with open(saved, "w") as f:
+                    f.write("[Format] = 4.0\n")
+                continue
+
+            if line.startswith("mi_analyze") and saved is not None:
+                with open(os.path.splitext(saved)[0] + ".ans", "w") as f:
+                    f.write("[Format] = 4.0\n")
+                continue
+
+            match = write_re.match(line)
+            if match:
+                files[match.group(1)].write(f"{match.group(2)}, {value_of(match.group(3).strip(), variables)}\n")
+                continue
+
+            if line.startswith("quit()"):
+                break
+
+    for f in files.values():
+        f.close()
+
+
+def run_session(crash_after=None):
+    nr_jobs = 0
+    while not os.path.exists("stop"):
+        if os.path.exists("job.lua"):
+            if nr_jobs == crash_after:
+                sys.exit(1)
+
+            run("job.lua")
+            os.remove("job.lua")
+            open("done.tmp", "w").close()
+            os.replace("done.tmp", "done")
+            nr_jobs += 1
+        else:
+            time.sleep(0.001)
+
+
+if __name__ == "__main__":
+    script_file = None
+    crash_after = None
+    for arg in sys.argv[1:]:
+        if arg.startswith("--delay="):
+            time.sleep(float(arg[len("--delay=") :]))
+        elif arg.startswith("--crash-after="):
+            crash_after = int(arg[len("--crash-after=") :])
+        elif arg.startswith("-lua-script="):
+            script_file = arg[len("-lua-script=") :]
+
+    if script_file is None or not os.path.isfile(script_file):
+        sys.exit("The lua script is not found!")
+
+    with open(script_file) as f:
+        is_driver = f.readline().startswith("-- adze-modeler session driver")
+
+    if is_driver:
+        run_session(crash_after)
+    else:
+        run(script_file)
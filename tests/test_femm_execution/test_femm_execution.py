@@ -1,8 +1,17 @@
+import asyncio
 import os
+import shutil
+import sys
+import time
 import unittest
 from math import pi
 
+from adze_modeler import instrumentation
+from adze_modeler.femm_results import read_result
+from adze_modeler.femm_wrapper import AsyncFemmExecutor
 from adze_modeler.femm_wrapper import FemmExecutor
+from adze_modeler.femm_wrapper import FemmPool
+from adze_modeler.femm_wrapper import FemmSession
 from adze_modeler.femm_wrapper import FemmWriter
 from adze_modeler.femm_wrapper import MagneticMaterial
 from adze_modeler.femm_wrapper import MagneticMixed
@@ -113,10 +122,10 @@ class TestFemmWriterWithExecutor(unittest.TestCase):
         writer.lua_model.append(writer.save_as("test.fem"))
         writer.lua_model.append(writer.analyze())
         writer.lua_model.append(writer.load_solution())
-        writer.lua_model.append(writer.get_circuit_properties("icoil", result='current, volt, flux'))
-        writer.lua_model.append(writer.write_out_result("current", 'current'))
-        writer.lua_model.append(writer.write_out_result("volt", 'volt'))
-        writer.lua_model.append(writer.write_out_result("flux", 'flux'))
+        writer.lua_model.append(writer.get_circuit_properties("icoil", result="current, volt, flux"))
+        writer.lua_model.append(writer.write_out_result("current", "current"))
+        writer.lua_model.append(writer.write_out_result("volt", "volt"))
+        writer.lua_model.append(writer.write_out_result("flux", "flux"))
 
         # print(writer.lua_model)
         writer.lua_model.extend(writer.close())
@@ -124,8 +133,154 @@ class TestFemmWriterWithExecutor(unittest.TestCase):
         writer.write("test.lua")
         FemmExecutor().run_femm("test.lua")
 
-        with open('femm_data.csv') as f:
-            content = f.readlines()
-            print(content[2])
-            flux = content[2].split(',')
-            self.assertEqual(round(float(flux[1]), 4), 0.0006)
+        result = read_result("femm_data.csv", {"current": complex, "volt": complex, "flux": complex})
+        self.assertEqual(round(result["flux"].real, 4), 0.0006)
+
+
+def fake_femm_command(delay=0.0):
+    """Command of the stand-in FEMM executable, which mimics the output files of FEMM."""
+    return [sys.executable, os.path.join(os.path.dirname(__file__), "fake_femm.py"), f"--delay={delay}"]
+
+
+def index_script(i):
+    writer = FemmWriter()
+    writer.lua_model.extend(writer.init_problem())
+    writer.lua_model.append(writer.save_as("test.fem"))
+    writer.lua_model.append(writer.analyze())
+    writer.lua_model.append(writer.write_out_result("index", i))
+    writer.lua_model.extend(writer.close())
+    return writer.lua_model
+
+
+class TestFemmPool(unittest.TestCase):
+    def test_isolated_jobs(self):
+        pool = FemmPool(4, fake_femm_command(), keep_files=True)
+        results = pool.map([index_script(i) for i in range(6)])
+
+        self.assertEqual(list(range(6)), [result.index for result in results])
+        for i, result in enumerate(results):
+            self.assertIsNone(result.error)
+            self.assertEqual(f"index, {float(i)}\n", result.output)
+            self.assertTrue(os.path.isfile(os.path.join(pool.workdirs[i], "test.ans")))
+
+        self.assertEqual(6, len(set(pool.workdirs.values())))
+        for workdir in pool.workdirs.values():
+            shutil.rmtree(workdir)
+
+    def test_results_as_completed(self):
+        pool = FemmPool(2, fake_femm_command())
+        scripts = [index_script(0), "quit()\n"]
+
+        results = {result.index: result for result in pool.run(scripts)}
+
+        self.assertEqual("index, 0.0\n", results[0].output)
+        self.assertIsNone(results[1].output)
+        self.assertIn("femm_data.csv", results[1].error)
+
+    def test_failed_job(self):
+        pool = FemmPool(1, [sys.executable, "-c", "import sys; sys.exit(3)"])
+        result = pool.map([index_script(0)])[0]
+
+        self.assertEqual(3, result.returncode)
+        self.assertEqual("FEMM exited with 3", result.error)
+
+
+class TestFemmSession(unittest.TestCase):
+    def test_session_jobs(self):
+        with FemmSession(fake_femm_command()) as session:
+            results = session.map([index_script(i) for i in range(5)])
+            workdir = session.workdir
+
+            self.assertEqual(1, session.nr_starts)
+
+        self.assertEqual([f"index, {float(i)}\n" for i in range(5)], [result.output for result in results])
+        self.assertFalse(os.path.exists(workdir))
+
+    def test_crashed_session(self):
+        with FemmSession(fake_femm_command() + ["--crash-after=2"]) as session:
+            results = session.map([index_script(i) for i in range(4)])
+
+            self.assertEqual(1, session.nr_crashes)
+            self.assertEqual(2, session.nr_starts)
+
+        self.assertEqual(list(range(4)), [result.index for result in results])
+        self.assertEqual([f"index, {float(i)}\n" for i in range(4)], [result.output for result in results])
+
+    def test_instrumented_session(self):
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            with FemmSession(fake_femm_command() + ["--crash-after=2"]) as session:
+                session.map([index_script(i) for i in range(4)])
+            summary = instrumentation.summary()
+        finally:
+            instrumentation.disable()
+            instrumentation.reset()
+
+        # the crashed job is run again by the pool
+        self.assertEqual({"femm.runs": 4, "femm.failed_runs": 1}, summary["counters"])
+        self.assertEqual(5, summary["spans"]["femm.run"]["count"])
+
+
+class TestAsyncFemmExecutor(unittest.TestCase):
+    def test_map(self):
+        executor = AsyncFemmExecutor(3, fake_femm_command(0.1))
+        results = asyncio.run(executor.map([index_script(i) for i in range(6)]))
+
+        self.assertEqual([f"index, {float(i)}\n" for i in range(6)], [result.output for result in results])
+
+    def test_reused_in_new_event_loops(self):
+        executor = AsyncFemmExecutor(1, fake_femm_command())
+        for _ in range(2):
+            results = asyncio.run(executor.map([index_script(i) for i in range(2)]))
+            self.assertEqual(["index, 0.0\n", "index, 1.0\n"], [result.output for result in results])
+
+    def test_results_as_completed(self):
+        async def collect(executor, scripts):
+            return [result async for result in executor.run(scripts)]
+
+        executor = AsyncFemmExecutor(2, fake_femm_command())
+        results = asyncio.run(collect(executor, [index_script(i) for i in range(4)]))
+
+        self.assertEqual(list(range(4)), sorted(result.index for result in results))
+
+    def test_timeout(self):
+        executor = AsyncFemmExecutor(2, fake_femm_command(30.0), timeout=0.5)
+
+        start = time.monotonic()
+        result = asyncio.run(executor.run_job(0, index_script(0)))
+
+        self.assertLess(time.monotonic() - start, 10.0)
+        self.assertIsNone(result.returncode)
+        self.assertIn("TimeoutExpired", result.error)
+
+    def test_instrumented_jobs(self):
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            asyncio.run(AsyncFemmExecutor(2, fake_femm_command()).map([index_script(i) for i in range(3)]))
+            asyncio.run(AsyncFemmExecutor(1, fake_femm_command(30.0), timeout=0.5).run_job(0, index_script(0)))
+            summary = instrumentation.summary()
+        finally:
+            instrumentation.disable()
+            instrumentation.reset()
+
+        self.assertEqual({"femm.runs": 3, "femm.failed_runs": 1}, summary["counters"])
+        self.assertEqual(4, summary["spans"]["femm.run"]["count"])
+
+    def test_cancel(self):
+        async def cancelled(executor):
+            job = asyncio.ensure_future(executor.run_job(0, index_script(0)))
+            await asyncio.sleep(0.5)
+            job.cancel()
+            try:
+                await job
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        executor = AsyncFemmExecutor(1, fake_femm_command(30.0))
+
+        start = time.monotonic()
+        self.assertTrue(asyncio.run(cancelled(executor)))
+        self.assertLess(time.monotonic() - start, 10.0)
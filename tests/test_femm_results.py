@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.femm_results import parse_result
+from adze_modeler.femm_results import parse_value
+from adze_modeler.femm_results import read_results
+from adze_modeler.femm_results import results_array
+from adze_modeler.femm_wrapper import FemmPool
+from adze_modeler.femm_wrapper import FemmWriter
+
+schema = {"current": float, "volt": complex, "flux": complex}
+output = "current, 1\nvolt, 0.5+I*0.25\nflux, 6.4707e-004-I*1e-5\n"
+
+
+class TestParseResult(TestCase):
+    def test_values(self):
+        self.assertEqual(1.5, parse_value(" 1.5"))
+        self.assertEqual(0.5 - 0.25j, parse_value("0.5-I*0.25"))
+        self.assertEqual(2j, parse_value("I*2"))
+        self.assertEqual("icoil", parse_value("icoil "))
+
+    def test_parse(self):
+        self.assertEqual({"current": 1.0, "volt": 0.5 + 0.25j, "flux": 6.4707e-4 - 1e-5j}, parse_result(output))
+
+    def test_schema(self):
+        result = parse_result("current, 2\n", {"current": complex})
+        self.assertEqual(2 + 0j, result["current"])
+        self.assertIsInstance(result["current"], complex)
+
+        self.assertRaises(ValueError, parse_result, output, {"torque": float})
+        self.assertRaises(ValueError, parse_result, output, {"volt": float})
+        self.assertRaises(ValueError, parse_result, "current 1\n")
+
+
+class TestResultsArray(TestCase):
+    def test_records(self):
+        records = results_array([output, output.replace("current, 1", "current, 3")], schema)
+
+        self.assertEqual(("current", "volt", "flux"), records.dtype.names)
+        np.testing.assert_array_equal([1.0, 3.0], records.current)
+        np.testing.assert_array_equal([0.5 + 0.25j, 0.5 + 0.25j], records["volt"])
+        self.assertAlmostEqual(6.4707e-4 - 1e-5j, records.flux[1])
+
+    def test_missing(self):
+        self.assertRaises(ValueError, results_array, [output, None], schema)
+        self.assertRaises(ValueError, results_array, [output, "current, 1\n"], schema)
+
+        records = results_array([None, "current, 1\n"], schema, missing="nan")
+        self.assertTrue(np.isnan(records.current[0]))
+        self.assertEqual(1.0, records.current[1])
+        self.assertTrue(np.isnan(records.flux).all())
+
+        # the values are shorter than "nan"
+        records = results_array(["a, 1", "b, 2"], {"a": float}, missing="nan")
+        self.assertEqual(1.0, records.a[0])
+        self.assertTrue(np.isnan(records.a[1]))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, results_array, ["current, x\n"], schema)
+        self.assertRaises(ValueError, results_array, [output], {"current": int})
+
+    def test_read_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = [os.path.join(directory, f"{i}.csv") for i in range(3)]
+            for file_name in file_names[:2]:
+                with open(file_name, "w") as f:
+                    f.write(output)
+
+            records = read_results(file_names, schema, missing="nan")
+
+        np.testing.assert_array_equal([1.0, 1.0, np.nan], records.current)
+
+    def test_pool_results(self):
+        scripts = []
+        for i in range(4):
+            writer = FemmWriter()
+            writer.lua_model.extend(writer.init_problem())
+            writer.lua_model.append(writer.write_out_result("index", i))
+            writer.lua_model.extend(writer.close())
+            scripts.append(writer.lua_model)
+
+        fake_femm = os.path.join(os.path.dirname(__file__), "test_femm_execution", "fake_femm.py")
+        results = FemmPool(2, [sys.executable, fake_femm]).map(scripts)
+
+        np.testing.assert_array_equal([0.0, 1.0, 2.0, 3.0], results_array(results, {"index": float}).index)
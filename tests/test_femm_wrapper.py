@@ -1,12 +1,22 @@
+import io
+import os
+import tempfile
+from unittest import mock
 from unittest import TestCase
 
+from adze_modeler.femm_wrapper import FemmExecutor
 from adze_modeler.femm_wrapper import FemmWriter
+from adze_modeler.geometry import Geometry
 from adze_modeler.femm_wrapper import kw_current_flow
 from adze_modeler.femm_wrapper import kw_electrostatic
 from adze_modeler.femm_wrapper import kw_heat_flow
 from adze_modeler.femm_wrapper import MagneticDirichlet
 from adze_modeler.femm_wrapper import MagneticMaterial
 from adze_modeler.femm_wrapper import MagneticMixed
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.regions import Region
 
 
 class FemmTester(TestCase):
@@ -316,8 +326,159 @@ class FemmTester(TestCase):
     def test_run_analysis(self):
         self.assertEqual("mi_analyze(1)", FemmWriter().analyze())
 
+    def test_field_commands(self):
+        fmw = FemmWriter()
+        fmw.field = kw_heat_flow
+        self.assertEqual("hi_addnode(1.0, 2)", fmw.add_node(1.0, 2))
+        self.assertRaises(ValueError, fmw.analyze)
+        self.assertRaises(ValueError, fmw.select_arc_segment, 1.0, 2.0)
+
+        fmw.field = None
+        self.assertRaises(ValueError, fmw.add_node, 1.0, 2.0)
+
+    def test_write_out_result(self):
+        self.assertEqual(
+            "write(file_out, 'Flux', ', ', Flux, \"\\n\") \n", FemmWriter().write_out_result("Flux", "Flux")
+        )
+
     def test_save_as_command(self):
         self.assertEqual('mi_saveas("test")', FemmWriter().save_as("test"))
 
     def test_get_circuit_name(self):
         self.assertEqual("result = mo_getcircuitproperties('icoil')", FemmWriter().get_circuit_properties("icoil"))
+
+    def test_separate_lua_models(self):
+        writer_1 = FemmWriter()
+        writer_2 = FemmWriter()
+        writer_1.lua_model.append(writer_1.add_node(1.0, 2.0))
+
+        self.assertEqual(["mi_addnode(1.0, 2.0)"], writer_1.lua_model)
+        self.assertEqual([], writer_2.lua_model)
+
+    def test_streaming_writer(self):
+        sink = io.StringIO()
+        writer = FemmWriter(sink)
+        writer.lua_model.append(writer.add_node(1.0, 2.0))
+        writer.lua_model.extend(writer.close())
+        writer.write()
+
+        self.assertEqual(5, len(writer.lua_model))
+        self.assertEqual("mi_addnode(1.0, 2.0)\nclosefile(file_out)\nmo_close()\nmi_close()\nquit()\n", sink.getvalue())
+        self.assertRaises(ValueError, writer.write, "test.lua")
+
+    def test_streaming_writer_into_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            buffered = FemmWriter()
+            streamed = FemmWriter(os.path.join(directory, "streamed.lua"))
+            for writer in (buffered, streamed):
+                writer.lua_model.extend(writer.init_problem())
+                writer.lua_model.append(writer.add_segment(0.0, 0.0, 1.0, 0.0))
+
+            buffered.write(os.path.join(directory, "buffered.lua"))
+            streamed.write()
+
+            with open(os.path.join(directory, "buffered.lua")) as f1:
+                with open(os.path.join(directory, "streamed.lua")) as f2:
+                    self.assertEqual(f1.read(), f2.read())
+
+    def test_write_geometry_diff(self):
+        geo = Geometry()
+        a = Node(0.0, 0.0, id=1)
+        b = Node(1.0, 0.0, id=2)
+        c = Node(1.0, 1.0, id=3)
+        geo.add_line(Line(a, b, id=4))
+        geo.add_line(Line(b, c, id=5))
+        snapshot = geo.snapshot()
+
+        geo.lines.pop()
+        geo.nodes.remove(c)
+        geo.translate(1.0, 0.0)
+        geo.add_line(Line(a, Node(0.0, 2.0, id=6), id=7))
+
+        writer = FemmWriter()
+        self.assertEqual(
+            [
+                'open("base.fem")',
+                "mi_selectsegment(1.0, 0.5)",
+                "mi_deleteselectedsegments()",
+                "mi_selectnode(1.0, 1.0)",
+                "mi_deleteselectednodes()",
+                'mi_seteditmode("nodes")',
+                "mi_selectnode(0.0, 0.0)",
+                "mi_selectnode(1.0, 0.0)",
+                "mi_movetranslate(1.0, 0.0)",
+                "mi_clearselected()",
+                "mi_addnode(0.0, 2.0)",
+                "mi_addsegment(1.0, 0.0, 0.0, 2.0)",
+            ],
+            writer.write_geometry_diff(geo.diff(snapshot), base_file="base.fem"),
+        )
+
+    def test_write_swapped_nodes(self):
+        geo = Geometry()
+        a = Node(0.0, 0.0, id=1)
+        b = Node(1.0, 0.0, id=2)
+        c = Node(1.0, 1.0, id=3)
+        geo.add_line(Line(a, c, id=4))
+        geo.add_line(Line(b, c, id=5))
+        snapshot = geo.snapshot()
+
+        a.x, b.x = b.x, a.x
+
+        # a is removed and added again, so the moved b is not selected again at its new position
+        self.assertEqual(
+            [
+                "mi_selectsegment(0.5, 0.5)",
+                "mi_deleteselectedsegments()",
+                "mi_selectnode(0.0, 0.0)",
+                "mi_deleteselectednodes()",
+                'mi_seteditmode("nodes")',
+                "mi_selectnode(1.0, 0.0)",
+                "mi_movetranslate(-1.0, 0.0)",
+                "mi_clearselected()",
+                "mi_addnode(1.0, 0.0)",
+                "mi_addsegment(1.0, 0.0, 1.0, 1.0)",
+            ],
+            FemmWriter().write_geometry_diff(geo.diff(snapshot)),
+        )
+
+    def test_write_geometry(self):
+        geo = Geometry()
+        geo.add_arc(CircleArc(Node(1.0, 0.0), Node(0.0, 0.0), Node(0.0, 1.0)))
+
+        self.assertEqual(
+            ["mi_addnode(1.0, 0.0)", "mi_addnode(0.0, 1.0)", "mi_addarc(1.0, 0.0, 0.0, 1.0, 90.0, 1)"],
+            FemmWriter().write_geometry(geo),
+        )
+
+    def test_write_block_labels(self):
+        region = Region(None, [], 1.0, (0.5, 0.5))
+        coil = Region(None, [], 1.0, (1.5, 0.5))
+        copper = MagneticMaterial("copper", 1, 1, 0, 0, 58.0, 0, 0, 1, 0, 0, 0, 0, 0)
+
+        self.assertEqual(
+            [
+                "mi_addblocklabel(0.5, 0.5)",
+                "mi_addblocklabel(1.5, 0.5)",
+                "mi_selectlabel(1.5, 0.5)",
+                "mi_setblockprop('copper', 1, 0, '', 0, 0, 0)",
+                "mi_clearselected()",
+            ],
+            FemmWriter().write_block_labels([region, coil], [None, copper]),
+        )
+
+
+class TestFemmExecutor(TestCase):
+    def test_wine_path_error(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            try:
+                with open("test.lua", "w") as file:
+                    file.write("quit()")
+                with mock.patch("adze_modeler.femm_wrapper.wine_path", side_effect=RuntimeError("winepath")):
+                    with mock.patch("adze_modeler.femm_wrapper.subprocess.run") as run:
+                        self.assertIsNone(FemmExecutor().run_femm("test.lua"))
+                        run.assert_not_called()
+            finally:
+                os.chdir(cwd)
@@ -1,7 +1,9 @@
+from math import pi
 from unittest import TestCase
 
 from adze_modeler.geometry import Geometry
 from adze_modeler.gmsh import gmsh_writer
+from adze_modeler.objects import CircleArc
 from adze_modeler.objects import CubicBezier
 from adze_modeler.objects import Line
 from adze_modeler.objects import Node
@@ -55,6 +57,155 @@ class TestGeometry(TestCase):
         geo.add_cubic_bezier(cb)
         self.assertEqual(cb, geo.cubic_beziers[0])
 
+    def test_merge_points(self):
+        geo = Geometry()
+
+        a = Node(0.0, 0.0, id=0)
+        b = Node(1.0, 0.0, id=1)
+        c = Node(1.0 + 1e-7, 0.0, id=2)
+        d = Node(1.0, 1.0, id=3)
+
+        geo.add_line(Line(a, b, id=4))
+        geo.add_line(Line(c, d, id=5))
+        geo.merge_points()
+
+        self.assertEqual([0, 1, 3], [node.id for node in geo.nodes])
+        # the endpoints of the lines are the same node objects after the merge
+        self.assertIs(geo.lines[0].end_pt, geo.lines[1].start_pt)
+        self.assertIs(b, geo.lines[1].start_pt)
+
+    def test_merge_points_of_shared_endpoints(self):
+        geo = Geometry()
+
+        a = Node(0.0, 0.0)
+        b = Node(1.0, 0.0)
+        c = Node(2.0, 0.0)
+
+        geo.add_line(Line(a, b))
+        geo.add_line(Line(b, c))
+        geo.merge_points()
+
+        self.assertEqual([a, b, c], geo.nodes)
+        self.assertEqual(3, len({id(node) for node in geo.nodes}))
+
+    def test_merge_points_of_arcs_and_beziers(self):
+        geo = Geometry()
+
+        geo.add_arc(CircleArc(Node(1.0, 0.0, id=0), Node(0.0, 0.0, id=1), Node(0.0, 1.0, id=2)))
+        geo.add_cubic_bezier(
+            CubicBezier(Node(0.0, 1.0, id=3), Node(-0.5, 0.5, id=4), Node(0.5, -0.5, id=5), Node(1.0, 0.0, id=6))
+        )
+        geo.merge_points()
+
+        self.assertEqual(5, len(geo.nodes))
+        self.assertIs(geo.circle_arcs[0].end_pt, geo.cubic_beziers[0].start_pt)
+        self.assertIs(geo.circle_arcs[0].start_pt, geo.cubic_beziers[0].end_pt)
+
+
+class TestTransformations(TestCase):
+    def setUp(self):
+        self.geo = Geometry()
+        a = Node(1.0, 0.0, id=0)
+        b = Node(2.0, 0.0, id=1)
+        c = Node(2.0, 1.0, id=2, label="corner")
+
+        self.geo.add_line(Line(a, b, label="rotor"))
+        self.geo.add_line(Line(b, c, label="stator"))
+
+    def coordinates(self):
+        return [node.as_tuple() for node in self.geo.all_nodes()]
+
+    def test_select_nodes(self):
+        self.assertEqual(4, len(self.geo.nodes))  # the shared node is listed twice before the merge
+        self.assertEqual(3, len(self.geo.select_nodes()))
+        self.assertEqual([0, 1], [node.id for node in self.geo.select_nodes(label="rotor")])
+        self.assertEqual([2], [node.id for node in self.geo.select_nodes(label="corner")])
+        self.assertEqual([1, 2], [node.id for node in self.geo.select_nodes(id_range=(1, 5))])
+        self.assertEqual([0], [node.id for node in self.geo.select_nodes(bbox=(0.0, -1.0, 1.5, 1.0))])
+
+    def test_rotate_keeps_the_shared_nodes(self):
+        self.assertEqual(2, self.geo.rotate(pi / 2, label="rotor"))
+        self.assertEqual([(0.0, 1.0), (0.0, 2.0), (2.0, 1.0)], self.coordinates())
+        self.assertIs(self.geo.lines[0].end_pt, self.geo.lines[1].start_pt)
+
+    def test_rotate_about_a_point(self):
+        self.geo.rotate(pi / 2, center=(2.0, 0.0), id_range=(2, 2))
+        self.assertEqual((1.0, 0.0), self.geo.lines[1].end_pt.as_tuple())
+
+    def test_translate_scale_mirror(self):
+        self.geo.translate(1.0, 1.0)
+        self.assertEqual([(2.0, 1.0), (3.0, 1.0), (3.0, 2.0)], self.coordinates())
+
+        self.geo.scale(2.0, center=(2.0, 1.0), bbox=(2.5, 0.0, 4.0, 3.0))
+        self.assertEqual([(2.0, 1.0), (4.0, 1.0), (4.0, 3.0)], self.coordinates())
+
+        self.geo.mirror((0.0, 0.0), (1.0, 1.0))
+        self.assertEqual([(1.0, 2.0), (1.0, 4.0), (3.0, 4.0)], self.coordinates())
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.geo = Geometry()
+        self.a = Node(0.0, 0.0, id=1)
+        self.b = Node(1.0, 0.0, id=2)
+        self.c = Node(1.0, 1.0, id=3)
+        self.geo.add_line(Line(self.a, self.b, id=4))
+        self.geo.add_line(Line(self.b, self.c, id=5, label="moved"))
+
+    def test_unchanged(self):
+        diff = self.geo.diff(self.geo.snapshot())
+        self.assertTrue(all(len(changes) == 0 for changes in diff))
+
+    def test_moved_nodes(self):
+        snapshot = self.geo.snapshot()
+        self.geo.translate(0.0, 2.0, label="moved")
+
+        diff = self.geo.diff(snapshot)
+        self.assertEqual([((1.0, 0.0), (1.0, 2.0)), ((1.0, 1.0), (1.0, 3.0))], diff.moved_nodes)
+        self.assertEqual([], diff.added_lines)
+        self.assertEqual([], diff.removed_lines)
+
+    def test_moved_onto_an_old_position(self):
+        snapshot = self.geo.snapshot()
+        self.a.x = 1.0
+        self.b.y = 2.0
+
+        # b is moved first, else it would be selected again with a at its old position
+        diff = self.geo.diff(snapshot)
+        self.assertEqual([((1.0, 0.0), (1.0, 2.0)), ((0.0, 0.0), (1.0, 0.0))], diff.moved_nodes)
+        self.assertEqual([], diff.removed_nodes)
+
+    def test_swapped_nodes(self):
+        snapshot = self.geo.snapshot()
+        self.a.x, self.b.x = self.b.x, self.a.x
+
+        diff = self.geo.diff(snapshot)
+        self.assertEqual([((1.0, 0.0), (0.0, 0.0))], diff.moved_nodes)
+        self.assertEqual([(0.0, 0.0)], diff.removed_nodes)
+        self.assertEqual([(1.0, 0.0)], diff.added_nodes)
+        self.assertEqual([(0.0, 0.0, 1.0, 0.0)], diff.removed_lines)
+        self.assertEqual([(1.0, 0.0, 0.0, 0.0)], diff.added_lines)
+
+    def test_added_and_removed_lines(self):
+        snapshot = self.geo.snapshot()
+        self.geo.lines.pop(0)
+        self.geo.nodes.remove(self.a)
+        self.geo.add_line(Line(self.c, Node(0.0, 1.0, id=6), id=7))
+
+        diff = self.geo.diff(snapshot)
+        self.assertEqual([(0.0, 1.0)], diff.added_nodes)
+        self.assertEqual([(0.0, 0.0)], diff.removed_nodes)
+        self.assertEqual([(1.0, 1.0, 0.0, 1.0)], diff.added_lines)
+        self.assertEqual([(0.0, 0.0, 1.0, 0.0)], diff.removed_lines)
+
+    def test_arc_center_is_not_a_vertex(self):
+        snapshot = self.geo.snapshot()
+        self.geo.add_arc(CircleArc(self.c, Node(0.0, 1.0, id=8), Node(-1.0, 1.0, id=9), id=10))
+
+        diff = self.geo.diff(snapshot)
+        self.assertEqual([(-1.0, 1.0)], diff.added_nodes)
+        self.assertEqual([((1.0, 1.0), (0.0, 1.0), (-1.0, 1.0))], diff.added_arcs)
+
 
 class TestMeshing(TestCase):
     def test_mesh_the_triangle(self):
@@ -69,3 +220,9 @@ class TestMeshing(TestCase):
         geo = import_svg(path.as_posix())
         print(geo)
         gmsh_writer(geo.nodes, geo.lines, geo.circle_arcs, geo.cubic_beziers)
+
+    def test_missing_gmsh_point(self):
+        nodes = [Node(0.0, 0.0), Node(1.0, 0.0)]
+        lines = [Line(nodes[0], Node(1.0, 1.0))]
+
+        self.assertRaises(ValueError, gmsh_writer, nodes, lines, [], [])
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from adze_modeler.geometry_cache import GeometryCache
+from adze_modeler.svg_handlers import import_svg
+from importlib_resources import files
+
+
+class TestGeometryCache(TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.cache = GeometryCache(self.temp.name)
+        self.owl = files("examples.owl").joinpath("owl-shape.svg").as_posix()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_warm_start(self):
+        cold = self.cache.import_file(self.owl)
+        warm = self.cache.import_file(self.owl)
+
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(cold.store.x.tolist(), warm.store.x.tolist())
+        self.assertEqual(cold.line_table.rows.tolist(), warm.line_table.rows.tolist())
+
+        # the cached geometry is the same as the merged geometry of import_svg
+        geo = import_svg(self.owl)
+        self.assertEqual([(n.x, n.y, n.id) for n in geo.nodes], [(n.x, n.y, n.id) for n in warm.nodes])
+        self.assertEqual(len(geo.cubic_beziers), len(warm.cubic_beziers))
+
+    def test_cached_geometry_can_be_modified(self):
+        self.cache.import_file(self.owl)
+        warm = self.cache.import_file(self.owl)
+        warm.translate(1.0, 0.0)
+        warm.add_node(warm.new_node(0.0, 0.0))
+
+        again = self.cache.import_file(self.owl)
+        self.assertEqual(len(warm.nodes) - 1, len(again.nodes))
+        self.assertEqual(warm.nodes[0].x - 1.0, again.nodes[0].x)
+
+    def test_options_are_part_of_the_key(self):
+        self.cache.import_file(self.owl, epsilon=1e-5)
+        self.cache.import_file(self.owl, epsilon=1e-3)
+
+        self.assertEqual(2, self.cache.misses)
+        self.assertEqual(2, len(self.cache.entries()))
+
+    def test_eviction_of_the_least_recently_used_entry(self):
+        triangle = files("examples.triangle").joinpath("triangle.svg").as_posix()
+        self.cache.import_file(self.owl)
+        self.cache.import_file(triangle)
+
+        # the owl was used a long time ago
+        owl_entry = self.cache.entry(self.cache.key(self.owl))
+        os.utime(owl_entry, (0, 0))
+
+        self.cache.max_bytes = self.cache.size() - 1
+        self.cache.evict()
+
+        self.assertFalse(os.path.isdir(owl_entry))
+        self.assertIsNotNone(self.cache.load(self.cache.key(triangle)))
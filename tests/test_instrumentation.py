@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from adze_modeler import instrumentation
+from adze_modeler.femm_wrapper import FemmWriter
+from adze_modeler.femm_wrapper import LuaStream
+from adze_modeler.geometry import Geometry
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled(self):
+        with instrumentation.span("test") as span:
+            instrumentation.count("test")
+
+        self.assertIs(span, instrumentation.span("other"))
+        self.assertEqual({"spans": {}, "counters": {}}, instrumentation.summary())
+
+    def test_spans_and_counters(self):
+        instrumentation.enable()
+        for _ in range(3):
+            with instrumentation.span("test"):
+                instrumentation.count("test.items", 2)
+
+        summary = instrumentation.summary()
+        self.assertEqual(3, summary["spans"]["test"]["count"])
+        self.assertLessEqual(summary["spans"]["test"]["min"], summary["spans"]["test"]["max"])
+        self.assertEqual({"test.items": 6}, summary["counters"])
+
+    def test_instrumented_pipeline(self):
+        instrumentation.enable()
+        geo = Geometry()
+        geo.add_line(Line(Node(0.0, 0.0), Node(1.0, 0.0)))
+        geo.add_line(Line(Node(1.0, 0.0), Node(1.0, 1.0)))
+        geo.merge_points()
+
+        writer = FemmWriter()
+        writer.lua_model.extend(writer.write_geometry(geo))
+        with tempfile.TemporaryDirectory() as directory:
+            writer.write(os.path.join(directory, "test.lua"))
+            instrumentation.write_json(os.path.join(directory, "summary.json"))
+
+            with open(os.path.join(directory, "summary.json")) as f:
+                summary = json.load(f)
+
+        self.assertEqual(["femm_writer.write", "merge_points"], sorted(summary["spans"]))
+        self.assertEqual(1, summary["counters"]["merge_points.nodes_merged"])
+        self.assertEqual(len(writer.lua_model), summary["counters"]["femm_writer.commands"])
+        self.assertEqual(
+            sum(len(line) + 1 for line in writer.lua_model), summary["counters"]["femm_writer.bytes_written"]
+        )
+
+    def test_instrumented_stream(self):
+        instrumentation.enable()
+        geo = Geometry()
+        geo.add_line(Line(Node(0.0, 0.0), Node(1.0, 0.0)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "test.lua")
+            writer = FemmWriter()
+            writer.lua_model = LuaStream(file_name)
+            writer.lua_model.extend(writer.write_geometry(geo))
+            writer.write()
+
+            summary = instrumentation.summary()
+            self.assertEqual(3, summary["counters"]["femm_writer.commands"])
+            self.assertEqual(os.path.getsize(file_name), summary["counters"]["femm_writer.bytes_written"])
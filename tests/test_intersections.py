@@ -0,0 +1,189 @@
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.geometry import Geometry
+from adze_modeler.intersections import candidate_pairs
+from adze_modeler.intersections import crossing_pairs
+from adze_modeler.intersections import planarize
+from adze_modeler.intersections import sweep_pairs
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+
+
+def line_coordinates(geo):
+    return sorted((line.start_pt.x, line.start_pt.y, line.end_pt.x, line.end_pt.y) for line in geo.lines)
+
+
+class TestIntersections(TestCase):
+    def test_candidate_pairs(self):
+        xmin = np.array([0.0, 0.5, 2.0, 0.2])
+        xmax = np.array([1.0, 1.5, 3.0, 0.3])
+        ymin = np.array([0.0, 0.0, 0.0, 5.0])
+        ymax = np.array([1.0, 1.0, 1.0, 6.0])
+
+        pairs = [
+            (int(i), int(j)) for chunk in candidate_pairs(xmin, xmax, ymin, ymax, chunk_size=1) for i, j in zip(*chunk)
+        ]
+        self.assertEqual([(0, 1)], pairs)
+
+    def test_crossing_pairs(self):
+        start = np.array([[0.0, 0.0], [0.0, 1.0], [2.0, 0.0], [1.0, 0.0], [0.5, 0.5]])
+        end = np.array([[1.0, 1.0], [1.0, 0.0], [3.0, 0.0], [2.0, 0.0], [0.6, 0.6]])
+
+        # crossing, touching and overlapping segments
+        pairs = {tuple(sorted(pair)) for pair in crossing_pairs(start, end).tolist()}
+        self.assertEqual({(0, 1), (0, 4), (1, 3), (1, 4), (2, 3)}, pairs)
+
+        # the segments with a common endpoint are not reported
+        keys = np.array([[0, 1], [2, 3], [4, 5], [6, 4], [7, 8]])
+        pairs = {tuple(sorted(pair)) for pair in crossing_pairs(start, end, keys).tolist()}
+        self.assertEqual({(0, 1), (0, 4), (1, 3), (1, 4)}, pairs)
+
+    def test_long_overlapping_segments(self):
+        # long parallel segments: every pair is a candidate, but the chunks of the pairs stay bounded
+        n = 300
+        offsets = 0.01 * np.arange(n)
+        start = np.column_stack([np.zeros(n), offsets])
+        end = np.column_stack([np.full(n, 100.0), 100.0 + offsets])
+        low = np.minimum(start, end)
+        high = np.maximum(start, end)
+
+        chunks = [len(i) for i, j in candidate_pairs(low[:, 0], high[:, 0], low[:, 1], high[:, 1], chunk_size=1000)]
+        self.assertEqual(n * (n - 1) // 2, sum(chunks))
+        self.assertLessEqual(max(chunks), 1000)
+        self.assertEqual(0, len(crossing_pairs(start, end, chunk_size=1000)))
+
+
+class TestSweepLine(TestCase):
+    def test_sweep_pairs(self):
+        shared = Node(1.0, 0.0)
+        lines = [
+            Line(Node(0.0, 0.0), Node(2.0, 2.0)),
+            Line(Node(0.0, 2.0), Node(2.0, 0.0)),  # crosses the first one
+            Line(Node(1.0, -1.0), Node(1.0, 3.0)),  # vertical, crosses both
+            Line(Node(-1.0, 0.0), shared),  # the first line starts on it
+            Line(shared, Node(3.0, 0.0)),  # the second line ends on it, common endpoint with the previous one
+            Line(Node(5.0, 0.0), Node(6.0, 0.0)),  # far away
+        ]
+        arcs = [CircleArc(Node(2.0, 1.0), Node(1.0, 1.0), Node(0.0, 1.0))]  # upper half circle through (1, 2)
+
+        i, j = sweep_pairs(lines, arcs, 1.0e-5)
+        pairs = set(zip(i.tolist(), j.tolist()))
+        self.assertEqual({(0, 1), (0, 2), (1, 2), (0, 3), (2, 3), (1, 4), (2, 4), (0, 6), (1, 6), (2, 6)}, pairs)
+
+    def test_long_parallel_segments(self):
+        # the boxes of every pair overlap, but the lines are never neighbours closer than the tolerance
+        lines = [Line(Node(0.0, 0.01 * k), Node(100.0, 100.0 + 0.01 * k)) for k in range(1000)]
+
+        i, j = sweep_pairs(lines, [], 1.0e-5)
+        self.assertEqual(0, len(i))
+
+    def test_planarize_with_both_broad_phases(self):
+        def geometry():
+            geo = Geometry()
+            for k in range(8):
+                geo.add_line(Line(Node(0.0, k + 0.5), Node(8.0, 8.0 - k)))
+                geo.add_line(Line(Node(k + 0.25, 0.0), Node(k + 0.25, 8.0)))
+            geo.add_line(Line(Node(0.0, 4.0), Node(4.0, 4.0)))
+            geo.add_line(Line(Node(2.0, 4.0), Node(6.0, 4.0)))
+            geo.add_arc(CircleArc(Node(7.0, 4.0), Node(4.0, 4.0), Node(1.0, 4.0)))
+            geo.add_arc(CircleArc(Node(4.0, 2.0), Node(4.0, 4.0), Node(4.0, 6.0)))
+            geo.merge_points()
+            return geo
+
+        boxes = geometry()
+        sweep = geometry()
+        self.assertEqual(planarize(boxes, sweep=False), planarize(sweep, sweep=True))
+        self.assertEqual(line_coordinates(boxes), line_coordinates(sweep))
+        self.assertEqual(
+            sorted((arc.start_pt.x, arc.start_pt.y) for arc in boxes.circle_arcs),
+            sorted((arc.start_pt.x, arc.start_pt.y) for arc in sweep.circle_arcs),
+        )
+
+
+class TestPlanarize(TestCase):
+    def test_crossing_lines(self):
+        geo = Geometry()
+        geo.add_line(Line(Node(0.0, 0.0), Node(2.0, 2.0)))
+        geo.add_line(Line(Node(0.0, 2.0), Node(2.0, 0.0), label="cross"))
+
+        self.assertEqual((1, 2, 4), planarize(geo))
+        self.assertEqual(5, len(geo.nodes))
+        center = [node for node in geo.nodes if (node.x, node.y) == (1.0, 1.0)]
+        self.assertEqual(1, len(center))
+        self.assertEqual(4, sum(center[0] in (line.start_pt, line.end_pt) for line in geo.lines))
+        self.assertEqual(["cross", "cross"], [line.label for line in geo.lines if line.label])
+
+    def test_long_segments(self):
+        geo = Geometry()
+        for k in range(500):
+            geo.add_line(Line(Node(0.0, 0.01 * k), Node(100.0, 100.0 + 0.01 * k)))
+        geo.add_line(Line(Node(50.0, 0.0), Node(50.0, 100.0)))
+
+        self.assertEqual((500, 501, 1501), planarize(geo))
+
+    def test_array_geometry(self):
+        geo = ArrayGeometry()
+        nodes = geo.add_nodes([0.0, 2.0, 0.0, 2.0], [0.0, 2.0, 2.0, 0.0])
+        geo.add_lines([[nodes[0], nodes[1]], [nodes[2], nodes[3]]])
+
+        self.assertEqual((1, 2, 4), planarize(geo))
+        self.assertEqual(5, len(geo.store))
+        self.assertEqual(4, int((geo.line_table.rows == 4).sum()))
+
+    def test_t_junction_and_overlap(self):
+        geo = Geometry()
+        geo.add_line(Line(Node(0.0, 0.0), Node(2.0, 0.0)))
+        geo.add_line(Line(Node(1.0, 0.0), Node(1.0, 1.0)))
+        geo.add_line(Line(Node(1.5, 0.0), Node(3.0, 0.0)))
+        geo.merge_points()
+
+        self.assertEqual((3, 3, 5), planarize(geo))
+        self.assertEqual(
+            [
+                (0.0, 0.0, 1.0, 0.0),
+                (1.0, 0.0, 1.0, 1.0),
+                (1.0, 0.0, 1.5, 0.0),
+                (1.5, 0.0, 2.0, 0.0),
+                (2.0, 0.0, 3.0, 0.0),
+            ],
+            line_coordinates(geo),
+        )
+
+    def test_arcs(self):
+        geo = Geometry()
+        # upper half circle, a vertical line through it and a lower half circle, which touches it at (1, 0)
+        geo.add_arc(CircleArc(Node(1.0, 0.0), Node(0.0, 0.0), Node(-1.0, 0.0)))
+        geo.add_line(Line(Node(0.0, -2.0), Node(0.0, 2.0)))
+        geo.add_arc(CircleArc(Node(1.0, 0.0), Node(2.0, 0.0), Node(3.0, 0.0)))
+        geo.merge_points()
+
+        self.assertEqual((1, 3, 5), planarize(geo))
+        self.assertEqual([(0.0, -2.0, 0.0, 1.0), (0.0, 1.0, 0.0, 2.0)], line_coordinates(geo))
+        ends = sorted((arc.start_pt.x, arc.start_pt.y, arc.end_pt.x, arc.end_pt.y) for arc in geo.circle_arcs[:2])
+        self.assertEqual([(0.0, 1.0, -1.0, 0.0), (1.0, 0.0, 0.0, 1.0)], ends)
+
+    def test_crossing_arcs(self):
+        geo = Geometry()
+        geo.add_arc(CircleArc(Node(1.0, 0.0), Node(0.0, 0.0), Node(-1.0, 0.0)))
+        geo.add_arc(CircleArc(Node(2.0, 0.0), Node(1.0, 0.0), Node(0.0, 0.0)))
+        geo.merge_points()
+
+        self.assertEqual((1, 2, 4), planarize(geo))
+        for arc in geo.circle_arcs:
+            self.assertTrue(
+                (round(arc.start_pt.x, 9), round(arc.start_pt.y, 9)) == (0.5, round(3**0.5 / 2, 9))
+                or (round(arc.end_pt.x, 9), round(arc.end_pt.y, 9)) == (0.5, round(3**0.5 / 2, 9))
+            )
+
+    def test_planar_geometry(self):
+        geo = Geometry()
+        nodes = [Node(0.0, 0.0), Node(1.0, 0.0), Node(1.0, 1.0)]
+        for start, end in zip(nodes, nodes[1:] + nodes[:1]):
+            geo.add_line(Line(start, end))
+        lines = list(geo.lines)
+
+        self.assertEqual((0, 3, 3), planarize(geo))
+        self.assertEqual(lines, geo.lines)
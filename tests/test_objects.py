@@ -36,6 +36,16 @@ class TestNodeOperations(TestCase):
         self.assertEqual((1.5, 0.0), c.as_tuple())
         self.assertEqual((0.5, 0.0), d.as_tuple())
         self.assertEqual((2.0, 0.0), e.as_tuple())
+        self.assertEqual(0.5, a.distance_to(b))
+
+    def test_slots(self):
+        a = Node(1.0, 0.0)
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertRaises(AttributeError, setattr, a, "z", 1.0)
+
+        # the result of the arithmetic operators is a complete node
+        c = a + a
+        self.assertEqual((None, None, 6), (c.id, c.label, c.precision))
 
 
 class TestLine(TestCase):
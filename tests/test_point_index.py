@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from adze_modeler.point_index import PointIndex
+
+
+class TestPointIndex(TestCase):
+    def test_query(self):
+        index = PointIndex(1e-3)
+        index.insert(0.0, 0.0, "a")
+        index.insert(1.0, 1.0, "b")
+
+        self.assertEqual("a", index.query(0.0005, -0.0005))
+        self.assertEqual("b", index.query(1.0, 1.0))
+        self.assertIsNone(index.query(0.5, 0.5))
+        self.assertEqual(2, len(index))
+
+    def test_earliest_item_in_the_neighbouring_cells(self):
+        index = PointIndex(1.0)
+        index.insert(0.9, 0.5, "first")
+        index.insert(1.1, 0.5, "second")
+
+        # both points are closer than epsilon, they are stored in different cells
+        self.assertEqual("first", index.query(1.05, 0.5))
+
+    def test_get_or_insert(self):
+        index = PointIndex(1e-5)
+
+        self.assertEqual("a", index.get_or_insert(2.0, 3.0, "a"))
+        self.assertEqual("a", index.get_or_insert(2.0, 3.0 + 1e-6, "b"))
+        self.assertEqual(1, len(index))
+
+    def test_wrong_epsilon(self):
+        self.assertRaises(ValueError, PointIndex, 0.0)
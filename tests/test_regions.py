@@ -0,0 +1,108 @@
+import math
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.geometry import Geometry
+from adze_modeler.model import Label
+from adze_modeler.objects import CircleArc
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.regions import assign_labels
+from adze_modeler.regions import find_regions
+from adze_modeler.regions import locate
+from adze_modeler.regions import pole_of_inaccessibility
+from adze_modeler.regions import points_in_polygon
+
+
+def polygon(geo, points):
+    nodes = [Node(x, y) for x, y in points]
+    for node in nodes:
+        geo.nodes.append(node)
+    for a, b in zip(nodes, nodes[1:] + nodes[:1]):
+        geo.lines.append(Line(a, b))
+    return nodes
+
+
+class TestRegions(TestCase):
+    def test_points_in_polygon(self):
+        square = np.array([[0.0, 0.0], [4.0, 0.0], [4.0, 4.0], [0.0, 4.0]])
+        hole = np.array([[1.0, 1.0], [1.0, 3.0], [3.0, 3.0], [3.0, 1.0]])
+        points = [(0.5, 0.5), (2.0, 2.0), (5.0, 2.0), (3.5, 2.0)]
+
+        self.assertEqual([True, True, False, True], points_in_polygon(points, [square]).tolist())
+        self.assertEqual([True, False, False, True], points_in_polygon(points, [square, hole], chunk_size=1).tolist())
+
+    def test_pole_of_inaccessibility(self):
+        # L-shape, the centroid of the points (1.0, 1.0) is on the boundary, the pole is equally far from the outer
+        # sides and the inner corner
+        shape = np.array([[0.0, 0.0], [3.0, 0.0], [3.0, 1.0], [1.0, 1.0], [1.0, 3.0], [0.0, 3.0]])
+        (x, y), distance = pole_of_inaccessibility([shape], precision=1.0e-4)
+
+        self.assertTrue(points_in_polygon([(x, y)], [shape])[0])
+        self.assertAlmostEqual(2.0 - math.sqrt(2.0), distance, delta=1.0e-3)
+        self.assertAlmostEqual(x, y, delta=1.0e-3)
+
+    def test_adjacent_squares(self):
+        geo = Geometry()
+        a, b, c, d = polygon(geo, [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)])
+        e = Node(2.0, 0.0)
+        f = Node(2.0, 1.0)
+        geo.nodes.extend([e, f])
+        geo.lines.extend([Line(b, e), Line(e, f), Line(f, c)])
+
+        regions = sorted(find_regions(geo), key=lambda region: region.point[0])
+        self.assertEqual(2, len(regions))
+        self.assertAlmostEqual(1.0, regions[0].area)
+        self.assertAlmostEqual(1.0, regions[1].area)
+        self.assertAlmostEqual(0.5, regions[0].point[0], delta=1.0e-3)
+        self.assertAlmostEqual(1.5, regions[1].point[0], delta=1.0e-3)
+
+    def test_hole_and_arc(self):
+        geo = Geometry()
+        polygon(geo, [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)])
+        polygon(geo, [(1.0, 1.0), (3.0, 1.0), (3.0, 3.0), (1.0, 3.0)])
+
+        # a half disk on the right side
+        start = Node(8.0, 4.0)
+        end = Node(8.0, 6.0)
+        geo.nodes.extend([start, end])
+        geo.lines.append(Line(end, start))
+        geo.circle_arcs.append(CircleArc(start, Node(8.0, 5.0), end))
+
+        regions = sorted(find_regions(geo), key=lambda region: region.area)
+        self.assertEqual(3, len(regions))
+        self.assertAlmostEqual(math.pi / 2.0, regions[0].area, delta=1.0e-2)
+        self.assertAlmostEqual(4.0, regions[1].area)
+        self.assertAlmostEqual(100.0 - 4.0 - math.pi / 2.0, regions[2].area, delta=1.0e-2)
+        self.assertEqual(2, len(regions[2].holes))
+
+        self.assertEqual([0, 1, 2], locate([region.point for region in regions], regions).tolist())
+        self.assertEqual([2, -1], locate([(5.0, 5.0), (11.0, 5.0)], regions).tolist())
+
+    def test_array_geometry(self):
+        geo = ArrayGeometry()
+        geo.add_nodes([0.0, 1.0, 2.0, 2.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+        geo.add_lines([[0, 1], [1, 2], [2, 3], [3, 4], [4, 5], [5, 0], [1, 4]])
+        geo.add_node(geo.new_node(1.5, 0.5, id=1))
+
+        regions = sorted(find_regions(geo), key=lambda region: region.point[0])
+        self.assertEqual(2, len(regions))
+        self.assertAlmostEqual(1.5, regions[1].point[0], delta=1.0e-3)
+
+        labels = assign_labels(geo, regions, [Label(1, "core", "iron")])
+        self.assertEqual([None, "iron"], [label.material if label else None for label in labels])
+
+    def test_assign_labels(self):
+        geo = Geometry()
+        polygon(geo, [(0.0, 0.0), (4.0, 0.0), (4.0, 4.0), (0.0, 4.0)])
+        polygon(geo, [(1.0, 1.0), (3.0, 1.0), (3.0, 3.0), (1.0, 3.0)])
+        geo.nodes.append(Node(2.0, 2.0, id=1))
+        geo.nodes.append(Node(0.5, 0.5, id=2))
+
+        regions = sorted(find_regions(geo), key=lambda region: region.area)
+        labels = [Label(1, "coil", "copper"), Label(2, "air", "air")]
+        self.assertEqual(["copper", "air"], [label.material for label in assign_labels(geo, regions, labels)])
+
+        with self.assertRaises(ValueError):
+            assign_labels(geo, regions, [Label(1, "coil", "copper"), Label(1, "core", "iron")])
@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+import numpy as np
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.geometry import Geometry
+from adze_modeler.objects import Line
+from adze_modeler.objects import Node
+from adze_modeler.simplify import simplify
+
+
+def polyline(geo, nodes, closed=False):
+    if closed:
+        nodes = nodes + nodes[:1]
+    for start, end in zip(nodes, nodes[1:]):
+        geo.add_line(Line(start, end))
+
+
+def coordinates(geo):
+    return sorted((line.start_pt.x, line.start_pt.y, line.end_pt.x, line.end_pt.y) for line in geo.lines)
+
+
+class TestSimplify(TestCase):
+    def test_collinear_nodes(self):
+        geo = Geometry()
+        polyline(geo, [Node(0.0, 0.0), Node(1.0, 0.0005), Node(2.0, 0.0), Node(3.0, 1.0)])
+
+        self.assertEqual(1, simplify(geo, 1.0e-3))
+        self.assertEqual([(0.0, 0.0, 2.0, 0.0), (2.0, 0.0, 3.0, 1.0)], coordinates(geo))
+        self.assertEqual(0, simplify(geo, 1.0e-3))
+
+    def test_shared_boundary(self):
+        # two squares with a common, subdivided edge
+        geo = Geometry()
+        a, b, c, d = Node(0.0, 0.0), Node(1.0, 0.0), Node(1.0, 1.0), Node(0.0, 1.0)
+        e, f = Node(2.0, 0.0), Node(2.0, 1.0)
+        common = [b] + [Node(1.0, i / 10) for i in range(1, 10)] + [c]
+        polyline(geo, [c, d, a, b])
+        polyline(geo, common)
+        polyline(geo, [b, e, f, c])
+
+        self.assertEqual(9, simplify(geo))
+        self.assertEqual(7, len(geo.lines))
+        shared = [line for line in geo.lines if line.start_pt.x == line.end_pt.x == 1.0]
+        self.assertEqual(1, len(shared))
+        self.assertIs(b, shared[0].start_pt)
+        self.assertIs(c, shared[0].end_pt)
+
+    def test_closed_polygon_keeps_a_triangle(self):
+        geo = Geometry()
+        polyline(geo, [Node(0.0, 0.0), Node(1.0, 0.0), Node(2.0, 0.0), Node(2.0, 1.0), Node(1.0, 1.0)], closed=True)
+        simplify(geo, 0.1)
+        self.assertEqual(4, len(geo.lines))
+
+        geo = Geometry()
+        polyline(geo, [Node(0.0, 0.0), Node(1.0, 0.0), Node(2.0, 0.0), Node(1.0, 0.01)], closed=True)
+        simplify(geo, 0.1)
+        self.assertEqual(3, len(geo.lines))
+
+    def test_no_new_crossing(self):
+        geo = Geometry()
+        polyline(geo, [Node(0.0, 0.0), Node(1.0, 0.0005), Node(2.0, 0.0)])
+        polyline(geo, [Node(1.0, 0.0001), Node(1.0, -0.0001)])
+
+        self.assertEqual(0, simplify(geo, 1.0e-3))
+        self.assertEqual(3, len(geo.lines))
+
+    def test_parallel_chains(self):
+        geo = Geometry()
+        a, b = Node(0.0, 0.0), Node(2.0, 0.0)
+        polyline(geo, [a, Node(1.0, 0.0001), b])
+        polyline(geo, [a, Node(1.0, -0.0001), b])
+
+        self.assertEqual(1, simplify(geo, 1.0e-3))
+        self.assertEqual(3, len(geo.lines))
+
+    def test_array_geometry(self):
+        geo = ArrayGeometry()
+        nodes = geo.add_nodes([0.0, 1.0, 2.0, 3.0], [0.0, 0.0005, 0.0, 1.0])
+        geo.add_lines(np.column_stack([nodes[:-1], nodes[1:]]))
+
+        self.assertEqual(1, simplify(geo, 1.0e-3))
+        self.assertEqual([(0.0, 0.0, 2.0, 0.0), (2.0, 0.0, 3.0, 1.0)], coordinates(geo))
+        self.assertEqual(3, len(geo.store))
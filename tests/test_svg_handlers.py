@@ -1,6 +1,10 @@
 from unittest import TestCase
 
+from adze_modeler.array_geometry import ArrayGeometry
+from adze_modeler.objects import Node
 from adze_modeler.svg_handlers import import_svg
+from adze_modeler.svg_handlers import import_svg_stream
+from adze_modeler.svg_handlers import iter_svg
 from importlib_resources import files
 
 
@@ -17,3 +21,32 @@ class TestSvgImport(TestCase):
         self.assertTrue(len(geo.lines) > 0)
         self.assertTrue(len(geo.cubic_beziers) > 0)
         self.assertTrue(len(geo.circle_arcs) == 0)
+
+    def test_streaming_import_gives_the_same_geometry(self):
+        eml = files("examples.owl").joinpath("owl-svgrepo-com.svg")
+        geo = import_svg(eml.as_posix())
+        streamed = import_svg_stream(eml.as_posix())
+
+        self.assertEqual([(n.x, n.y, n.id) for n in geo.nodes], [(n.x, n.y, n.id) for n in streamed.nodes])
+        self.assertEqual([line.id for line in geo.lines], [line.id for line in streamed.lines])
+        self.assertEqual(len(geo.cubic_beziers), len(streamed.cubic_beziers))
+
+        array_geo = import_svg_stream(eml.as_posix(), ArrayGeometry())
+        self.assertEqual(len(geo.nodes), len(array_geo.nodes))
+        self.assertEqual(len(geo.lines), len(array_geo.lines))
+
+    def test_iter_svg_yields_the_nodes_before_the_entities(self):
+        eml = files("examples.triangle").joinpath("triangle.svg")
+        items = list(iter_svg(eml.as_posix()))
+
+        seen = set()
+        for item in items:
+            if isinstance(item, Node):
+                seen.add(id(item))
+            else:
+                self.assertIn(id(item.start_pt), seen)
+                self.assertIn(id(item.end_pt), seen)
+
+        self.assertEqual(3, len(seen))
+        # the closing line of the triangle reuses the first node
+        self.assertIs(items[2].start_pt, items[-1].end_pt)
@@ -0,0 +1,69 @@
+import os
+import sys
+from unittest import TestCase
+
+from adze_modeler.femm_results import results_array
+from adze_modeler.femm_wrapper import FemmPool
+from adze_modeler.femm_wrapper import FemmWriter
+from adze_modeler.femm_wrapper import MagneticMaterial
+from adze_modeler.sweep import grid
+from adze_modeler.sweep import Parameter
+from adze_modeler.sweep import run_sweep
+from adze_modeler.sweep import ScriptTemplate
+
+
+class TestParameter(TestCase):
+    def test_expressions(self):
+        ri = Parameter("ri")
+        ro = Parameter("ro")
+
+        self.assertEqual("$ri", str(ri))
+        self.assertEqual("mi_addnode((($ri + $ro) / 2), (- $ri))", FemmWriter().add_node((ri + ro) / 2, -ri))
+        self.assertEqual("((2 * $ri) - 1)", str(2 * ri - 1))
+        self.assertRaises(ValueError, Parameter, "1x")
+
+
+class TestScriptTemplate(TestCase):
+    def test_substitute(self):
+        r = Parameter("r")
+        writer = FemmWriter()
+        writer.lua_model.append(writer.add_node(r, -r))
+        writer.lua_model.append(writer.add_material(MagneticMaterial("$name", 1, 1, 0, 0, 58, 0, 0, 1, 0, 0, 0, 0, 0)))
+        writer.lua_model.append("print(format('%g', 1))")
+
+        template = ScriptTemplate(writer.lua_model)
+
+        self.assertEqual(["name", "r"], template.names)
+        self.assertEqual(
+            "sweep_r = -1.5\n"
+            "mi_addnode(sweep_r, (- sweep_r))\n"
+            "mi_addmaterial('copper', 1, 1, 0, 0, 58, 0, 0, 1, 0, 0, 0, 0, 0)\n"
+            "print(format('%g', 1))\n",
+            template.substitute({"r": -1.5, "name": "copper"}),
+        )
+        self.assertRaises(ValueError, template.substitute, {"r": 1.0})
+
+    def test_variants(self):
+        template = ScriptTemplate("mi_addnode($x, $y)")
+
+        variants = list(template.variants(grid(x=[1, 2], y=[0.5, 1.5])))
+
+        self.assertEqual(4, len(variants))
+        self.assertEqual("sweep_x = 1\nsweep_y = 1.5\nmi_addnode(sweep_x, sweep_y)", variants[1])
+        self.assertEqual(variants[:2], list(template.variants([{"x": 1, "y": 0.5}, {"x": 1, "y": 1.5}])))
+        self.assertRaises(ValueError, list, template.variants({"x": [1]}))
+        self.assertRaises(ValueError, list, template.variants({"x": [1], "y": [1, 2]}))
+
+
+class TestRunSweep(TestCase):
+    def test_sweep(self):
+        writer = FemmWriter()
+        writer.lua_model.extend(writer.init_problem())
+        writer.lua_model.append(writer.write_out_result("current", Parameter("i")))
+        writer.lua_model.extend(writer.close())
+
+        fake_femm = os.path.join(os.path.dirname(__file__), "test_femm_execution", "fake_femm.py")
+        rows, results = run_sweep(writer.lua_model, {"i": [1, 2, 3]}, FemmPool(2, [sys.executable, fake_femm]))
+
+        self.assertEqual([{"i": 1}, {"i": 2}, {"i": 3}], rows)
+        self.assertEqual([1.0, 2.0, 3.0], list(results_array(results, {"current": float}).current))